@@ -162,14 +162,14 @@ def create_zip_file(custom_resource: CustomResource, output_dir: str):
             *os.scandir("src/lambda_shared"),
         }
 
-        # See if there is a top-level `requirements.txt` or `test`
+        # See if there is a top-level `requirements.txt` or `test` (both the Lambda and lambda_shared can have tests)
         requirements_file = None
-        test_file = None
+        test_files = []
         for entry in entries:
             if entry.name == 'requirements.txt':
                 requirements_file = entry
             elif entry.name == 'test':
-                test_file = entry
+                test_files.append(entry)
 
         pip_dir = os.path.join(output_dir, dot_joined_resource_name)
         os.mkdir(pip_dir)
@@ -184,8 +184,7 @@ def create_zip_file(custom_resource: CustomResource, output_dir: str):
                 '--target', pip_dir,
             )
 
-        if test_file is not None:
-            entries.remove(test_file)
+        entries.difference_update(test_files)
 
         # Generate _metadata.py file
         with open(os.path.join(pip_dir, "_metadata.py"), "w") as f:
@@ -9,6 +9,8 @@ class DnsValidatedCertificate(LambdaBackedCustomResource):
         'SubjectAlternativeNames': ([str], False),
         'Region': (str, False),  # Default: current region
         'Tags': (Tags, False),
+        'HostedZoneId': (str, False),  # Create the validation records in this Route53 zone
+        'WaitForIssuance': (bool, False),  # Default: don't wait until the certificate is ISSUED
     }
 
     @classmethod
@@ -27,10 +29,14 @@ class DnsValidatedCertificate(LambdaBackedCustomResource):
                     "acm:DeleteCertificate",
                     "acm:RequestCertificate",
                     "acm:DescribeCertificate",
+                    "acm:ListCertificates",  # Find validation records shared with other certificates
                     "acm:AddTagsToCertificate",
                     "acm:ListTagsForCertificate",
                     "acm:RemoveTagsFromCertificate",
                     "cloudformation:DescribeStacks",  # Read tags
+                    "route53:ChangeResourceRecordSets",  # HostedZoneId
+                    "route53:ListResourceRecordSets",  # HostedZoneId: delete the validation records
+                    "lambda:InvokeFunction",  # Continue waiting in a new invocation
                 ],
                 "Resource": "*",
             }],
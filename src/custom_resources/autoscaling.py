@@ -6,6 +6,10 @@ class Renotify(LambdaBackedCustomResource):
     Re-trigger the AutoScalingGroup Notification.
 
     Useful to include with additional "DependsOn" resources.
+
+    Topics configured for autoscaling:EC2_INSTANCE_LAUNCH get a launch
+    notification for every InService instance; other topics get an
+    autoscaling:TEST_NOTIFICATION.
     """
     props = {
         'AutoScalingGroupName': (str, True),
@@ -19,7 +23,8 @@ class Renotify(LambdaBackedCustomResource):
                 "Effect": "Allow",
                 "Action": [
                     "autoscaling:DescribeNotificationConfigurations",
-                    "sns:Publish",
+                    "autoscaling:DescribeAutoScalingGroups",
+                    "sns:Publish",  # Also needed for PublishBatch
                 ],
                 "Resource": "*",
             }],
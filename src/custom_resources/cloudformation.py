@@ -12,10 +12,16 @@ class Tags(LambdaBackedCustomResource):
     Caveat: Some resources fail when no tags are present. It is advisable to
     always configure a tag to be added (via Set={"foo":"bar"}) to avoid this
     case.
+
+    When the tags don't fit in the response (4096 bytes), the TagDict
+    attributes are dropped first, then the per-key attributes. If the TagList
+    still doesn't fit, it is stored in an SSM parameter under
+    /CustomResourceResponses/, and its name is returned as `TagList.Parameter`.
     """
     props = {
         'Omit': ([str], False),  # Keys to remove from list
         'Set': (dict, False),  # Keys to set/override/add, with the new values
+        'Projections': (dict, False),  # name -> {"Omit": [...], "Set": {...}}, exposed as `name.TagDict` etc.
         'Dummy': (str, False),  # Dummy parameter to trigger updates
     }
 
@@ -35,5 +41,14 @@ class Tags(LambdaBackedCustomResource):
                     "cloudformation:DescribeStacks",
                 ],
                 "Resource": "*",
+            }, {
+                # Offload attributes that don't fit in the response
+                "Effect": "Allow",
+                "Action": [
+                    "ssm:PutParameter",
+                    "ssm:GetParametersByPath",
+                    "ssm:DeleteParameters",
+                ],
+                "Resource": "*",
             }],
         }
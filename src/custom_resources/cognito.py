@@ -51,6 +51,7 @@ class UserPoolClient(LambdaBackedCustomResource):
                   "Sid": "Stmt1509445937176",
                   "Action": [
                     "cognito-idp:UpdateUserPoolClient",
+                    "cognito-idp:DescribeUserPoolClient",
                     "cognito-idp:DeleteUserPoolClient",
                     "cognito-idp:CreateUserPoolClient"
                   ],
@@ -72,6 +73,9 @@ class UserPoolClient(LambdaBackedCustomResource):
 class UserPoolDomain(LambdaBackedCustomResource):
     """
     Added support for configuring the Cognito Client User Domain.
+
+    Without Domain, a free random domain prefix is chosen. Returns the
+    `Domain` and the number of `Attempts` that took.
     """
     _deprecated = 1593424818
     _deprecated_message = 'cognito.UserPoolDomain is now natively supported by CloudFormation'
@@ -98,7 +102,8 @@ class UserPoolDomain(LambdaBackedCustomResource):
                     "Sid": "Stmt1509445937176",
                     "Action": [
                         "cognito-idp:DeleteUserPoolDomain",
-                        "cognito-idp:CreateUserPoolDomain"
+                        "cognito-idp:CreateUserPoolDomain",
+                        "cognito-idp:DescribeUserPoolDomain"
                     ],
                     "Effect": "Allow",
                     "Resource": "*"
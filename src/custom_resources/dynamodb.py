@@ -2,8 +2,18 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 
 
 class JoinGlobalTable(LambdaBackedCustomResource):
+    """
+    Join the DynamoDB table in this region to a Global Table.
+
+    Without `Regions`, the table is joined to the legacy (2017.11.29) Global
+    Table with the same name.
+    With `Regions`, a replica of the table is added in every listed region
+    (Global Tables version 2019.11.21), and the resource waits until all
+    replicas are ACTIVE. Returns `ReplicaStatus.{region}` attributes.
+    """
     props = {
         'TableName': (str, True),
+        'Regions': ([str], False),
     }
 
     @classmethod
@@ -15,6 +25,20 @@ class JoinGlobalTable(LambdaBackedCustomResource):
                 "Action": [
                     "dynamodb:CreateGlobalTable",
                     "dynamodb:UpdateGlobalTable",
+                    # Replicas (version 2019.11.21)
+                    "dynamodb:DescribeTable",
+                    "dynamodb:UpdateTable",
+                    "dynamodb:CreateTableReplica",
+                    "dynamodb:DeleteTableReplica",
+                    "dynamodb:Scan",
+                    "dynamodb:Query",
+                    "dynamodb:GetItem",
+                    "dynamodb:PutItem",
+                    "dynamodb:UpdateItem",
+                    "dynamodb:DeleteItem",
+                    "dynamodb:BatchWriteItem",
+                    "iam:CreateServiceLinkedRole",
+                    "lambda:InvokeFunction",  # Continue waiting in a new invocation
                 ],
                 "Resource": "*",
             }],
@@ -22,7 +46,7 @@ class JoinGlobalTable(LambdaBackedCustomResource):
 
     @classmethod
     def _update_lambda_settings(cls, settings):
-        settings['Timeout'] = 60  # Default timeout of 3 seconds is not always long enough.
+        settings['Timeout'] = 300  # Replicas take minutes to create; continue in a new invocation after 5 minutes
         return settings
 
     @classmethod
@@ -52,7 +76,41 @@ class Item(LambdaBackedCustomResource):
                 "Action": [
                     "dynamodb:DeleteItem",
                     "dynamodb:PutItem",
+                    "dynamodb:UpdateItem",
+                ],
+                "Resource": "*",
+            }],
+        }
+
+
+class ItemSet(LambdaBackedCustomResource):
+    props = {
+        'Region': (str, False),
+        'TableName': (str, True),
+        'Items': ([dict], False),  # [{"ItemKey": {...}, "ItemValue": {...}}]
+        'ItemsFrom': (dict, False),  # {"Bucket": ..., "Key": ..., "VersionId": ...}: JSON Lines of the above
+    }
+
+    def validate(self):
+        if 'Items' not in self.properties and 'ItemsFrom' not in self.properties:
+            raise ValueError(f"{self.__class__.__name__}: either Items or ItemsFrom is required")
+
+    @classmethod
+    def _lambda_policy(cls):
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "dynamodb:BatchWriteItem",
+                    "s3:GetObject",
+                    "s3:GetObjectVersion",
                 ],
                 "Resource": "*",
             }],
         }
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        settings['Timeout'] = 300  # Large sets take a while to write
+        return settings
@@ -4,6 +4,7 @@ from .LambdaBackedCustomResource import LambdaBackedCustomResource
 class FindAmi(LambdaBackedCustomResource):
     props = {
         'Region': (str, False),  # Default: current region
+        'Regions': ([str], False),  # Look up in all these regions; overrides Region
         'Name': (str, True),  # Like: "amzn-ami-minimal-hvm*"
         'OwnerAlias': (str, False),
         'OwnerId': (str, False),
@@ -11,6 +12,7 @@ class FindAmi(LambdaBackedCustomResource):
         'DeviceType': (str, False),  # Defaults to: "ebs",
         'VirtualizationType': (str, False),  # Defaults to: "hvm",
         'State': (str, False),  # Defaults to: 'available',
+        'IncludeDeprecated': (bool, False),  # Defaults to: False
         'Dummy': (str, False),  # Dummy parameter to trigger updates
     }
 
@@ -45,6 +47,7 @@ class FindAmi(LambdaBackedCustomResource):
 class StartedWaiter(LambdaBackedCustomResource):
     props = {
         'InstanceIds': ((str, list), True),
+        'WaitForStatusChecks': (bool, False),  # Default: only wait for the "running" state
     }
 
     @classmethod
@@ -55,6 +58,7 @@ class StartedWaiter(LambdaBackedCustomResource):
                 "Effect": "Allow",
                 "Action": [
                     "ec2:DescribeInstanceStatus",
+                    "lambda:InvokeFunction",  # Continue waiting in a new invocation
                 ],
                 "Resource": "*",
             }],
@@ -68,5 +72,5 @@ class StartedWaiter(LambdaBackedCustomResource):
         :param settings: The default settings that will be used
         :return: updated settings
         """
-        settings['Timeout'] = 300  # We synchronously wait for EC2's to boot; need more than the default 3 seconds
+        settings['Timeout'] = 300  # We wait for EC2's to boot; continue in a new invocation after 5 minutes
         return settings
@@ -5,6 +5,9 @@ class NlbSourceIps(LambdaBackedCustomResource):
     """
     Gets the source IPs of the given Network Load Balancer
 
+    The lookup is cached for a few minutes in warm Lambda containers; change
+    `Serial` to force a new lookup.
+
     Return Attributes:
         "IPv4Addresses": ["192.0.2.1", "192.0.2.2"]
         "IPv4Address0": "192.0.2.1"
@@ -12,6 +15,7 @@ class NlbSourceIps(LambdaBackedCustomResource):
     """
     props = {
         'LoadBalancerArn': (str, True),
+        'Serial': (str, False),  # Use this to force an update, bypassing the cache
     }
 
     @classmethod
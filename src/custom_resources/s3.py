@@ -10,11 +10,14 @@ class Object(LambdaBackedCustomResource):
         'ObjectMetadata': (object, False),  # dict, default: {}  ('Metadata' is reserved)
         'ContentType': (str, False),
         'CacheControl': (str, False),
+        'ContentEncoding': (str, False),  # "gzip" to compress the Body before uploading
+        'PartSize': (int, False),  # Use multipart uploads for larger bodies. Default: 8 MiB
+        'AllowOverwrite': (bool, False),
     }
 
     @classmethod
     def _update_lambda_settings(cls, settings):
-        settings['Timeout'] = 10
+        settings['Timeout'] = 60  # Large bodies are uploaded in parts
         return settings
 
     @classmethod
@@ -24,7 +27,51 @@ class Object(LambdaBackedCustomResource):
             "Statement": [{
                 "Effect": "Allow",
                 "Action": [
+                    "s3:GetObject",  # For HeadObject
                     "s3:PutObject",
+                    "s3:AbortMultipartUpload",
+                    "s3:DeleteObject",
+                ],
+                "Resource": "*",
+            }],
+        }
+
+
+class ObjectSet(LambdaBackedCustomResource):
+    props = {
+        'Region': (str, False),  # Default: current region
+        'Bucket': (str, True),  # Bucket name
+        'Prefix': (str, False),  # Prepended to every key. Default: ''
+        'Objects': (dict, False),  # key -> string, or JSON-able content
+        'SourceArchive': (dict, False),  # {"Bucket": ..., "Key": ..., "VersionId": ...} of a zip file
+        'ObjectMetadata': (object, False),  # dict, default: {}  ('Metadata' is reserved)
+        'ContentType': (str, False),  # Default: guessed from the key
+        'CacheControl': (str, False),
+        'ContentEncoding': (str, False),  # "gzip" to compress the objects before uploading
+        'PartSize': (int, False),  # Use multipart uploads for larger objects. Default: 8 MiB
+    }
+
+    def validate(self):
+        if 'Objects' not in self.properties and 'SourceArchive' not in self.properties:
+            raise ValueError(f"{self.__class__.__name__}: either Objects or SourceArchive is required")
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        settings['Timeout'] = 300
+        settings['MemorySize'] = 512  # The objects are kept in memory
+        return settings
+
+    @classmethod
+    def _lambda_policy(cls):
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "s3:GetObject",
+                    "s3:GetObjectVersion",
+                    "s3:PutObject",
+                    "s3:AbortMultipartUpload",
                     "s3:DeleteObject",
                 ],
                 "Resource": "*",
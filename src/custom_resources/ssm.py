@@ -50,6 +50,7 @@ class Parameter(LambdaBackedCustomResource):
                     "ssm:RemoveTagsFromResource",
                     "ssm:GetParameter",
                     "secretsmanager:GetSecretValue",
+                    "secretsmanager:BatchGetSecretValue",
                 ],
                 "Resource": "*",
             }],
@@ -62,11 +63,62 @@ class Parameter(LambdaBackedCustomResource):
         return ['SsmParameter']
 
 
+class ParameterSet(LambdaBackedCustomResource):
+    """
+    Custom Resource to create or update many SSM Parameter Store parameters at once.
+
+    Parameters maps parameter names to the properties of `Parameter` (except
+    Name, ReturnValue and ReturnValueHash). Only changed parameters are written.
+    """
+
+    props = {
+        'Parameters': (dict, True),  # name -> {Type, Description, Value|ValueFrom|RandomValue, KeyId, Encoding, Tags}
+        'Tags': (Tags, False),  # Tags for all parameters
+    }
+
+    def validate(self):
+        """Validate the properties of the resource."""
+        for name, spec in self.properties.get('Parameters', {}).items():
+            if not isinstance(spec, dict):
+                continue  # E.g. an intrinsic function; the Lambda will validate it
+            if len([key for key in ('Value', 'ValueFrom', 'RandomValue') if key in spec]) != 1:
+                raise TypeError(f"{self.__class__.__name__}: {name}: Value, ValueFrom and RandomValue "
+                                f"are mutually exclusive")
+
+    @classmethod
+    def _update_lambda_settings(cls, settings):
+        """Update the CloudFormation configuration for the lambda function."""
+        settings['Timeout'] = 300  # Writes are rate limited to stay within SSM's throughput
+        return settings
+
+    @classmethod
+    def _lambda_policy(cls) -> dict:
+        """Return the policy that the lambda function needs to function."""
+        return {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Effect": "Allow",
+                "Action": [
+                    "ssm:PutParameter",
+                    "ssm:DeleteParameters",
+                    "ssm:AddTagsToResource",
+                    "ssm:RemoveTagsFromResource",
+                    "ssm:GetParameter",
+                    "ssm:GetParameters",
+                    "secretsmanager:GetSecretValue",
+                    "secretsmanager:BatchGetSecretValue",
+                ],
+                "Resource": "*",
+            }],
+        }
+
+
 class ParseDict(LambdaBackedCustomResource):
     """Custom Resource to parse a dictionary from SSM Parameter Store."""
 
     props = {
-        'Names': ([str], True),  # The parameter paths including namespace
+        'Names': ([str], False),  # The parameter paths including namespace
+        'Paths': ([str], False),  # Hierarchies to read all parameters from (recursively)
         'Serial': (str, False),  # Use this to force an update
     }
 
@@ -79,6 +131,8 @@ class ParseDict(LambdaBackedCustomResource):
                 "Effect": "Allow",
                 "Action": [
                     "ssm:GetParameters",
+                    "ssm:GetParametersByPath",
+                    "kms:Decrypt",  # For SecureString parameters
                 ],
                 "Resource": "*",
             }],
@@ -1,36 +1,80 @@
+"""
+Custom Resource to request an ACM certificate, validated through DNS.
+
+Parameters:
+ * DomainName, SubjectAlternativeNames, Region, Tags: see ACM RequestCertificate
+ * HostedZoneId: optional: Route53 hosted zone to create the validation
+   records in, all in a single change batch. They are deleted again (from
+   the previous zone when HostedZoneId changes), except the ones that are
+   shared with other certificates in the same region.
+ * WaitForIssuance: optional, default false: wait until the certificate is
+   ISSUED (only useful when the validation records are created, e.g. with
+   HostedZoneId). The wait continues in new invocations when needed.
+
+Return:
+  Ref: ARN of the certificate
+  Attributes:
+   - DnsRecords: JSON-encoded {name: value} of the validation records
+"""
 import functools
 import json
 import os
 import re
-import time
 import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared import strtobool
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.continuation import ResumableMixin
+from lambda_shared.poller import Poller, PollTimeout, print_progress
+from lambda_shared.tags import reconcile_tags
 from _metadata import CUSTOM_RESOURCE_NAME
 
 REGION = os.environ['AWS_REGION']
-POLL_INTERVAL_SECONDS = 5
+# ACM fills in the validation records a few domains at a time, usually within
+# seconds to a minute: check often at first, then back off gently
+POLL_INITIAL_INTERVAL_SECONDS = 2
+POLL_MAX_INTERVAL_SECONDS = 15
+POLL_MULTIPLIER = 1.5
+# Issuance takes minutes after the validation records are visible
+ISSUANCE_POLL_INITIAL_INTERVAL_SECONDS = 10
+ISSUANCE_POLL_MAX_INTERVAL_SECONDS = 60
+VALIDATION_RECORD_TTL = 300
+# ListCertificates only returns RSA_2048 certificates, unless asked for other key types
+KEY_TYPES = ['RSA_1024', 'RSA_2048', 'RSA_3072', 'RSA_4096', 'EC_prime256v1', 'EC_secp384r1', 'EC_secp521r1']
 NOT_ALLOWED_IN_TOKEN = re.compile(r'\W+')
 
 
-class DomainValidationNotThere(Exception):
-    pass
+def collect_resource_records(describe_certificate_response, records: typing.Dict[str, dict]) -> typing.List[str]:
+    """
+    Add the validation ResourceRecord of every domain that has one to `records` ({domain: ResourceRecord}).
 
+    :return: the domains of the certificate that don't have a validation record yet
+    """
+    certificate_description = describe_certificate_response['Certificate']
+    # "DomainValidationOptions" may be missing, incomplete, or not have a ResourceRecord yet
+    for domain_validation_options in certificate_description.get("DomainValidationOptions", []):
+        if 'ResourceRecord' in domain_validation_options:
+            records[domain_validation_options['DomainName']] = domain_validation_options['ResourceRecord']
+    domains = certificate_description.get('SubjectAlternativeNames', [certificate_description['DomainName']])
+    return sorted(set(domains) - set(records.keys()))
 
-def get_validation_records(describe_stack_response):
-    result = {}
-    certificate_description = describe_stack_response['Certificate']
-    # If there are no DomainValidationOptions available yet, "DomainValidationOptions" may be
-    # missing or not have a ResourceRecord. In both cases we raise an DomainValidationNotThere
-    if "DomainValidationOptions" not in certificate_description:
-        raise DomainValidationNotThere()
-    for domain_validation_options in certificate_description["DomainValidationOptions"]:
-        try:
-            result[domain_validation_options['ResourceRecord']['Name']] = \
-                domain_validation_options['ResourceRecord']['Value']
-        except KeyError:
-            raise DomainValidationNotThere()
-    return json.dumps(result)
+
+def deduplicate_resource_records(records: typing.Dict[str, dict]) -> typing.List[dict]:
+    """
+    Return the validation ResourceRecord's, deduplicated by name.
+
+    Domains may share a validation record (e.g. example.com and *.example.com).
+    """
+    return list({
+        resource_record['Name']: resource_record
+        for resource_record in records.values()
+    }.values())
+
+
+def validated_domain(domain: str) -> str:
+    """Return the domain that is validated for `domain`: *.example.com is validated with the record of example.com."""
+    return domain[2:] if domain.startswith('*.') else domain
 
 
 def add_or_replace_tag(tags: list, key: str, value: str) -> None:
@@ -41,7 +85,7 @@ def add_or_replace_tag(tags: list, key: str, value: str) -> None:
     tags.append({'Key': key, 'Value': value})
 
 
-class DnsValidatedCertificate(CloudFormationCustomResource):
+class DnsValidatedCertificate(ResumableMixin, ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use version ARN instead
 
@@ -51,6 +95,8 @@ class DnsValidatedCertificate(CloudFormationCustomResource):
         self.subject_alternative_names = self.resource_properties.get(
             'SubjectAlternativeNames', None)
         self.tags = self.resource_properties.get('Tags', [])
+        self.hosted_zone_id = self.resource_properties.get('HostedZoneId', None)
+        self.wait_for_issuance = strtobool(str(self.resource_properties.get('WaitForIssuance', 'false')))
 
         add_or_replace_tag(self.tags, "cr:cloudformation:stack-id", self.stack_id)
 
@@ -70,37 +116,25 @@ class DnsValidatedCertificate(CloudFormationCustomResource):
                     new_tags: typing.List[typing.Dict[str, str]],
                     old_tags: typing.List[typing.Dict[str, str]] = None
                     ) -> None:
-        if old_tags is None:
-            old_tags = []
-
-        if len(old_tags) > 0:
-            new_tags_keys = {
-                tag['Key']: True
-                for tag in new_tags
-            }
-
-            to_delete = []
-
-            for tag in old_tags:
-                if tag['Key'] not in new_tags_keys:
-                    to_delete.append({
-                        'Key': tag['Key']
-                        # omit 'value' to remove the tag regardless of value
-                    })
-
-            if len(to_delete) > 0:
-                self.regional_acm_client().remove_tags_from_certificate(
-                    CertificateArn=self.physical_resource_id,
-                    Tags=to_delete,
-                )
-
-        if len(new_tags) > 0:
-            self.regional_acm_client().add_tags_to_certificate(
+        reconcile_tags(
+            old_tags, new_tags,
+            add=lambda tags: self.regional_acm_client().add_tags_to_certificate(
+                CertificateArn=self.physical_resource_id,
+                Tags=tags,
+            ),
+            remove=lambda keys: self.regional_acm_client().remove_tags_from_certificate(
                 CertificateArn=self.physical_resource_id,
-                Tags=new_tags,
-            )
+                # omit 'value' to remove the tag regardless of value
+                Tags=[{'Key': key} for key in keys],
+            ),
+        )
 
     def create(self):
+        state = self.get_continuation_state()
+        if state is not None:
+            # Certificate was already requested by a previous invocation
+            return self.get_attributes(state)
+
         idempotency_token = NOT_ALLOWED_IN_TOKEN.sub('', self.context.aws_request_id)[:32]
 
         kwargs = {
@@ -121,22 +155,177 @@ class DnsValidatedCertificate(CloudFormationCustomResource):
 
         return self.get_attributes()
 
-    def get_attributes(self):
-        attributes = {}
-        while 'DnsRecords' not in attributes:
-            try:
-                description = self.regional_acm_client().describe_certificate(CertificateArn=self.physical_resource_id)
-                print("Waiting for DNS records...")
-                attributes['DnsRecords'] = get_validation_records(description)
-            except DomainValidationNotThere:
-                if self.context.get_remaining_time_in_millis() < POLL_INTERVAL_SECONDS * 1000 * 2:
-                    print("DNS validation records still not available and time is up. Abort...")
-                    raise RuntimeError("Timeout waiting for DNS validation records")
-                print("Waiting for DNS validation records to become available...")
-                time.sleep(POLL_INTERVAL_SECONDS)
-        return attributes
+    def get_attributes(self, state: typing.Optional[dict] = None):
+        state = state or {}
+        if 'DnsRecords' not in state:
+            resource_records = self.wait_for_validation_records(state)
+            if self.hosted_zone_id is not None:
+                self.upsert_validation_records(resource_records)
+            state['DnsRecords'] = json.dumps({
+                resource_record['Name']: resource_record['Value']
+                for resource_record in resource_records
+            })
+            del state['Records']  # Keep the continuation state small
+
+        if self.wait_for_issuance:
+            self.wait_until_issued(state)
+
+        return {'DnsRecords': state['DnsRecords']}
+
+    def wait_for_validation_records(self, state: dict) -> typing.List[dict]:
+        """
+        Wait until every domain has its validation record.
+
+        The records found so far are kept in `state`, and survive continuations.
+        """
+        records = state.setdefault('Records', {})
+
+        def validation_records() -> typing.Optional[typing.List[dict]]:
+            description = self.regional_acm_client().describe_certificate(CertificateArn=self.physical_resource_id)
+            pending = collect_resource_records(description, records)
+            if len(pending) > 0:
+                print(f"Validation records available for {len(records)} domains, "
+                      f"waiting for {len(pending)}: {', '.join(pending[:10])}{'...' if len(pending) > 10 else ''}")
+                return None
+            return deduplicate_resource_records(records)
+
+        poller = Poller(
+            initial_interval=POLL_INITIAL_INTERVAL_SECONDS,
+            max_interval=POLL_MAX_INTERVAL_SECONDS,
+            multiplier=POLL_MULTIPLIER,
+            context=self.context,
+            on_progress=print_progress("DNS validation records"),
+        )
+        try:
+            return poller.poll(validation_records)
+        except PollTimeout:
+            print(f"DNS validation records still not available for all domains and time is up "
+                  f"({len(records)} found so far). Continuing in a new invocation...")
+            self.continue_later(state)
+
+    def upsert_validation_records(self, resource_records: typing.List[dict]) -> None:
+        """Create or update all validation records in a single change batch."""
+        print(f"Upserting {len(resource_records)} validation records in {self.hosted_zone_id}")
+        self.get_boto3_client('route53').change_resource_record_sets(
+            HostedZoneId=self.hosted_zone_id,
+            ChangeBatch={
+                'Comment': f"DNS validation of {self.physical_resource_id}",
+                'Changes': [
+                    {
+                        'Action': 'UPSERT',
+                        'ResourceRecordSet': {
+                            'Name': resource_record['Name'],
+                            'Type': resource_record['Type'],
+                            'TTL': VALIDATION_RECORD_TTL,
+                            'ResourceRecords': [{'Value': resource_record['Value']}],
+                        },
+                    }
+                    for resource_record in resource_records
+                ],
+            },
+        )
+
+    def domains_of_other_certificates(self) -> typing.Set[str]:
+        """Return the validated domains of all other certificates in the region."""
+        acm = self.regional_acm_client()
+        domains = set()
+        for page in acm.get_paginator('list_certificates').paginate(Includes={'keyTypes': KEY_TYPES}):
+            for summary in page['CertificateSummaryList']:
+                if summary['CertificateArn'] == self.physical_resource_id:
+                    continue
+                names = [summary['DomainName'], *summary.get('SubjectAlternativeNameSummaries', [])]
+                if summary.get('HasAdditionalSubjectAlternativeNames'):
+                    names = acm.describe_certificate(
+                        CertificateArn=summary['CertificateArn'],
+                    )['Certificate']['SubjectAlternativeNames']
+                domains.update(validated_domain(name) for name in names)
+        return domains
+
+    def validation_records(self) -> typing.Dict[str, dict]:
+        """Return the validation ResourceRecord of every domain of the certificate, as {domain: ResourceRecord}."""
+        records = {}
+        collect_resource_records(
+            self.regional_acm_client().describe_certificate(CertificateArn=self.physical_resource_id),
+            records,
+        )
+        return records
+
+    def delete_validation_records(self, hosted_zone_id: str, records: typing.Dict[str, dict]) -> None:
+        """
+        Delete the validation records ({domain: ResourceRecord}) from `hosted_zone_id`, in a single change batch.
+
+        Records of domains that other certificates use as well are kept, as are
+        records that were changed since (they are not ours anymore).
+        """
+        shared_domains = {validated_domain(domain) for domain in records.keys()} & self.domains_of_other_certificates()
+        shared_names = {
+            resource_record['Name']
+            for domain, resource_record in records.items()
+            if validated_domain(domain) in shared_domains
+        }
+        if len(shared_names) > 0:
+            print(f"Keeping validation records used by other certificates: {', '.join(sorted(shared_names))}")
+
+        route53 = self.get_boto3_client('route53')
+        record_sets = []
+        for resource_record in deduplicate_resource_records(records):
+            if resource_record['Name'] in shared_names:
+                continue
+            record_set = next(iter(route53.list_resource_record_sets(
+                HostedZoneId=hosted_zone_id,
+                StartRecordName=resource_record['Name'],
+                StartRecordType=resource_record['Type'],
+                MaxItems='1',
+            )['ResourceRecordSets']), None)
+            # DELETE needs the exact record set, and fails the whole batch when one doesn't exist
+            if record_set is not None and \
+                    record_set['Name'].lower() == resource_record['Name'].lower() and \
+                    record_set['Type'] == resource_record['Type'] and \
+                    record_set.get('ResourceRecords') == [{'Value': resource_record['Value']}]:
+                record_sets.append(record_set)
+
+        if len(record_sets) == 0:
+            print(f"No validation records to delete in {hosted_zone_id}")
+            return
+        print(f"Deleting {len(record_sets)} validation records in {hosted_zone_id}")
+        route53.change_resource_record_sets(
+            HostedZoneId=hosted_zone_id,
+            ChangeBatch={
+                'Comment': f"DNS validation of {self.physical_resource_id} (deleted)",
+                'Changes': [
+                    {'Action': 'DELETE', 'ResourceRecordSet': record_set}
+                    for record_set in record_sets
+                ],
+            },
+        )
+
+    def wait_until_issued(self, state: dict) -> None:
+        def issued() -> bool:
+            status = self.regional_acm_client().describe_certificate(
+                CertificateArn=self.physical_resource_id,
+            )['Certificate']['Status']
+            if status in ('FAILED', 'VALIDATION_TIMED_OUT', 'REVOKED'):
+                raise RuntimeError(f"Certificate {self.physical_resource_id} is {status}")
+            return status == 'ISSUED'
+
+        poller = Poller(
+            initial_interval=ISSUANCE_POLL_INITIAL_INTERVAL_SECONDS,
+            max_interval=ISSUANCE_POLL_MAX_INTERVAL_SECONDS,
+            context=self.context,
+            on_progress=print_progress("the certificate to be issued"),
+        )
+        try:
+            poller.poll(issued)
+        except PollTimeout:
+            print("Certificate not issued yet and time is up. Continuing in a new invocation...")
+            self.continue_later(state)
 
     def update(self):
+        state = self.get_continuation_state()
+        if state is not None:
+            # Update was already performed by a previous invocation
+            return self.get_attributes(state)
+
         if self.has_property_changed('Region') or \
                 self.has_property_changed('DomainName'):
             return self.create()
@@ -152,21 +341,35 @@ class DnsValidatedCertificate(CloudFormationCustomResource):
                 return self.create()
                 # CloudFormation will call delete() on the old resource
 
+        old_hosted_zone_id = self.old_resource_properties.get('HostedZoneId', None)
+        if old_hosted_zone_id is not None and old_hosted_zone_id != self.hosted_zone_id:
+            self.delete_validation_records(old_hosted_zone_id, self.validation_records())
+
+        old_tags = list(self.old_resource_properties.get('Tags', []))
+        # Was added by the previous invocation as well
+        add_or_replace_tag(old_tags, "cr:cloudformation:stack-id", self.stack_id)
         self.update_tags(
             new_tags=self.tags,
-            old_tags=self.old_resource_properties.get('Tags', [])
+            old_tags=old_tags,
         )
 
         return self.get_attributes()
 
     def delete(self):
         try:
+            records = {}
+            if self.hosted_zone_id is not None and self.physical_resource_id.startswith('arn:'):
+                records = self.validation_records()
             self.regional_acm_client().delete_certificate(
                 CertificateArn=self.physical_resource_id,
             )  # delete_certificate does not return anything
         except self.regional_acm_client().exceptions.ResourceNotFoundException:
             # Certificate was already deleted
-            pass
+            return
+
+        # Only after the certificate is gone: it may still be in use, and needs them to renew
+        if len(records) > 0:
+            self.delete_validation_records(self.hosted_zone_id, records)
 
 
 handler = DnsValidatedCertificate.get_handler()
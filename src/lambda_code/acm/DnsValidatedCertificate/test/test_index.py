@@ -0,0 +1,122 @@
+import os
+os.environ['AWS_REGION'] = 'eu-west-1'
+
+from unittest import mock  # noqa: E402
+
+from ..index import DnsValidatedCertificate  # noqa: E402
+
+CERTIFICATE_ARN = 'arn:aws:acm:eu-west-1:123456789012:certificate/this'
+STACK_ID = 'arn:aws:cloudformation:eu-west-1:123456789012:stack/example/guid'
+
+
+class Context:
+    aws_request_id = 'request'
+
+    def get_remaining_time_in_millis(self):
+        return 60000
+
+
+def resource_record(domain):
+    return {'Name': f"_token.{domain}.", 'Type': 'CNAME', 'Value': f"_value.{domain}.acm-validations.aws."}
+
+
+def acm_mock(other_certificates):
+    acm = mock.Mock()
+    acm.describe_certificate.return_value = {'Certificate': {
+        'DomainName': 'example.com',
+        'SubjectAlternativeNames': ['example.com', '*.example.com', 'shared.example.com'],
+        'DomainValidationOptions': [
+            {'DomainName': 'example.com', 'ResourceRecord': resource_record('example.com')},
+            {'DomainName': '*.example.com', 'ResourceRecord': resource_record('example.com')},
+            {'DomainName': 'shared.example.com', 'ResourceRecord': resource_record('shared.example.com')},
+        ],
+        'Status': 'ISSUED',
+    }}
+    acm.get_paginator.return_value.paginate.return_value = [{'CertificateSummaryList': [
+        {'CertificateArn': CERTIFICATE_ARN, 'DomainName': 'example.com'},
+        *other_certificates,
+    ]}]
+    return acm
+
+
+def route53_mock(zone_records):
+    route53 = mock.Mock()
+
+    def list_resource_record_sets(HostedZoneId, StartRecordName, StartRecordType, MaxItems):
+        record_sets = sorted(zone_records[HostedZoneId], key=lambda r: r['Name'])
+        return {'ResourceRecordSets': [r for r in record_sets if r['Name'] >= StartRecordName][:int(MaxItems)]}
+    route53.list_resource_record_sets.side_effect = list_resource_record_sets
+    return route53
+
+
+def record_set(domain):
+    record = resource_record(domain)
+    return {'Name': record['Name'], 'Type': 'CNAME', 'TTL': 300, 'ResourceRecords': [{'Value': record['Value']}]}
+
+
+def certificate(acm, route53, properties, old_properties=None):
+    DnsValidatedCertificate.BOTO3_CLIENTS['route53'] = route53
+    o = DnsValidatedCertificate()
+    o.event = {'RequestType': 'Update' if old_properties else 'Delete'}
+    o.context = Context()
+    o.physical_resource_id = CERTIFICATE_ARN
+    o.resource_properties = properties
+    o.old_resource_properties = old_properties or {}
+    o.get_boto3_session = mock.Mock()
+    o.get_boto3_session.return_value.client.return_value = acm
+    o.validate()
+    return o
+
+
+def deleted_names(route53):
+    return [
+        [change['ResourceRecordSet']['Name'] for change in call.kwargs['ChangeBatch']['Changes']]
+        for call in route53.change_resource_record_sets.call_args_list
+        if call.kwargs['ChangeBatch']['Changes'][0]['Action'] == 'DELETE'
+    ]
+
+
+@mock.patch.object(DnsValidatedCertificate, 'stack_id', STACK_ID, create=True)
+def test_delete_keeps_shared_records():
+    acm = acm_mock([{'CertificateArn': 'other', 'DomainName': 'shared.example.com'}])
+    route53 = route53_mock({'Z1': [record_set('example.com'), record_set('shared.example.com')]})
+    o = certificate(acm, route53, {'DomainName': 'example.com', 'HostedZoneId': 'Z1'})
+    o.delete()
+
+    acm.delete_certificate.assert_called_once_with(CertificateArn=CERTIFICATE_ARN)
+    assert deleted_names(route53) == [['_token.example.com.']]
+
+
+@mock.patch.object(DnsValidatedCertificate, 'stack_id', STACK_ID, create=True)
+def test_delete_skips_changed_records():
+    acm = acm_mock([])
+    changed = {**record_set('shared.example.com'), 'ResourceRecords': [{'Value': 'someone-else'}]}
+    route53 = route53_mock({'Z1': [record_set('example.com'), changed]})
+    o = certificate(acm, route53, {'DomainName': 'example.com', 'HostedZoneId': 'Z1'})
+    o.delete()
+
+    assert deleted_names(route53) == [['_token.example.com.']]
+
+
+@mock.patch.object(DnsValidatedCertificate, 'stack_id', STACK_ID, create=True)
+def test_update_hosted_zone_moves_records():
+    acm = acm_mock([])
+    route53 = route53_mock({'Z1': [record_set('example.com'), record_set('shared.example.com')], 'Z2': []})
+    o = certificate(
+        acm, route53,
+        {'DomainName': 'example.com', 'HostedZoneId': 'Z2'},
+        {'DomainName': 'example.com', 'HostedZoneId': 'Z1'},
+    )
+    o.update()
+
+    changes = {
+        call.kwargs['HostedZoneId']: sorted(
+            (change['Action'], change['ResourceRecordSet']['Name'])
+            for change in call.kwargs['ChangeBatch']['Changes']
+        )
+        for call in route53.change_resource_record_sets.call_args_list
+    }
+    assert changes == {
+        'Z1': [('DELETE', '_token.example.com.'), ('DELETE', '_token.shared.example.com.')],
+        'Z2': [('UPSERT', '_token.example.com.'), ('UPSERT', '_token.shared.example.com.')],
+    }
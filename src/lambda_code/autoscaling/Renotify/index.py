@@ -1,19 +1,146 @@
+"""
+Custom Resource to re-send the notifications of an AutoScalingGroup.
+
+For every topic configured for `autoscaling:EC2_INSTANCE_LAUNCH`, a launch
+notification is sent for every InService instance, with the same payload
+AutoScaling sends. Topics configured for other notification types get an
+`autoscaling:TEST_NOTIFICATION`.
+
+The messages are sent with PublishBatch, per topic, for all topics
+concurrently. Entries that fail are retried with backoff.
+
+Parameters:
+ * AutoScalingGroupName: required
+
+Return:
+  Attributes:
+   - MessageCount: the number of messages sent
+"""
+import datetime
 import json
+import time
+import typing
+import uuid
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.concurrency import chunked, map_concurrently
+from lambda_shared.retry import call_with_backoff, full_jitter, remaining_seconds
 from _metadata import CUSTOM_RESOURCE_NAME
 
+LAUNCH = 'autoscaling:EC2_INSTANCE_LAUNCH'
+TEST_NOTIFICATION = 'autoscaling:TEST_NOTIFICATION'
+MAX_ENTRIES_PER_BATCH = 10  # Limit of PublishBatch
+MAX_BATCH_ATTEMPTS = 5
+
+
+def notification_time() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def launch_message(asg: dict, instance: dict, cause: str) -> dict:
+    """Build the message AutoScaling sends when `instance` is launched."""
+    activity_id = str(uuid.uuid4())
+    now = notification_time()
+    return {
+        "Origin": "EC2",
+        "Destination": "AutoScalingGroup",
+        "Progress": 50,
+        "AccountId": asg['AutoScalingGroupARN'].split(':')[4],
+        "Description": f"Launching a new EC2 instance: {instance['InstanceId']}",
+        "RequestId": activity_id,
+        "EndTime": now,
+        "AutoScalingGroupARN": asg['AutoScalingGroupARN'],
+        "ActivityId": activity_id,
+        "StartTime": now,
+        "Service": "AWS Auto Scaling",
+        "Time": now,
+        "EC2InstanceId": instance['InstanceId'],
+        "StatusCode": "InProgress",
+        "StatusMessage": "",
+        "Details": {
+            "Availability Zone": instance['AvailabilityZone'],
+        },
+        "AutoScalingGroupName": asg['AutoScalingGroupName'],
+        "Cause": cause,
+        "Event": LAUNCH,
+    }
+
+
+def notification_test_message(asg: dict) -> dict:
+    """Build the message AutoScaling sends when a notification configuration is created."""
+    return {
+        "AccountId": asg['AutoScalingGroupARN'].split(':')[4],
+        "RequestId": str(uuid.uuid4()),
+        "AutoScalingGroupARN": asg['AutoScalingGroupARN'],
+        "AutoScalingGroupName": asg['AutoScalingGroupName'],
+        "Service": "AWS Auto Scaling",
+        "Event": TEST_NOTIFICATION,
+        "Time": notification_time(),
+    }
+
+
+def publish_batch(
+        sns_client,
+        topic_arn: str,
+        messages: typing.List[dict],
+        context=None,
+        sleep: typing.Callable[[float], None] = time.sleep,
+) -> None:
+    """
+    Publish (at most MAX_ENTRIES_PER_BATCH) messages with PublishBatch, retrying failed entries with backoff.
+
+    :raises RuntimeError: if entries failed because of the request, or still fail after MAX_BATCH_ATTEMPTS
+    """
+    entries = [
+        {'Id': str(i), 'Message': json.dumps(message)}
+        for i, message in enumerate(messages)
+    ]
+    attempt = 0
+    while True:
+        response = call_with_backoff(
+            lambda: sns_client.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=entries),
+            context=context,
+        )
+        attempt += 1
+        failed = response.get('Failed', [])
+        if len(failed) == 0:
+            return
+
+        sender_faults = [f for f in failed if f.get('SenderFault')]
+        if len(sender_faults) > 0:
+            raise RuntimeError(f"Could not publish to {topic_arn}: " + ", ".join(
+                f"{f['Code']}: {f.get('Message')}" for f in sender_faults
+            ))
 
-class RenotifyAsg(CloudFormationCustomResource):
+        delay = full_jitter(attempt)
+        if attempt >= MAX_BATCH_ATTEMPTS or remaining_seconds(context) - delay < 5:
+            raise RuntimeError(f"{len(failed)} messages to {topic_arn} still failed after {attempt} attempts")
+        print(f"{len(failed)} messages to {topic_arn} failed, retrying in {delay:.1f}s")
+        failed_ids = {f['Id'] for f in failed}
+        entries = [entry for entry in entries if entry['Id'] in failed_ids]
+        sleep(delay)
+
+
+class RenotifyAsg(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
     def validate(self):
         self.asg_name = self.resource_properties['AutoScalingGroupName']
 
-    def create(self):
-        as_client = self.get_boto3_client('autoscaling')
-        sns_client = self.get_boto3_client('sns')
+    def messages_by_topic(self, as_client) -> typing.Dict[str, typing.List[dict]]:
+        """Return the messages to send, grouped by topic."""
+        asg = as_client.describe_auto_scaling_groups(
+            AutoScalingGroupNames=[self.asg_name],
+        )['AutoScalingGroups'][0]
+        instances = [
+            instance
+            for instance in asg['Instances']
+            if instance['LifecycleState'] == 'InService'
+        ]
+        cause = f"Renotified by CloudFormation stack {self.stack_id}"
 
+        notification_types = {}
         notification_paginator = as_client.get_paginator('describe_notification_configurations')
         notification_iterator = notification_paginator.paginate(
             AutoScalingGroupNames=[
@@ -22,15 +149,32 @@ class RenotifyAsg(CloudFormationCustomResource):
         )
         for page in notification_iterator:
             for notification in page['NotificationConfigurations']:
-                sns_client.publish(
-                    TopicArn=notification['TopicARN'],
-                    Message=json.dumps({
-                        "AutoScalingGroupName": self.asg_name,
-                        # TODO: this is incomplete; add additional fields
-                    }),
-                )
-
-        return {}
+                notification_types.setdefault(notification['TopicARN'], set()).add(notification['NotificationType'])
+
+        messages = {}
+        for topic_arn, types in notification_types.items():
+            if LAUNCH in types:
+                messages[topic_arn] = [launch_message(asg, instance, cause) for instance in instances]
+            else:
+                messages[topic_arn] = [notification_test_message(asg)]
+        return messages
+
+    def create(self):
+        as_client = self.get_boto3_client('autoscaling')
+        sns_client = self.get_boto3_client('sns')
+
+        messages = self.messages_by_topic(as_client)
+        print(f"Sending {sum(len(m) for m in messages.values())} messages to {len(messages)} topics")
+
+        def publish_to_topic(topic_arn: str) -> None:
+            for batch in chunked(messages[topic_arn], MAX_ENTRIES_PER_BATCH):
+                publish_batch(sns_client, topic_arn, batch, context=self.context)
+
+        map_concurrently(publish_to_topic, sorted(messages.keys()))
+
+        return {
+            'MessageCount': sum(len(m) for m in messages.values()),
+        }
 
     def update(self):
         return self.create()
@@ -1,13 +1,14 @@
 import os
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
 REGION = os.environ['AWS_REGION']
 
 
-class LayerVersion(CloudFormationCustomResource):
+class LayerVersion(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use version ARN instead
 
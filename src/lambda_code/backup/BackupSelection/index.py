@@ -1,6 +1,7 @@
 import os
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
@@ -10,7 +11,7 @@ except ImportError:
 REGION = os.environ['AWS_REGION']
 
 
-class BackupPlan(CloudFormationCustomResource):
+class BackupPlan(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use SelectionId instead
 
@@ -1,65 +1,115 @@
+"""
+Custom Resource to expose the tags of the stack
+
+Parameters:
+ * Omit: list of tag keys to leave out
+ * Set: dict of tags to add or override
+ * Projections: optional: name -> {"Omit": [...], "Set": {...}}: additional
+   variants of the tags, all served from a single lookup of the stack tags
+
+Return:
+  Attributes:
+   - {key}: the value of every tag (after Omit/Set)
+   - TagDict: {key: value} of all tags (after Omit/Set)
+   - TagList: [{"Key": key, "Value": value}] of all tags (after Omit/Set)
+   - {projection}.{key}, {projection}.TagDict, {projection}.TagList: the same,
+     for every projection
+
+The stack tags are cached for CACHE_TTL_SECONDS in warm Lambda containers,
+by stack ID, so all Tags resources of a stack share a single DescribeStacks.
+
+Every tag is returned three times, which can exceed the 4096 byte limit of
+the response. If so, TagDict's are dropped first, then the per-key
+attributes; if that is not enough, the largest remaining attributes are
+stored in SSM parameters, and returned as `{attribute}.Parameter` instead.
+"""
 import json
 import os
-import traceback
 
-import six
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cache import ttl_cache
+from lambda_shared.cfn_response import ResponseSenderMixin, finish_function_nojson
+from lambda_shared.clients import regional_client
+from lambda_shared.compaction import CompactionPolicy, DropRule
+from lambda_shared.retry import call_with_backoff
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
 REGION = os.environ['AWS_REGION']
+# Short, since tags can change with every stack update. `Dummy` changes with every template
+# generation, so it can't be used to bypass the cache.
+CACHE_TTL_SECONDS = 30
 
 
-class Tags(CloudFormationCustomResource):
+@ttl_cache(ttl=CACHE_TTL_SECONDS, key=lambda cfn_client, stack_id: stack_id)
+def describe_stack_tags(cfn_client, stack_id: str) -> dict:
+    # Many stacks updating at once get DescribeStacks throttled: back off and retry
+    stack_description = call_with_backoff(lambda: cfn_client.describe_stacks(
+        StackName=stack_id,
+    ))
+
+    stack_description = stack_description['Stacks'][0]
+    return {
+        tag['Key']: tag['Value']
+        for tag in stack_description['Tags']
+    }
+
+
+def project_tags(tags: dict, omit: list, set_: dict) -> dict:
+    """Apply Omit and Set to `tags`, and return the attributes."""
+    tags_dict = {
+        key: value
+        for key, value in tags.items()
+        if key not in omit
+    }
+    tags_dict.update(set_)
+
+    attrs = tags_dict.copy()
+    attrs['TagDict'] = tags_dict.copy()
+    attrs['TagList'] = [
+        {'Key': k, 'Value': v}
+        for k, v in tags_dict.items()
+    ]
+    return attrs
+
+
+def is_derived_attribute(key: str) -> bool:
+    """TagDict's and per-key attributes hold the same information as the TagList."""
+    return key.split('.')[-1] != 'TagList'
+
+
+class Tags(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    RESPONSE_COMPACTION = CompactionPolicy(
+        drop=[
+            DropRule("TagDict", lambda key: key.split('.')[-1] == 'TagDict'),
+            DropRule("per-key attributes", is_derived_attribute),
+        ],
+        offload=True,
+    )
 
     def __init__(self, *args, **kwargs):
         super(Tags, self).__init__(*args, **kwargs)
-        self.finish_function = self.finish_function_nojson
-        # Can be removed once https://github.com/iRobotCorporation/cfn-custom-resource/pull/7 is accepted,
-        # merged & released
+        self.finish_function = finish_function_nojson
 
     def validate(self):
         self.omit = self.resource_properties.get('Omit', [])
         self.set = self.resource_properties.get('Set', {})
+        self.projections = self.resource_properties.get('Projections', {})
 
     def create(self):
         stack_region = self.stack_id.split(':')[3]
 
         print(f"Getting tags set on {self.stack_id} in region {stack_region}")
 
-        boto_client_in_region = self.get_boto3_session().client(
-            'cloudformation',
-            region_name=stack_region
-        )
-
-        stack_description = boto_client_in_region.describe_stacks(
-            StackName=self.stack_id,
-        )
-
-        stack_description = stack_description['Stacks'][0]
-        tags_dict = {
-            tag['Key']: tag['Value']
-            for tag in stack_description['Tags']
-        }
+        tags_dict = describe_stack_tags(regional_client('cloudformation', stack_region), self.stack_id)
         print("Found tags:")
         print(json.dumps(tags_dict))
 
-        for key in self.omit:
-            tags_dict.pop(key, None)
-
-        for key, value in self.set.items():
-            tags_dict[key] = value
-
-        print("Tags after Omit/Set:")
-        print(json.dumps(tags_dict))
-
-        attrs = tags_dict.copy()
-        attrs['TagDict'] = tags_dict.copy()
-        attrs['TagList'] = [
-            {'Key': k, 'Value': v}
-            for k, v in tags_dict.items()
-        ]
+        attrs = project_tags(tags_dict, self.omit, self.set)
+        for name, projection in self.projections.items():
+            for key, value in project_tags(tags_dict, projection.get('Omit', []), projection.get('Set', {})).items():
+                attrs[f"{name}.{key}"] = value
 
         print("Returning Attributes:")
         print(json.dumps(attrs))
@@ -72,34 +122,5 @@ class Tags(CloudFormationCustomResource):
     def delete(self):
         pass
 
-    @classmethod
-    def finish_function_nojson(cls, resource):
-        # Can be removed once https://github.com/iRobotCorporation/cfn-custom-resource/pull/7 is accepted,
-        # merged & released
-        physical_resource_id = resource.physical_resource_id
-        if physical_resource_id is None:
-            physical_resource_id = resource.context.log_stream_name
-        default_reason = ("See the details in CloudWatch Log Stream: {}".format(resource.context.log_stream_name))
-        outputs = {}
-        for key, value in six.iteritems(resource.resource_outputs):
-            outputs[key] = value
-        response_content = {
-            "Status": resource.status,
-            "Reason": resource.failure_reason or default_reason,
-            "PhysicalResourceId": physical_resource_id,
-            "StackId": resource.event['StackId'],
-            "RequestId": resource.event['RequestId'],
-            "LogicalResourceId": resource.event['LogicalResourceId'],
-            "Data": outputs
-        }
-        resource._base_logger.debug("Response body: {}".format(json.dumps(response_content)))
-        if cls.RAISE_ON_FAILURE and resource.status == cls.STATUS_FAILED:
-            raise Exception(resource.failure_reason)
-        try:
-            return resource.send_response_function(resource, resource.response_url, response_content)
-        except Exception as e:
-            resource._base_logger.error("send response failed: {}".format(e))
-            resource._base_logger.debug(traceback.format_exc())
-
 
 handler = Tags.get_handler()
@@ -4,11 +4,16 @@ Custom Resource for managing User Pool Clients.
 Parameters:
  * See http://boto3.readthedocs.io/en/latest/reference/services/cognito-idp.html#CognitoIdentityProvider.Client.create_user_pool_client
 
+On update, the client is only updated when its current configuration differs
+from the parameters: stacks are often redeployed without changes, and
+Cognito throttles concurrent updates. Throttled calls are retried with backoff.
 """
 
 import os
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.retry import call_with_backoff
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
@@ -26,7 +31,33 @@ def int_or_none(value):
     return None if value is None else int(value)
 
 
-class UserPoolClient(CloudFormationCustomResource):
+def normalize(value):
+    """Make parameter values comparable: the order of lists doesn't matter."""
+    if isinstance(value, list):
+        return sorted(value)
+    return value
+
+
+def is_up_to_date(current: dict, params: dict, old_params: dict) -> bool:
+    """
+    Return whether the client configuration `current` already matches `params`.
+
+    UpdateUserPoolClient resets the parameters that are not given to their
+    default. Parameters that are not in `params` are only ignored if they were
+    not in `old_params` either, i.e. when they are at their default already.
+    """
+    for key, value in params.items():
+        if normalize(current.get(key)) != normalize(value):
+            print(f"{key} changed")
+            return False
+    removed = set(old_params.keys()) - set(params.keys())
+    if len(removed) > 0:
+        print(f"{', '.join(sorted(removed))} removed")
+        return False
+    return True
+
+
+class UserPoolClient(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use Client Pool Id instead
 
@@ -59,11 +90,11 @@ class UserPoolClient(CloudFormationCustomResource):
         except (AttributeError, KeyError):
             return False
 
-    def create(self):
+    def params(self) -> dict:
+        """Return the parameters for UpdateUserPoolClient (CreateUserPoolClient also takes GenerateSecret)."""
         params = {
             'UserPoolId': self.user_pool_id,
             'ClientName': self.client_name,
-            'GenerateSecret': self.generate_secret,
             'ReadAttributes': self.read_attributes,
             'WriteAttributes': self.write_attributes,
             'ExplicitAuthFlows': self.explicit_auth_flows,
@@ -80,11 +111,16 @@ class UserPoolClient(CloudFormationCustomResource):
             'TokenValidityUnits': self.token_validity_units,
         }
         # Remove all params that are None
-        params = {k: v for k, v in params.items() if v is not None}
+        return {k: v for k, v in params.items() if v is not None}
+
+    def create(self):
+        params = self.params()
+        if self.generate_secret is not None:
+            params['GenerateSecret'] = self.generate_secret
 
         boto_client = self.get_boto3_client('cognito-idp')
 
-        response = boto_client.create_user_pool_client(**params)
+        response = call_with_backoff(lambda: boto_client.create_user_pool_client(**params), context=self.context)
 
         self.physical_resource_id = response["UserPoolClient"]["ClientId"]
 
@@ -103,30 +139,29 @@ class UserPoolClient(CloudFormationCustomResource):
             # Delete will be triggered by CloudFormation if the create is successful
             return self.create()
 
-        params = {
-            'UserPoolId': self.user_pool_id,
-            'ClientName': self.client_name,
-            'ReadAttributes': self.read_attributes,
-            'WriteAttributes': self.write_attributes,
-            'ExplicitAuthFlows': self.explicit_auth_flows,
-            'SupportedIdentityProviders': self.supported_identity_providers,
-            'CallbackURLs': self.callback_urls,
-            'LogoutURLs': self.logout_urls,
-            'DefaultRedirectURI': self.default_redirect_uri,
-            'AllowedOAuthFlows': self.allowed_oauth_flows,
-            'AllowedOAuthScopes': self.allowed_oauth_scopes,
-            'AllowedOAuthFlowsUserPoolClient': self.allowed_oauth_flows_user_pool_client,
-            'RefreshTokenValidity': self.refresh_token_validity,
-            'AccessTokenValidity': self.access_token_validity,
-            'IdTokenValidity': self.id_token_validity,
-            'TokenValidityUnits': self.token_validity_units,
-        }
-        # Remove all params that are None
-        params = {k: v for k, v in params.items() if v is not None}
+        params = self.params()
 
         boto_client = self.get_boto3_client('cognito-idp')
 
-        response = boto_client.update_user_pool_client(ClientId=self.physical_resource_id, **params)
+        current = call_with_backoff(lambda: boto_client.describe_user_pool_client(
+            UserPoolId=self.user_pool_id,
+            ClientId=self.physical_resource_id,
+        ), context=self.context)["UserPoolClient"]
+        old_params = {
+            key: value
+            for key, value in self.old_resource_properties.items()
+            if key not in ('ServiceToken', 'GenerateSecret') and value is not None
+        }
+        if is_up_to_date(current, params, old_params):
+            print("Client configuration is unchanged, not updating")
+            return {
+                'ClientSecret': current.get('ClientSecret', ''),
+            }
+
+        response = call_with_backoff(
+            lambda: boto_client.update_user_pool_client(ClientId=self.physical_resource_id, **params),
+            context=self.context,
+        )
         return {
             'ClientSecret': response["UserPoolClient"].get('ClientSecret', ''),
         }
@@ -3,6 +3,8 @@ import random
 import string
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.concurrency import map_concurrently
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
@@ -11,6 +13,9 @@ except ImportError:
 
 REGION = os.environ['AWS_REGION']
 
+MAX_RANDOM_LABELS = 10  # Give up when this many random labels are all taken
+LABELS_PER_ROUND = 5  # Random labels that are checked at once
+
 
 def split_resource_id(resource_id):
     parts = resource_id.split('/')
@@ -26,7 +31,13 @@ def generate_random_domain_label():
     return ''.join(random.choices(string.ascii_lowercase + string.digits, k=16))
 
 
-class UserPoolDomain(CloudFormationCustomResource):
+def is_available(cognito_client, domain: str) -> bool:
+    """Whether the domain prefix is not in use yet. Cognito describes unknown domains as {}."""
+    response = cognito_client.describe_user_pool_domain(Domain=domain)
+    return len(response.get('DomainDescription', {})) == 0
+
+
+class UserPoolDomain(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use `{client_pool_id}/{domain}` instead
 
@@ -40,30 +51,51 @@ class UserPoolDomain(CloudFormationCustomResource):
         except (AttributeError, KeyError):
             return False
 
-    def try_domain(self, domain_name):
-        self.get_boto3_client('cognito-idp').create_user_pool_domain(
+    def try_domain(self, boto_client, domain_name):
+        boto_client.create_user_pool_domain(
             UserPoolId=self.user_pool_id,
             Domain=domain_name,
         )
 
+    def create_random_domain(self, boto_client) -> tuple[str, int]:
+        """
+        Create a domain with a random label, and return it with the number of labels tried.
+
+        The labels of a round are checked concurrently; only the first free one is created.
+        """
+        attempts = 0
+        while attempts < MAX_RANDOM_LABELS:
+            candidates = [generate_random_domain_label()
+                          for _ in range(min(LABELS_PER_ROUND, MAX_RANDOM_LABELS - attempts))]
+            available = map_concurrently(lambda domain: is_available(boto_client, domain), candidates)
+            for domain, free in zip(candidates, available):
+                attempts += 1
+                if not free:
+                    print(f"Domain {domain} is taken")
+                    continue
+                try:
+                    self.try_domain(boto_client, domain)
+                    return domain, attempts
+                except boto_client.exceptions.InvalidParameterException:
+                    # Domain was taken in the mean time
+                    print(f"Domain {domain} was taken while trying")
+                    break
+        raise RuntimeError(f"Could not find a free domain in {attempts} attempts")
+
     def create(self):
+        boto_client = self.get_boto3_client('cognito-idp')
         if self.domain is not None:
             domain = self.domain
-            self.try_domain(domain)
+            self.try_domain(boto_client, domain)
+            attempts = 1
         else:
-            attempt = 0
-            while attempt < 10:
-                domain = generate_random_domain_label()
-                try:
-                    self.try_domain(domain)
-                    break
-                except self.get_boto3_client('cognito-idp').exceptions.InvalidParameterException:
-                    # Domain already exists
-                    pass
+            domain, attempts = self.create_random_domain(boto_client)
+            print(f"Created domain {domain} after {attempts} attempts")
 
         self.physical_resource_id = '/'.join([self.user_pool_id, domain])
         return {
             'Domain': domain,
+            'Attempts': attempts,
         }
 
     def update(self):
@@ -75,6 +107,7 @@ class UserPoolDomain(CloudFormationCustomResource):
             _user_pool_id, domain = split_resource_id(self.physical_resource_id)
             return {
                 'Domain': domain,
+                'Attempts': 0,
             }
 
     def delete(self):
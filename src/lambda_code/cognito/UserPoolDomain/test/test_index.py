@@ -21,3 +21,25 @@ def test_split_resourceid():
     from ..index import split_resource_id
 
     assert split_resource_id('foo/bar/baz') == ('foo/bar', 'baz')
+
+
+def test_random_domain_skips_taken_labels():
+    os.environ['AWS_REGION'] = 'none'
+    from unittest import mock
+    from .. import index
+
+    labels = iter(f"label{i}" for i in range(10))
+
+    def describe_user_pool_domain(Domain):
+        # Only the 7th label is free
+        return {'DomainDescription': {} if Domain == 'label6' else {'Domain': Domain}}
+
+    client = mock.Mock(describe_user_pool_domain=describe_user_pool_domain)
+    o = index.UserPoolDomain.__new__(index.UserPoolDomain)
+    o.user_pool_id = 'eu-west-1_abc'
+
+    with mock.patch.object(index, 'generate_random_domain_label', lambda: next(labels)):
+        domain, attempts = o.create_random_domain(client)
+
+    assert (domain, attempts) == ('label6', 7)
+    client.create_user_pool_domain.assert_called_once_with(UserPoolId='eu-west-1_abc', Domain='label6')
@@ -1,6 +1,7 @@
 import os
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
@@ -15,7 +16,7 @@ def split_resource_id(resource_id):
     return user_pool_id, provider_name
 
 
-class UserPoolIdentityProvider(CloudFormationCustomResource):
+class UserPoolIdentityProvider(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # TODO
 
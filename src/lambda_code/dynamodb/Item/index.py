@@ -9,10 +9,13 @@ Parameters:
 """
 import functools
 import os
+import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
 
 from lambda_shared import strtobool
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.dynamodb import convert_attributes
 
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
@@ -24,7 +27,7 @@ NOT_CREATED = "NOT CREATED"
 REGION = os.environ['AWS_REGION']
 
 
-class Item(CloudFormationCustomResource):
+class Item(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Encode key into ID
 
@@ -45,27 +48,54 @@ class Item(CloudFormationCustomResource):
 
     def construct_item(self):
         # Construct item, which is one dict of both key and value
-        item = {}
-        item.update(self.item_key)
-        item.update(self.item_value)
-
-        # Do the needed conversions. CloudFormation given all str's
-        def do_convert(item):
-            if 'BOOL' in item:
-                return {'BOOL': (item['BOOL'] == 'true')}
-            elif 'L' in item:
-                for i, sub_item in enumerate(item['L']):
-                    item['L'][i] = do_convert(sub_item)
-                return item
-            elif 'M' in item:
-                for k, v in item['M'].items():
-                    item['M'][k] = do_convert(v)
-                return item
-            else:
-                return item
-        do_convert({'M': item})
-
-        return item
+        return convert_attributes(self.item_key, self.item_value)
+
+    def construct_update(self, old_item_value: dict) -> typing.Optional[dict]:
+        """
+        Return the UpdateItem parameters to go from `old_item_value` to the current ItemValue.
+
+        Only the changed attributes are SET, the removed ones are REMOVE'd.
+        Returns None when nothing changed.
+        """
+        old = convert_attributes({}, old_item_value)
+        new = convert_attributes({}, self.item_value)
+
+        names = {}
+        values = {}
+        set_actions = []
+        for i, (attribute, value) in enumerate(sorted(new.items())):
+            if old.get(attribute) != value:
+                names[f"#s{i}"] = attribute
+                values[f":s{i}"] = value
+                set_actions.append(f"#s{i} = :s{i}")
+        remove_actions = []
+        for i, attribute in enumerate(sorted(old.keys() - new.keys())):
+            names[f"#r{i}"] = attribute
+            remove_actions.append(f"#r{i}")
+
+        if len(set_actions) == 0 and len(remove_actions) == 0:
+            return None
+
+        update_expression = []
+        if len(set_actions) > 0:
+            update_expression.append("SET " + ", ".join(set_actions))
+        if len(remove_actions) > 0:
+            update_expression.append("REMOVE " + ", ".join(remove_actions))
+
+        # Only update an existing item; otherwise the unchanged attributes would be missing
+        for i, k in enumerate(self.item_key.keys()):
+            names[f"#k{i}"] = k
+        params = {
+            'UpdateExpression': " ".join(update_expression),
+            'ConditionExpression': " AND ".join([
+                f"attribute_exists(#k{i})"
+                for i in range(len(self.item_key))
+            ]),
+            'ExpressionAttributeNames': names,
+        }
+        if len(values) > 0:
+            params['ExpressionAttributeValues'] = values
+        return params
 
     def construct_physical_id(self):
         key = ','.join([
@@ -116,10 +146,25 @@ class Item(CloudFormationCustomResource):
         # else:
         self.physical_resource_id = new_physical_id
 
-        self.regional_dynamodb_client().put_item(
-            TableName=self.table_name,
-            Item=self.construct_item(),
-        )  # may raise
+        update_params = self.construct_update(self.old_resource_properties.get('ItemValue', {}))
+        if update_params is None:
+            print("ItemValue did not change, not updating the item")
+            return self.attributes()
+
+        dynamodb = self.regional_dynamodb_client()
+        try:
+            dynamodb.update_item(
+                TableName=self.table_name,
+                Key=self.item_key,
+                **update_params,
+            )
+        except dynamodb.exceptions.ConditionalCheckFailedException:
+            # The item was removed behind our back: write it completely
+            print("Item does not exist (anymore), putting the whole item")
+            dynamodb.put_item(
+                TableName=self.table_name,
+                Item=self.construct_item(),
+            )  # may raise
 
         return self.attributes()
 
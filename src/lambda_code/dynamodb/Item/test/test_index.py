@@ -30,3 +30,28 @@ def test_bool_convert():
 
     assert isinstance(out['list']['L'][1]['BOOL'], bool)
     assert out['list']['L'][1]['BOOL'] is True
+
+
+def test_construct_update():
+    item = Item()
+    item.item_key = {'key': {'S': 'value'}}
+    item.item_value = {
+        'same': {'S': 'same'},
+        'changed': {'N': '2'},
+        'added': {'BOOL': 'true'},
+    }
+    old_item_value = {
+        'same': {'S': 'same'},
+        'changed': {'N': '1'},
+        'removed': {'S': 'gone'},
+    }
+
+    params = item.construct_update(old_item_value)
+    assert params['UpdateExpression'] == "SET #s0 = :s0, #s1 = :s1 REMOVE #r0"
+    assert params['ConditionExpression'] == "attribute_exists(#k0)"
+    assert params['ExpressionAttributeNames'] == {
+        '#s0': 'added', '#s1': 'changed', '#r0': 'removed', '#k0': 'key',
+    }
+    assert params['ExpressionAttributeValues'] == {':s0': {'BOOL': True}, ':s1': {'N': '2'}}
+
+    assert item.construct_update(item.item_value) is None
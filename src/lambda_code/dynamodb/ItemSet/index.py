@@ -0,0 +1,195 @@
+"""
+Custom Resource for adding many items into a DynamoDB table
+
+Parameters:
+ * Region: optional: region where the DynamoDB table is located. Default: current region of the Lambda
+ * TableName: required: name of the table
+ * Items: optional: list of {"ItemKey": ..., "ItemValue": ...}, like dynamodb.Item
+ * ItemsFrom: optional: {"Bucket": ..., "Key": ..., "VersionId": ...}: S3 object in
+   JSON Lines format, with one {"ItemKey": ..., "ItemValue": ...} per line.
+   VersionId is optional, but without it the previous content of the object
+   is unknown: on update, all its items are written again, and items that
+   are removed from it can not be deleted from the table.
+
+Items are written with BatchWriteItem, in batches of 25, by several writers
+in parallel. Existing items with the same key are overwritten (the last one
+wins). The ItemsFrom object is streamed, and written a few batches at a time.
+On update, only new and changed items are written, and items that were
+removed are deleted.
+
+Return:
+  Attributes:
+   - ItemCount: the number of items
+"""
+import functools
+import hashlib
+import itertools
+import json
+import os
+import typing
+
+from cfn_custom_resource import CloudFormationCustomResource
+
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.concurrency import chunked, map_concurrently
+from lambda_shared.dynamodb import MAX_ITEMS_PER_BATCH, batch_write, convert_attributes, key_id
+
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+
+NOT_CREATED = "NOT CREATED"
+
+REGION = os.environ['AWS_REGION']
+
+MAX_WORKERS = 4
+WINDOW_SIZE = MAX_WORKERS * MAX_ITEMS_PER_BATCH  # Requests that are read before writing them
+
+
+def item_digest(item: dict) -> bytes:
+    return hashlib.sha256(key_id(item).encode('utf-8')).digest()
+
+
+class ItemSet(ResponseSenderMixin, CloudFormationCustomResource):
+    RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Encode table into ID
+
+    @functools.lru_cache()
+    def regional_dynamodb_client(self):
+        return self.get_boto3_session().client('dynamodb', region_name=self.region)
+
+    def validate(self):
+        self.region = self.resource_properties.get('Region', REGION)
+        self.table_name = self.resource_properties['TableName']
+        if 'Items' not in self.resource_properties and 'ItemsFrom' not in self.resource_properties:
+            raise ValueError("Either Items or ItemsFrom is required")
+
+    def read_lines(self, items_from: dict) -> typing.Iterator[str]:
+        """Stream the lines of the S3 object."""
+        extra_params = {}
+        if items_from.get('VersionId'):
+            extra_params['VersionId'] = items_from['VersionId']
+        response = self.get_boto3_client('s3').get_object(
+            Bucket=items_from['Bucket'],
+            Key=items_from['Key'],
+            **extra_params,
+        )
+        for line in response['Body'].iter_lines():
+            if line.strip():
+                yield line
+
+    def iter_items(self, properties: dict) -> typing.Iterator[tuple[str, dict, dict]]:
+        """Yield all items in `properties`, as (key_id, item_key, item). ItemsFrom is streamed."""
+        specs = properties.get('Items', [])
+        if 'ItemsFrom' in properties:
+            specs = itertools.chain(specs, (json.loads(line) for line in self.read_lines(properties['ItemsFrom'])))
+
+        for spec in specs:
+            item_key = spec['ItemKey']
+            item_value = spec.get('ItemValue', {})
+            for key in item_key.keys():
+                if key in item_value:
+                    raise ValueError(f"Attribute {key} listed in both ItemKey and ItemValue")
+            yield key_id(item_key), item_key, convert_attributes(item_key, item_value)
+
+    def previous_items(self, properties: dict) -> dict[str, tuple[dict, typing.Optional[bytes]]]:
+        """
+        Return the items that were written for `properties`, as {key_id: (item_key, item_digest)}.
+
+        The digest is None when the content is unknown: ItemsFrom without
+        VersionId is the current object, not the one that was written.
+        """
+        items = {
+            key: (item_key, item_digest(item))
+            for key, item_key, item in self.iter_items({'Items': properties.get('Items', [])})
+        }
+        if 'ItemsFrom' in properties:
+            known = bool(properties['ItemsFrom'].get('VersionId'))
+            for key, item_key, item in self.iter_items({'ItemsFrom': properties['ItemsFrom']}):
+                items[key] = (item_key, item_digest(item) if known else None)
+        return items
+
+    def write(self, requests: typing.Iterable[tuple[str, dict]]) -> None:
+        """
+        Write the PutRequest's and DeleteRequest's, given as (key_id, request), in batches, in parallel.
+
+        The requests are consumed WINDOW_SIZE at a time, and every window is
+        written before the next one is read. Within a window, the last request
+        for a key wins (BatchWriteItem refuses duplicate keys).
+        """
+        written = calls = 0
+        for window in chunked(requests, WINDOW_SIZE):
+            deduplicated = list(dict(window).values())
+            dynamodb = self.regional_dynamodb_client()
+            attempts = map_concurrently(
+                lambda batch: batch_write(dynamodb, self.table_name, batch, context=self.context),
+                list(chunked(deduplicated, MAX_ITEMS_PER_BATCH)),
+                max_workers=MAX_WORKERS,
+            )
+            written += len(deduplicated)
+            calls += sum(attempts)
+        print(f"Wrote {written} requests in {calls} BatchWriteItem calls")
+
+    def construct_physical_id(self):
+        return ','.join([
+            self.region,
+            self.table_name,
+        ])
+
+    def create(self):
+        self.physical_resource_id = NOT_CREATED
+        # CloudFormation may call `Delete` after a failed `Create`.
+        # delay setting the physical ID until after all items are written
+
+        keys = set()
+
+        def requests():
+            for key, _, item in self.iter_items(self.resource_properties):
+                keys.add(key)
+                yield key, {'PutRequest': {'Item': item}}
+        self.write(requests())
+
+        self.physical_resource_id = self.construct_physical_id()
+        return {'ItemCount': len(keys)}
+
+    def update(self):
+        new_physical_id = self.construct_physical_id()
+        if self.physical_resource_id != new_physical_id:
+            return self.create()
+            # CloudFormation will call delete() on previous physical_id
+
+        old_items = self.previous_items(self.old_resource_properties)
+        keys = set()
+
+        def requests():
+            for key, _, item in self.iter_items(self.resource_properties):
+                old_digest = old_items.get(key, (None, None))[1]
+                # A key that was seen before may have been written with another value: always write it again
+                if key in keys or old_digest is None or old_digest != item_digest(item):
+                    yield key, {'PutRequest': {'Item': item}}
+                keys.add(key)
+            for key, (item_key, _) in old_items.items():
+                if key not in keys:
+                    yield key, {'DeleteRequest': {'Key': item_key}}
+        self.write(requests())
+
+        print(f"{len(keys)} items")
+        return {'ItemCount': len(keys)}
+
+    def delete(self):
+        if self.physical_resource_id == NOT_CREATED:
+            return
+
+        try:
+            self.write(
+                (key, {'DeleteRequest': {'Key': item_key}})
+                for key, item_key, _ in self.iter_items(self.resource_properties)
+            )
+        except self.get_boto3_client('s3').exceptions.NoSuchKey:
+            print("ItemsFrom object is gone; can not determine the (remaining) items to delete")
+        except self.regional_dynamodb_client().exceptions.ResourceNotFoundException:
+            print("Table is gone; nothing to delete")
+
+
+handler = ItemSet.get_handler()
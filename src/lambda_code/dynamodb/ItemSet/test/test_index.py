@@ -0,0 +1,112 @@
+import os
+os.environ['AWS_REGION'] = 'eu-west-1'
+
+import json  # noqa: E402
+from unittest import mock  # noqa: E402
+
+from ..index import ItemSet  # noqa: E402
+
+
+class Context:
+    def get_remaining_time_in_millis(self):
+        return 60000
+
+
+def item_line(key, value):
+    return json.dumps({'ItemKey': {'id': {'S': key}}, 'ItemValue': {'value': {'S': value}}}).encode('utf-8')
+
+
+def s3_mock(lines):
+    s3_client = mock.Mock()
+    s3_client.get_object.side_effect = lambda **kwargs: {'Body': mock.Mock(iter_lines=lambda: iter(lines))}
+    return s3_client
+
+
+def dynamodb_mock():
+    dynamodb = mock.Mock()
+    dynamodb.batch_write_item.return_value = {}
+    return dynamodb
+
+
+def item_set(event, dynamodb):
+    o = ItemSet()
+    o.event = event
+    o.context = Context()
+    o.resource_properties = event['ResourceProperties']
+    o.old_resource_properties = event.get('OldResourceProperties', {})
+    o.physical_resource_id = event.get('PhysicalResourceId')
+    o.get_boto3_session = mock.Mock()
+    o.get_boto3_session.return_value.client.return_value = dynamodb
+    o.validate()
+    return o
+
+
+def written(dynamodb):
+    """Return the requests of all BatchWriteItem calls, as (type, id, value)."""
+    requests = []
+    for call in dynamodb.batch_write_item.call_args_list:
+        for request in call.kwargs['RequestItems']['table']:
+            if 'PutRequest' in request:
+                item = request['PutRequest']['Item']
+                requests.append(('put', item['id']['S'], item['value']['S']))
+            else:
+                requests.append(('delete', request['DeleteRequest']['Key']['id']['S'], None))
+    return requests
+
+
+def test_create_streams_in_windows():
+    lines = [item_line(f"item-{i:03}", str(i)) for i in range(250)]
+    lines.append(item_line('item-000', 'last one wins'))
+    ItemSet.BOTO3_CLIENTS['s3'] = s3_mock(lines)
+    dynamodb = dynamodb_mock()
+    event = {
+        'RequestType': 'Create',
+        'ResourceProperties': {'TableName': 'table', 'ItemsFrom': {'Bucket': 'bucket', 'Key': 'items.jsonl'}},
+    }
+    attributes = item_set(event, dynamodb).create()
+
+    assert attributes == {'ItemCount': 250}
+    assert max(len(call.kwargs['RequestItems']['table']) for call in dynamodb.batch_write_item.call_args_list) == 25
+    requests = written(dynamodb)
+    assert len(requests) == 251
+    # Windows are written one after the other
+    assert requests.index(('put', 'item-000', '0')) < requests.index(('put', 'item-000', 'last one wins'))
+
+
+def test_update_without_version_writes_all_items():
+    # The object was overwritten: the old and the new properties read the same, new, content
+    ItemSet.BOTO3_CLIENTS['s3'] = s3_mock([item_line('a', 'changed'), item_line('b', 'same')])
+    dynamodb = dynamodb_mock()
+    properties = {'TableName': 'table', 'ItemsFrom': {'Bucket': 'bucket', 'Key': 'items.jsonl'}}
+    event = {
+        'RequestType': 'Update',
+        'PhysicalResourceId': 'eu-west-1,table',
+        'ResourceProperties': properties,
+        'OldResourceProperties': properties,
+    }
+    attributes = item_set(event, dynamodb).update()
+
+    assert attributes == {'ItemCount': 2}
+    assert written(dynamodb) == [('put', 'a', 'changed'), ('put', 'b', 'same')]
+
+
+def test_update_with_version_writes_changes():
+    ItemSet.BOTO3_CLIENTS['s3'] = mock.Mock()
+    ItemSet.BOTO3_CLIENTS['s3'].get_object.side_effect = lambda VersionId, **kwargs: {
+        'Body': mock.Mock(iter_lines=lambda: iter({
+            'v1': [item_line('a', 'old'), item_line('b', 'same'), item_line('c', 'removed')],
+            'v2': [item_line('a', 'new'), item_line('b', 'same'), item_line('d', 'added')],
+        }[VersionId])),
+    }
+    dynamodb = dynamodb_mock()
+    properties = {'TableName': 'table', 'ItemsFrom': {'Bucket': 'bucket', 'Key': 'items.jsonl', 'VersionId': 'v2'}}
+    event = {
+        'RequestType': 'Update',
+        'PhysicalResourceId': 'eu-west-1,table',
+        'ResourceProperties': properties,
+        'OldResourceProperties': {**properties, 'ItemsFrom': {**properties['ItemsFrom'], 'VersionId': 'v1'}},
+    }
+    attributes = item_set(event, dynamodb).update()
+
+    assert attributes == {'ItemCount': 3}
+    assert written(dynamodb) == [('put', 'a', 'new'), ('put', 'd', 'added'), ('delete', 'c', None)]
@@ -3,35 +3,80 @@ Custom Resource for joining up DynamoDB tables in to a Global Table.
 
 Parameters:
  * TableName: required: name of the tables to join.
+ * Regions: optional: list of regions to add a replica of the table (in the
+   region of the Lambda) in. When given, the current version (2019.11.21) of
+   Global Tables is used: the replicas are created by DynamoDB, and this
+   resource waits until all of them are ACTIVE. Regions removed from the list
+   on update have their replica deleted.
+   When not given, the table in the region of the Lambda is joined to the
+   legacy (2017.11.29) Global Table with the same name.
 
 Requirements:
  * All tables must share the same name and have Streams enabled (cfr AWS documentation)
+ * With Regions: the replicas must not exist yet
+
+Return:
+  Ref: ARN of the (legacy) Global Table, or of the table (with Regions)
+  Attributes (only with Regions):
+   - ReplicaStatus.{region}: the status of every replica (ACTIVE)
+   - Regions: comma-separated list of the replica regions
 """
 
 import os
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.clients import regional_client
+from lambda_shared.concurrency import map_concurrently
+from lambda_shared.continuation import ResumableMixin
+from lambda_shared.poller import Poller, PollTimeout, print_progress
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
 REGION = os.environ['AWS_REGION']
 
+POLL_INITIAL_INTERVAL = 5
+POLL_MAX_INTERVAL = 30
+BUSY_REPLICA_STATES = ('CREATING', 'UPDATING', 'DELETING')
+
+
+def replica_statuses(table: dict) -> dict[str, str]:
+    """Return {region: ReplicaStatus} of the replicas of the table description."""
+    return {
+        replica['RegionName']: replica.get('ReplicaStatus', 'CREATING')
+        for replica in table.get('Replicas', [])
+    }
+
+
+def regional_table_status(table_name: str, region: str) -> str:
+    """Return the TableStatus of the replica in `region`, as seen from that region."""
+    dynamodb = regional_client('dynamodb', region)
+    try:
+        return dynamodb.describe_table(TableName=table_name)['Table']['TableStatus']
+    except dynamodb.exceptions.ResourceNotFoundException:
+        return 'NOT_FOUND'
 
-class JoinGlobalTable(CloudFormationCustomResource):
+
+class JoinGlobalTable(ResumableMixin, ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use ARN of global table instead
 
     def validate(self):
         try:
-            self.table_name = self.resource_properties.pop('TableName')
+            # Don't pop: has_property_changed() compares resource_properties with old_resource_properties
+            self.table_name = self.resource_properties['TableName']
+            self.regions = self.resource_properties.get('Regions', None)
 
-            if len(self.resource_properties) > 0:
+            if len(set(self.resource_properties.keys()) - {'ServiceToken', 'TableName', 'Regions'}) > 0:
                 return False
             return True
         except KeyError:
             return False
 
     def create(self):
+        if self.regions is not None:
+            return self.reconcile_replicas(set(self.regions) - {REGION}, set(), take_ownership=True)
+
         boto_client = self.get_boto3_client('dynamodb')
         try:
             print(f"Trying to create global table {self.table_name}")
@@ -63,16 +108,117 @@ class JoinGlobalTable(CloudFormationCustomResource):
         return {}
 
     def update(self):
-        if self.has_property_changed('TableName'):
+        if self.has_property_changed('TableName') or \
+                (self.regions is None) != (self.old_resource_properties.get('Regions') is None):
             # We need a new GlobalTable, switch to create and let CLEANUP delete the old one
             return self.create()
 
+        if self.regions is not None:
+            regions = set(self.regions) - {REGION}
+            old_regions = set(self.old_resource_properties['Regions']) - {REGION}
+            return self.reconcile_replicas(regions, old_regions - regions, take_ownership=False)
+
         # Nothing else can change
         # Ignore request succesfully
         print("Ignoring update")
         return {}
 
+    def reconcile_replicas(self, regions: set[str], removing: set[str], take_ownership: bool) -> dict:
+        """
+        Add a replica in every region of `regions`, delete the ones in `removing`, and wait until done.
+
+        DynamoDB accepts only one replica change at a time, so the changes are
+        requested one by one; the replicas are then checked concurrently, each
+        in its own region.
+        """
+        dynamodb = self.get_boto3_client('dynamodb')
+
+        state = self.get_continuation_state()
+        if state is None:
+            state = {'Regions': sorted(regions), 'Removing': sorted(removing)}
+            if take_ownership:
+                table = dynamodb.describe_table(TableName=self.table_name)['Table']
+                existing = regions & set(replica_statuses(table).keys())
+                if len(existing) > 0:
+                    raise RuntimeError(f"{self.table_name} already has a replica in {', '.join(sorted(existing))}. "
+                                       f"Not taking ownership of these replicas.")
+                # From now on, a Delete will remove the replicas again
+                self.physical_resource_id = table['TableArn']
+        regions = set(state['Regions'])
+        removing = set(state['Removing'])
+        statuses = {}
+
+        def reconciled() -> bool:
+            table = dynamodb.describe_table(TableName=self.table_name)['Table']
+            replicas = replica_statuses(table)
+            failed = [region for region, status in replicas.items() if status == 'CREATION_FAILED']
+            if len(failed) > 0:
+                raise RuntimeError(f"Creating the replica in {', '.join(sorted(failed))} failed")
+
+            to_add = sorted(regions - set(replicas.keys()))
+            to_remove = sorted(region for region in removing & set(replicas.keys()) if replicas[region] != 'DELETING')
+            busy = table['TableStatus'] != 'ACTIVE' or any(s in BUSY_REPLICA_STATES for s in replicas.values())
+            if not busy and len(to_add) > 0:
+                self.update_replica('Create', to_add[0])
+            elif not busy and len(to_remove) > 0:
+                self.update_replica('Delete', to_remove[0])
+            print(f"Replicas: {replicas}; to add: {to_add}; to remove: {to_remove}")
+            if len(to_add) > 0 or len(to_remove) > 0 or len(removing & set(replicas.keys())) > 0:
+                return False
+
+            sorted_regions = sorted(regions)
+            for region, status in zip(sorted_regions, map_concurrently(
+                    lambda region: regional_table_status(self.table_name, region),
+                    sorted_regions,
+            )):
+                statuses[region] = status if replicas[region] == 'ACTIVE' else replicas[region]
+            print(f"Replica status: {statuses}")
+            return all(status == 'ACTIVE' for status in statuses.values())
+
+        poller = Poller(
+            initial_interval=POLL_INITIAL_INTERVAL,
+            max_interval=POLL_MAX_INTERVAL,
+            context=self.context,
+            on_progress=print_progress("replica changes"),
+        )
+        try:
+            poller.poll(reconciled)
+        except PollTimeout:
+            print("Lambda is about to timeout, continuing in a new invocation")
+            self.continue_later(state)
+
+        attributes = {
+            f"ReplicaStatus.{region}": status
+            for region, status in sorted(statuses.items())
+        }
+        attributes['Regions'] = ','.join(sorted(regions))
+        return attributes
+
+    def update_replica(self, action: str, region: str) -> None:
+        """Request a replica change; when DynamoDB is still busy with another change, try again next time."""
+        boto_client = self.get_boto3_client('dynamodb')
+        print(f"Requesting {action} of the replica in {region}")
+        try:
+            boto_client.update_table(
+                TableName=self.table_name,
+                ReplicaUpdates=[
+                    {action: {'RegionName': region}}
+                ],
+            )
+        except (boto_client.exceptions.ResourceInUseException, boto_client.exceptions.LimitExceededException) as e:
+            print(f"Table is busy, trying again later: {e}")
+
     def delete(self):
+        if self.regions is not None:
+            if not (self.physical_resource_id or '').startswith('arn:'):
+                # nothing to do - create failed before any replica was requested
+                return
+            try:
+                self.reconcile_replicas(set(), set(self.regions) - {REGION}, take_ownership=False)
+            except self.get_boto3_client('dynamodb').exceptions.ResourceNotFoundException:
+                print("Table is gone; nothing to delete")
+            return
+
         boto_client = self.get_boto3_client('dynamodb')
         try:
             print("Trying to delete global table {self.table_name}")
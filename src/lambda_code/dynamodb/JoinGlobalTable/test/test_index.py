@@ -0,0 +1,104 @@
+import functools
+import os
+os.environ['AWS_REGION'] = 'eu-west-1'
+
+import types  # noqa: E402
+from unittest import mock  # noqa: E402
+
+from .. import index  # noqa: E402
+
+TABLE_ARN = 'arn:aws:dynamodb:eu-west-1:123456789012:table/example'
+
+
+class Context:
+    invoked_function_arn = 'arn:aws:lambda:eu-west-1:123456789012:function:join-global-table'
+
+    def get_remaining_time_in_millis(self):
+        return 300000
+
+
+class FakeDynamoDB:
+    """Table with replicas that become ACTIVE (or disappear) one describe after the change."""
+
+    exceptions = types.SimpleNamespace(
+        ResourceInUseException=type('ResourceInUseException', (Exception,), {}),
+        LimitExceededException=type('LimitExceededException', (Exception,), {}),
+        ResourceNotFoundException=type('ResourceNotFoundException', (Exception,), {}),
+    )
+
+    def __init__(self, replicas):
+        self.replicas = {region: 'ACTIVE' for region in replicas}
+        self.replica_updates = []
+
+    def describe_table(self, TableName):
+        described = dict(self.replicas)
+        for region, status in list(self.replicas.items()):
+            if status == 'CREATING':
+                self.replicas[region] = 'ACTIVE'
+            elif status == 'DELETING':
+                del self.replicas[region]
+        return {'Table': {
+            'TableArn': TABLE_ARN,
+            'TableStatus': 'ACTIVE',
+            'Replicas': [{'RegionName': r, 'ReplicaStatus': s} for r, s in described.items()],
+        }}
+
+    def update_table(self, TableName, ReplicaUpdates):
+        assert len(ReplicaUpdates) == 1
+        self.replica_updates.append(ReplicaUpdates[0])
+        action, update = next(iter(ReplicaUpdates[0].items()))
+        self.replicas[update['RegionName']] = 'CREATING' if action == 'Create' else 'DELETING'
+
+
+def join_global_table(properties, old_properties):
+    o = index.JoinGlobalTable()
+    o.event = {'RequestType': 'Update'}
+    o.context = Context()
+    o.resource_properties = properties
+    o.old_resource_properties = old_properties
+    o.physical_resource_id = TABLE_ARN
+    assert o.validate()
+    return o
+
+
+def test_update_changes_regions():
+    dynamodb = FakeDynamoDB(replicas=['us-east-1', 'ap-south-1'])
+    index.JoinGlobalTable.BOTO3_CLIENTS['dynamodb'] = dynamodb
+    regional_dynamodb = mock.Mock()
+    regional_dynamodb.describe_table.return_value = {'Table': {'TableStatus': 'ACTIVE'}}
+
+    o = join_global_table(
+        {'TableName': 'example', 'Regions': ['us-east-1', 'eu-central-1']},
+        {'TableName': 'example', 'Regions': ['us-east-1', 'ap-south-1']},
+    )
+    with mock.patch.object(index, 'regional_client', lambda service, region: regional_dynamodb), \
+            mock.patch.object(index, 'Poller', functools.partial(index.Poller, sleep=lambda seconds: None)):
+        attributes = o.update()
+
+    assert dynamodb.replica_updates == [
+        {'Create': {'RegionName': 'eu-central-1'}},
+        {'Delete': {'RegionName': 'ap-south-1'}},
+    ]
+    assert o.physical_resource_id == TABLE_ARN
+    assert attributes == {
+        'ReplicaStatus.eu-central-1': 'ACTIVE',
+        'ReplicaStatus.us-east-1': 'ACTIVE',
+        'Regions': 'eu-central-1,us-east-1',
+    }
+
+
+def test_update_without_changes_keeps_replicas():
+    dynamodb = FakeDynamoDB(replicas=['us-east-1'])
+    index.JoinGlobalTable.BOTO3_CLIENTS['dynamodb'] = dynamodb
+    regional_dynamodb = mock.Mock()
+    regional_dynamodb.describe_table.return_value = {'Table': {'TableStatus': 'ACTIVE'}}
+
+    o = join_global_table(
+        {'TableName': 'example', 'Regions': ['us-east-1']},
+        {'TableName': 'example', 'Regions': ['us-east-1']},
+    )
+    with mock.patch.object(index, 'regional_client', lambda service, region: regional_dynamodb):
+        attributes = o.update()
+
+    assert dynamodb.replica_updates == []
+    assert attributes['ReplicaStatus.us-east-1'] == 'ACTIVE'
@@ -3,6 +3,8 @@ Custom Resource for finding latest the AMI id for a given Description
 
 Parameters:
  * Region: (default: current region)
+ * Regions: optional, list of regions to look up the AMI in, concurrently.
+   Overrides Region.
  * Name: Like: "amzn-ami-minimal-hvm*"
  * OwnerAlias
  * OwnerId
@@ -10,17 +12,40 @@ Parameters:
  * DeviceType: Defaults to: "ebs",
  * VirtualizationType: Defaults to: "hvm",
  * State: Defaults to: 'available',
+ * IncludeDeprecated: Defaults to: false
+ * Dummy: change to force a new lookup, bypassing the cache
+
+Return:
+  Ref: the AMI id (in the first region when Regions is given)
+  Attributes:
+   - CreationDate: creation date of the returned image
+   - ImageCount: number of images matching the filters
+   - ImageId.{region}, CreationDate.{region}, ImageCount.{region}: the same,
+     for every region in Regions (only when Regions is given)
+   - ImageIds: JSON object mapping every region to its AMI id (only when
+     Regions is given)
+
+Results are cached for CACHE_TTL_SECONDS in warm Lambda containers.
 """
 
+import json
 import os
-import boto3
+import typing
+
 import structlog
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared import strtobool
+from lambda_shared.cache import ttl_cache
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.clients import regional_client
+from lambda_shared.concurrency import map_concurrently
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
 REGION = os.environ['AWS_REGION']
+CACHE_TTL_SECONDS = 300
+PAGE_SIZE = 1000
 
 structlog.configure(processors=[structlog.processors.JSONRenderer()])
 
@@ -32,38 +57,92 @@ def dict_element_copy_if_exists(
         target_dict[target_key] = source_dict[source_key]
 
 
-class FindAmi(CloudFormationCustomResource):
+@ttl_cache(ttl=CACHE_TTL_SECONDS)
+def find_latest_image(
+        region: str,
+        owners: list[str],
+        ami_filter: list,
+        include_deprecated: bool = False,
+) -> typing.Optional[dict]:
+    """
+    Return the ImageId, CreationDate and ImageCount of the newest image matching the filter, or None.
+
+    The images are streamed page by page; only the newest one is kept.
+    """
+    # Don't use self.get_boto3_client, since we may vary regions
+    ec2_client = regional_client('ec2', region)
+
+    params = {
+        'Filters': ami_filter,
+        'IncludeDeprecated': include_deprecated,
+    }
+    if len(owners) > 0:
+        params['Owners'] = owners
+
+    structlog.get_logger().log("Doing API calls", **params)
+    latest_ami = None
+    image_count = 0
+    pages = ec2_client.get_paginator('describe_images').paginate(
+        **params,
+        PaginationConfig={'PageSize': PAGE_SIZE},
+    )
+    for page in pages:
+        for image in page['Images']:
+            image_count += 1
+            if latest_ami is None or image.get('CreationDate', '') > latest_ami.get('CreationDate', ''):
+                latest_ami = image
+    structlog.get_logger().log("API calls done", image_count=image_count)
+
+    if latest_ami is None:
+        return None
+
+    return {
+        'ImageId': latest_ami['ImageId'],
+        'CreationDate': latest_ami.get('CreationDate', ''),
+        'ImageCount': image_count,
+    }
+
+
+class FindAmi(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Return AMI ID as physical ID
 
     def validate(self):
         self.filter = {}
+        self.owners = []
 
         try:
             self.filter['name'] = self.resource_properties['Name']
-            dict_element_copy_if_exists(
-                self.resource_properties, 'OwnerAlias',
-                self.filter, 'owner-alias'
-            )
-            dict_element_copy_if_exists(
-                self.resource_properties, 'OwnerId',
-                self.filter, 'owner-id'
-            )
+            regions = self.resource_properties.get('Regions')
+            if regions is None:
+                self.regions = [self.resource_properties.get('Region', REGION)]
+                self.multi_region = False
+            elif isinstance(regions, list) and len(regions) > 0:
+                self.regions = list(dict.fromkeys(regions))  # Remove duplicates, keep order
+                self.multi_region = True
+            else:
+                return False
+            # Narrow down server-side with `Owners` where possible
+            if 'OwnerId' in self.resource_properties:
+                self.owners.append(self.resource_properties['OwnerId'])
+                dict_element_copy_if_exists(
+                    self.resource_properties, 'OwnerAlias',
+                    self.filter, 'owner-alias'
+                )
+            elif 'OwnerAlias' in self.resource_properties:
+                self.owners.append(self.resource_properties['OwnerAlias'])
             self.filter['architecture'] = self.resource_properties.get('Architecture', 'x86_64')
             self.filter['root-device-type'] = self.resource_properties.get('DeviceType', 'ebs')
             self.filter['virtualization-type'] = self.resource_properties.get('VirtualizationType', 'hvm')
             self.filter['state'] = self.resource_properties.get('State', 'available')
+            self.include_deprecated = bool(strtobool(str(self.resource_properties.get('IncludeDeprecated', 'false'))))
             return True
 
-        except (AttributeError, KeyError):
+        except (AttributeError, KeyError, ValueError):
             return False
 
-    def create(self):
-        structlog.get_logger().log("Handling request", filter=self.filter)
-        ec2_client = boto3.client(  # Don't use self.get_boto3_client, since we may vary regions
-            'ec2',
-            region_name=self.resource_properties.get('Region', REGION),
-        )
+    def create(self, cache_refresh: bool = False):
+        structlog.get_logger().log("Handling request", filter=self.filter, owners=self.owners, regions=self.regions)
 
         ami_filter = []
         for key, value in self.filter.items():
@@ -72,27 +151,45 @@ class FindAmi(CloudFormationCustomResource):
                 'Values': [value],
             })
 
-        structlog.get_logger().log("Converted to AMI filter; doing API call", filter=ami_filter)
-        ami_list = ec2_client.describe_images(
-            Filters=ami_filter
-        )
-        structlog.get_logger().log("API call done, sorting")
-        sorted_ami_list = sorted(
-            ami_list['Images'],
-            key=lambda k: k.get('CreationDate', ''),
-            reverse=True
-        )
-        if len(sorted_ami_list) == 0:
+        structlog.get_logger().log("Converted to AMI filter", filter=ami_filter)
+        latest_amis = dict(zip(self.regions, map_concurrently(
+            lambda region: find_latest_image(
+                region,
+                self.owners,
+                ami_filter,
+                include_deprecated=self.include_deprecated,
+                cache_refresh=cache_refresh,
+            ),
+            self.regions,
+        )))
+        not_found = [region for region, latest_ami in latest_amis.items() if latest_ami is None]
+        if len(not_found) > 0:
             self.status = self.STATUS_FAILED
-            self.failure_reason = "No image found matching filters."
+            if self.multi_region:
+                self.failure_reason = f"No image found matching filters in {', '.join(not_found)}."
+            else:
+                self.failure_reason = "No image found matching filters."
             return {}
 
-        latest_ami = sorted_ami_list[0]
+        latest_ami = latest_amis[self.regions[0]]
         self.physical_resource_id = latest_ami['ImageId']
-        return {}
+        attributes = {
+            'CreationDate': latest_ami['CreationDate'],
+            'ImageCount': latest_ami['ImageCount'],
+        }
+        if self.multi_region:
+            for region, latest_ami in latest_amis.items():
+                attributes[f"ImageId.{region}"] = latest_ami['ImageId']
+                attributes[f"CreationDate.{region}"] = latest_ami['CreationDate']
+                attributes[f"ImageCount.{region}"] = latest_ami['ImageCount']
+            attributes['ImageIds'] = json.dumps({
+                region: latest_ami['ImageId']
+                for region, latest_ami in latest_amis.items()
+            })
+        return attributes
 
     def update(self):
-        return self.create()
+        return self.create(cache_refresh=self.has_property_changed('Dummy'))
 
     def delete(self):
         # Nothing to delete
@@ -5,41 +5,75 @@ This is needed for our cost-saving mode: The bringup tool will re-start the
 EC2-instance, and trigger CloudFormation to re-provision the LoadBalancer.
 But the instance may still be in "pending" state by the time the LoadBalancer
 tries to add the instance, which will fail.
-This resource simply waits for the given EC2 instance(s) to become "started",
-or the Lambda times out.
+This resource simply waits for the given EC2 instance(s) to become "started".
+When the Lambda is about to time out, the wait continues in a new invocation.
 
 Parameters:
  * InstanceIds: either a list of instance IDs, or a single InstanceId
+ * WaitForStatusChecks: optional, default false: also wait for the instance
+   and system status checks to be "ok"
 
 Return:
   Ref: random
   Attributes:
    - InstanceIds: verbatim copy of input
+   - InstanceCount: the number of instances
+   - StateCount.{state}: the number of instances in every state
+   - State.{instance-id}: the state of every instance
+   - InstanceStatus.{instance-id}, SystemStatus.{instance-id}: status checks
+     of every instance (only when WaitForStatusChecks is set)
+  The per-instance attributes are left out when they don't fit in the
+  response (from about 25 instances with status checks, or 55 without).
 """
-import json
 import os
-import time
-import traceback
-
-import six
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared import strtobool
+from lambda_shared.cfn_response import ResponseSenderMixin, finish_function_nojson
+from lambda_shared.compaction import CompactionPolicy, DropRule
+from lambda_shared.concurrency import chunked, map_concurrently
+from lambda_shared.continuation import ResumableMixin
+from lambda_shared.poller import Poller, PollTimeout, print_progress
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
 REGION = os.environ['AWS_REGION']
 
-POLL_INTERVAL = 5
+POLL_INITIAL_INTERVAL = 2
+POLL_MAX_INTERVAL = 15
+
+MAX_IDS_PER_CALL = 100  # Limit of DescribeInstanceStatus when passing InstanceIds
+
 
+def describe_instance_status(ec2_client, instance_ids: list[str]) -> list[dict]:
+    """Describe the status of the given instances, including non-running ones, following pagination."""
+    try:
+        paginator = ec2_client.get_paginator('describe_instance_status')
+        statuses = []
+        for page in paginator.paginate(InstanceIds=instance_ids, IncludeAllInstances=True):
+            statuses.extend(page['InstanceStatuses'])
+        return statuses
+    except ec2_client.exceptions.ClientError as e:
+        if e.response['Error']['Code'] == 'InvalidInstanceID.NotFound':
+            # Newly launched instances may not be visible yet; try again next time
+            print(f"Some of {', '.join(instance_ids)} not found (yet)")
+            return []
+        raise
 
-class StartedWaiter(CloudFormationCustomResource):
+
+class StartedWaiter(ResumableMixin, ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    RESPONSE_COMPACTION = CompactionPolicy(
+        # InstanceCount and StateCount.{state} summarize these
+        drop=[
+            DropRule("per-instance status checks", lambda key: key.startswith(('InstanceStatus.', 'SystemStatus.'))),
+            DropRule("per-instance states", lambda key: key.startswith('State.')),
+        ],
+    )
 
     def __init__(self, *args, **kwargs):
         super(StartedWaiter, self).__init__(*args, **kwargs)
-        self.finish_function = self.finish_function_nojson
-        # Can be removed once https://github.com/iRobotCorporation/cfn-custom-resource/pull/7 is accepted,
-        # merged & released
+        self.finish_function = finish_function_nojson
 
     def validate(self):
         try:
@@ -49,43 +83,75 @@ class StartedWaiter(CloudFormationCustomResource):
             else:
                 self.instance_ids = {instance_ids}
 
+            self.wait_for_status_checks = strtobool(str(self.resource_properties.get('WaitForStatusChecks', 'false')))
+
             return True
         except (AttributeError, KeyError):
             return False
 
+    def is_ready(self, instance_status: dict) -> bool:
+        if instance_status['InstanceState']['Name'] != 'running':
+            return False
+        if not self.wait_for_status_checks:
+            return True
+        return instance_status['InstanceStatus']['Status'] == 'ok' and \
+            instance_status['SystemStatus']['Status'] == 'ok'
+
     def create(self):
         ec2_client = self.get_boto3_client('ec2')
 
-        instance_ids_remaining = self.instance_ids.copy()
-        while len(instance_ids_remaining) > 0:
-            print("Waiting for: ", ", ".join(instance_ids_remaining))
-            status = ec2_client.describe_instance_status(
-                InstanceIds=list(instance_ids_remaining),
-            )
-            for instance in status['InstanceStatuses']:
-                instance_id = instance['InstanceId']
-                instance_state = instance['InstanceState']['Name']
-                print("{} : {}".format(
-                    instance_id, instance_state,
-                ))
-                if instance_state == 'running':
-                    print("{} is running".format(instance_id))
-                    instance_ids_remaining.remove(instance_id)
-
-            if len(instance_ids_remaining) == 0:
-                break  # before sleep
-
-            if self.context.get_remaining_time_in_millis() < POLL_INTERVAL * 1000 * 2:
-                raise TimeoutError("Lambda is about to timeout, still waiting for: {}".format(
-                    ", ".join(instance_ids_remaining),
-                ))
-
-            time.sleep(5)
-            # loop around
-
-        return {
-            'InstanceIds': self.resource_properties['InstanceIds']
+        state = self.get_continuation_state()
+        if state is None:
+            state = {
+                'Remaining': sorted(self.instance_ids),
+                'Progress': {},
+            }
+        instance_ids_remaining = set(state['Remaining'])
+        progress = state['Progress']
+
+        def all_ready() -> bool:
+            print(f"Waiting for {len(instance_ids_remaining)} instances: {', '.join(sorted(instance_ids_remaining))}")
+            chunks = list(chunked(sorted(instance_ids_remaining), MAX_IDS_PER_CALL))
+            for statuses in map_concurrently(lambda chunk: describe_instance_status(ec2_client, chunk), chunks):
+                for instance_status in statuses:
+                    instance_id = instance_status['InstanceId']
+                    progress[instance_id] = {
+                        'State': instance_status['InstanceState']['Name'],
+                        'InstanceStatus': instance_status.get('InstanceStatus', {}).get('Status', 'unknown'),
+                        'SystemStatus': instance_status.get('SystemStatus', {}).get('Status', 'unknown'),
+                    }
+                    print(f"{instance_id} : {progress[instance_id]}")
+                    if self.is_ready(instance_status):
+                        print(f"{instance_id} is ready")
+                        instance_ids_remaining.discard(instance_id)
+            return len(instance_ids_remaining) == 0
+
+        poller = Poller(
+            initial_interval=POLL_INITIAL_INTERVAL,
+            max_interval=POLL_MAX_INTERVAL,
+            context=self.context,
+            on_progress=print_progress("instances to start"),
+        )
+        try:
+            poller.poll(all_ready)
+        except PollTimeout:
+            print("Lambda is about to timeout, continuing in a new invocation")
+            state['Remaining'] = sorted(instance_ids_remaining)
+            self.continue_later(state)
+
+        attributes = {
+            'InstanceIds': self.resource_properties['InstanceIds'],
+            'InstanceCount': len(progress),
         }
+        for instance_progress in progress.values():
+            key = f"StateCount.{instance_progress['State']}"
+            attributes[key] = attributes.get(key, 0) + 1
+        for instance_id, instance_progress in progress.items():
+            attributes[f"State.{instance_id}"] = instance_progress['State']
+            if self.wait_for_status_checks:
+                attributes[f"InstanceStatus.{instance_id}"] = instance_progress['InstanceStatus']
+                attributes[f"SystemStatus.{instance_id}"] = instance_progress['SystemStatus']
+        return attributes
 
     def update(self):
         return self.create()
@@ -94,34 +160,5 @@ class StartedWaiter(CloudFormationCustomResource):
         # Nothing to delete
         pass
 
-    @classmethod
-    def finish_function_nojson(cls, resource):
-        # Can be removed once https://github.com/iRobotCorporation/cfn-custom-resource/pull/7 is accepted,
-        # merged & released
-        physical_resource_id = resource.physical_resource_id
-        if physical_resource_id is None:
-            physical_resource_id = resource.context.log_stream_name
-        default_reason = ("See the details in CloudWatch Log Stream: {}".format(resource.context.log_stream_name))
-        outputs = {}
-        for key, value in six.iteritems(resource.resource_outputs):
-            outputs[key] = value
-        response_content = {
-            "Status": resource.status,
-            "Reason": resource.failure_reason or default_reason,
-            "PhysicalResourceId": physical_resource_id,
-            "StackId": resource.event['StackId'],
-            "RequestId": resource.event['RequestId'],
-            "LogicalResourceId": resource.event['LogicalResourceId'],
-            "Data": outputs
-        }
-        resource._base_logger.debug("Response body: {}".format(json.dumps(response_content)))
-        if cls.RAISE_ON_FAILURE and resource.status == cls.STATUS_FAILED:
-            raise Exception(resource.failure_reason)
-        try:
-            return resource.send_response_function(resource, resource.response_url, response_content)
-        except Exception as e:
-            resource._base_logger.error("send response failed: {}".format(e))
-            resource._base_logger.debug(traceback.format_exc())
-
 
 handler = StartedWaiter.get_handler()
@@ -0,0 +1,138 @@
+import os
+os.environ['AWS_REGION'] = 'eu-west-1'
+
+import json
+from unittest import mock
+
+import pytest
+
+from lambda_shared.continuation import ContinuationRequested, LocalInvoker
+
+from ..index import StartedWaiter
+
+
+class Context:
+    invoked_function_arn = 'arn:aws:lambda:eu-west-1:123456789012:function:started-waiter'
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def instance_status(**states):
+    return [{
+        'InstanceStatuses': [
+            {
+                'InstanceId': instance_id.replace('_', '-'),
+                'InstanceState': {'Name': state},
+                'InstanceStatus': {'Status': 'ok' if state == 'running' else 'not-applicable'},
+                'SystemStatus': {'Status': 'ok' if state == 'running' else 'not-applicable'},
+            }
+            for instance_id, state in states.items()
+        ],
+    }]
+
+
+def waiter(event, context):
+    o = StartedWaiter()
+    o.CONTINUATION_INVOKER = LocalInvoker()
+    o.event = event
+    o.context = context
+    o.resource_properties = event['ResourceProperties']
+    assert o.validate()
+    return o
+
+
+def test_continues_in_new_invocation():
+    ec2_client = mock.Mock()
+    paginate = ec2_client.get_paginator.return_value.paginate
+    paginate.side_effect = [
+        instance_status(i_1='running', i_2='pending'),
+        instance_status(i_2='running'),
+    ]
+    StartedWaiter.BOTO3_CLIENTS['ec2'] = ec2_client
+
+    event = {
+        'RequestType': 'Create',
+        'ResourceProperties': {'InstanceIds': ['i-1', 'i-2']},
+    }
+    o = waiter(event, Context(remaining_ms=1000))
+    with pytest.raises(ContinuationRequested):
+        o.create()
+
+    invoker = o.CONTINUATION_INVOKER
+    assert len(invoker.pending) == 1
+    continued_event = invoker.pending.pop()
+    assert continued_event['Continuation']['State']['Remaining'] == ['i-2']
+    assert continued_event['Continuation']['Count'] == 1
+
+    o = waiter(continued_event, Context(remaining_ms=60000))
+    assert o.create() == {
+        'InstanceIds': ['i-1', 'i-2'],
+        'InstanceCount': 2,
+        'StateCount.running': 2,
+        'State.i-1': 'running',
+        'State.i-2': 'running',
+    }
+    assert paginate.call_args.kwargs == {'InstanceIds': ['i-2'], 'IncludeAllInstances': True}
+
+
+def test_chunks_large_fleets():
+    instance_ids = [f"i-{i:04}" for i in range(250)]
+    ec2_client = mock.Mock()
+    paginate = ec2_client.get_paginator.return_value.paginate
+    paginate.side_effect = lambda InstanceIds, IncludeAllInstances: instance_status(**{
+        instance_id.replace('-', '_'): 'running'
+        for instance_id in InstanceIds
+    })
+    StartedWaiter.BOTO3_CLIENTS['ec2'] = ec2_client
+
+    event = {
+        'RequestType': 'Create',
+        'ResourceProperties': {'InstanceIds': instance_ids, 'WaitForStatusChecks': 'true'},
+    }
+    attributes = waiter(event, Context(remaining_ms=60000)).create()
+
+    assert paginate.call_count == 3
+    assert max(len(call.kwargs['InstanceIds']) for call in paginate.call_args_list) == 100
+    assert attributes['State.i-0249'] == 'running'
+    assert attributes['SystemStatus.i-0000'] == 'ok'
+
+
+def test_large_fleet_response_fits():
+    from lambda_shared import cfn_response
+
+    instance_ids = [f"i-{i:017x}" for i in range(150)]
+    ec2_client = mock.Mock()
+    paginate = ec2_client.get_paginator.return_value.paginate
+    paginate.side_effect = lambda InstanceIds, IncludeAllInstances: instance_status(**{
+        instance_id.replace('-', '_'): 'running'
+        for instance_id in InstanceIds
+    })
+    StartedWaiter.BOTO3_CLIENTS['ec2'] = ec2_client
+
+    event = {
+        'RequestType': 'Create',
+        'ResourceType': 'Custom::StartedWaiter',
+        'ResourceProperties': {'InstanceIds': instance_ids, 'WaitForStatusChecks': 'true'},
+    }
+    o = waiter(event, Context(remaining_ms=60000))
+    response_content = {
+        'Status': 'SUCCESS',
+        'PhysicalResourceId': 'waiter',
+        'StackId': 'arn:aws:cloudformation:eu-west-1:123456789012:stack/example/guid',
+        'RequestId': 'request',
+        'LogicalResourceId': 'Waiter',
+        'Data': o.create(),
+    }
+
+    with mock.patch.object(cfn_response, 'put_response', return_value=1) as put_response:
+        cfn_response.send_response(o, 'https://example.com/response', response_content)
+
+    sent = json.loads(put_response.call_args.args[1])
+    assert sent['Status'] == 'SUCCESS'
+    assert sent['Data']['InstanceCount'] == 150
+    assert sent['Data']['StateCount.running'] == 150
+    assert 'State.i-00000000000000000' not in sent['Data']
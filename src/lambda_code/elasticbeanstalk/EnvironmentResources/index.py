@@ -7,13 +7,14 @@ Parameters:
 """
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
 
 
-class EnvironmentResources(CloudFormationCustomResource):
+class EnvironmentResources(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
     eb_client = boto3.client('elasticbeanstalk')
@@ -8,16 +8,30 @@ Parameters:
     EbMajorVersion: (default: None)
     EbMinorVersion: (default: None)
     EbPatchVersion: (default: None)
-    Serial: dummy, use this to force an update
+    Serial: dummy, use this to force an update (bypassing the cache)
+
+Of all matching solution stacks, the one with the highest EB version is
+returned; ties are broken by the (natural) order of the platform and AMI
+names, so "PHP 8.1" comes after "PHP 8.0" and "PHP 7.4".
+
+The list of available solution stacks is cached for CACHE_TTL_SECONDS in warm
+Lambda containers. It is parsed once into a `SolutionStackCatalog`, indexed
+by architecture and platform, so lookups don't need to scan all stacks.
 """
+import bisect
+import functools
 import re
+import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cache import ttl_cache
+from lambda_shared.cfn_response import ResponseSenderMixin
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
 
+CACHE_TTL_SECONDS = 3600
 
 platform_pattern = re.compile(
     r'^(?P<arch>\w+) (?P<ami>[\w .]+?)'
@@ -26,23 +40,139 @@ platform_pattern = re.compile(
 )
 
 
-class SolutionStackName(CloudFormationCustomResource):
+@ttl_cache(ttl=CACHE_TTL_SECONDS, key=lambda eb_client: eb_client.meta.region_name)
+def list_available_solution_stacks(eb_client) -> list[str]:
+    return eb_client.list_available_solution_stacks()['SolutionStacks']
+
+
+def natural_key(text: str) -> tuple:
+    """Sort key that compares the numbers in `text` numerically, e.g. "PHP 7.4" < "PHP 8.0" < "PHP 8.10"."""
+    return tuple(
+        (0, int(part), '') if part.isdigit() else (1, 0, part)
+        for part in re.split(r'(\d+)', text)
+        if part != ''
+    )
+
+
+def prefix_range(sorted_keys: list[str], prefix: str) -> list[str]:
+    """Return the keys in `sorted_keys` starting with `prefix`, using binary search."""
+    start = bisect.bisect_left(sorted_keys, prefix)
+    end = start
+    while end < len(sorted_keys) and sorted_keys[end].startswith(prefix):
+        end += 1
+    return sorted_keys[start:end]
+
+
+class SolutionStack(typing.NamedTuple):
+    version: tuple[int, int, int]  # (-1, -1, -1) for stacks without version
+    platform_key: tuple
+    ami_key: tuple
+    name: str
+    ami: str
+
+
+class SolutionStackCatalog:
+    """
+    Solution stacks, indexed by architecture and platform.
+
+    Within each (architecture, platform), the stacks are sorted by version,
+    oldest first.
+    """
+
+    def __init__(self, solution_stack_names: typing.Iterable[str]):
+        # arch -> platform -> [SolutionStack]
+        self.index: dict[str, dict[str, list[SolutionStack]]] = {}
+        for name in solution_stack_names:
+            match = platform_pattern.search(name)
+            if match is None:
+                print(f"Ignoring unrecognized solution stack: {name}")
+                continue
+            version = tuple(
+                int(match[x]) if match[x] is not None else -1
+                for x in ('major', 'minor', 'patch')
+            )
+            self.index.setdefault(match['arch'], {}).setdefault(match['platform'], []).append(SolutionStack(
+                version=version,
+                platform_key=natural_key(match['platform']),
+                ami_key=natural_key(match['ami']),
+                name=name,
+                ami=match['ami'],
+            ))
+
+        for platforms in self.index.values():
+            for stacks in platforms.values():
+                stacks.sort()
+        self.archs = sorted(self.index.keys())
+        self.platforms = {
+            arch: sorted(platforms.keys())
+            for arch, platforms in self.index.items()
+        }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4)
+    def from_names(solution_stack_names: tuple[str, ...]) -> 'SolutionStackCatalog':
+        """Return the catalog of these stacks; only parsed once per warm container."""
+        return SolutionStackCatalog(solution_stack_names)
+
+    def find_latest(
+            self,
+            platform: str,
+            arch: str = '',
+            major: typing.Optional[int] = None,
+            minor: typing.Optional[int] = None,
+            patch: typing.Optional[int] = None,
+            ami_starts_with: str = '',
+    ) -> typing.Optional[str]:
+        """
+        Return the name of the newest solution stack matching the filters, or None.
+
+        :param platform: prefix of the platform
+        :param arch: prefix of the architecture
+        :param major, minor, patch: EB version numbers to match exactly, None matches any
+        :param ami_starts_with: prefix of the AMI
+        """
+        wanted = (major, minor, patch)
+        # The leading version numbers that are given can be binary searched, the others are checked one by one
+        version = ()
+        for number in wanted:
+            if number is None:
+                break
+            version += (number,)
+
+        def matches(stack: SolutionStack) -> bool:
+            return stack.ami.startswith(ami_starts_with) and all(
+                number is None or number == stack_number
+                for number, stack_number in zip(wanted, stack.version)
+            )
+
+        best = None
+        for candidate_arch in prefix_range(self.archs, arch):
+            for candidate_platform in prefix_range(self.platforms[candidate_arch], platform):
+                stacks = self.index[candidate_arch][candidate_platform]
+                # Stacks are sorted by version: binary search the ones with this version prefix
+                start = bisect.bisect_left(stacks, version, key=lambda stack: stack.version[:len(version)])
+                end = bisect.bisect_right(stacks, version, key=lambda stack: stack.version[:len(version)])
+                for stack in reversed(stacks[start:end]):  # Newest first
+                    if matches(stack):
+                        if best is None or stack > best:
+                            best = stack
+                        break
+        return None if best is None else best.name
+
+
+class SolutionStackName(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Return StackName as physical ID
 
     def validate(self):
-        self.filter = {}
-
         try:
-            self.filter['platform'] = self.resource_properties['Platform']
-            self.filter['arch'] = self.resource_properties.get('Architecture', '64bit')
+            self.platform = self.resource_properties['Platform']
+            self.arch = self.resource_properties.get('Architecture', '64bit')
 
-            if self.resource_properties.get('EbMajorVersion') is not None:
-                self.filter['major'] = int(self.resource_properties['EbMajorVersion'])
-            if self.resource_properties.get('EbMinorVersion') is not None:
-                self.filter['minor'] = int(self.resource_properties['EbMinorVersion'])
-            if self.resource_properties.get('EbPatchVersion') is not None:
-                self.filter['patch'] = int(self.resource_properties['EbPatchVersion'])
+            self.version = {}
+            for part in ('major', 'minor', 'patch'):
+                value = self.resource_properties.get(f"Eb{part.capitalize()}Version")
+                self.version[part] = int(value) if value is not None else None
 
             self.ami_starts_with = self.resource_properties.get('AmiStartsWith', '')
 
@@ -63,34 +193,26 @@ class SolutionStackName(CloudFormationCustomResource):
 
         return group_dict
 
-    def filter_stack(self, stack_dict):
-        for key, value in self.filter.items():
-            if type(stack_dict[key]) == str:
-                if not stack_dict[key].startswith(value):
-                    return False
-            else:
-                if stack_dict[key] != value:
-                    return False
-        # All filter items match
-
-        return stack_dict['ami'].startswith(self.ami_starts_with)
-
-    def create(self):
+    def create(self, cache_refresh: bool = False):
         eb_client = self.get_boto3_client('elasticbeanstalk')
 
-        all_stacks = eb_client.list_available_solution_stacks()['SolutionStacks']
+        all_stacks = list_available_solution_stacks(eb_client, cache_refresh=cache_refresh)
+        catalog = SolutionStackCatalog.from_names(tuple(all_stacks))
 
-        filtered_stacks = [
-            s
-            for s in all_stacks
-            if self.filter_stack(self.split_solution_stack_name(s))
-        ]
+        solution_stack_name = catalog.find_latest(
+            platform=self.platform,
+            arch=self.arch,
+            ami_starts_with=self.ami_starts_with,
+            **self.version,
+        )
+        if solution_stack_name is None:
+            raise ValueError(f"No solution stack found for platform {self.platform}")
 
-        self.physical_resource_id = filtered_stacks[0]  # May raise IndexError
+        self.physical_resource_id = solution_stack_name
         return {}
 
     def update(self):
-        return self.create()
+        return self.create(cache_refresh=self.has_property_changed('Serial'))
 
     def delete(self):
         # Nothing to delete
@@ -1,4 +1,6 @@
-from ..index import SolutionStackName
+import time
+
+from ..index import SolutionStackName, SolutionStackCatalog
 
 
 def test_solution_stack_name():
@@ -13,3 +15,95 @@ def test_solution_stack_name():
         'patch': 4,
         'platform': 'Python 3.6',
     }
+
+
+SOLUTION_STACKS = [
+    '64bit Amazon Linux 2023 v4.0.1 running PHP 8.2',
+    '64bit Amazon Linux 2023 v4.0.1 running PHP 8.1',
+    '64bit Amazon Linux 2023 v4.1.0 running PHP 8.2',
+    '64bit Amazon Linux 2023 v4.1.0 running PHP 8.1',
+    '64bit Amazon Linux 2 v3.5.10 running PHP 8.1',
+    '64bit Amazon Linux 2 v3.5.10 running PHP 8.0',
+    '64bit Amazon Linux 2 v3.5.9 running PHP 7.4',
+    '64bit Amazon Linux 2 v3.6.0 running PHP 8.1',
+    '64bit Amazon Linux 2 v3.6.0 running PHP 8.0',
+    '64bit Amazon Linux 2 v3.10.0 running PHP 8.1',
+    '64bit Amazon Linux 2023 v4.0.2 running Python 3.11',
+    '64bit Amazon Linux 2023 v4.0.2 running Python 3.9',
+    '64bit Amazon Linux 2 v3.5.2 running Python 3.8',
+    '64bit Amazon Linux 2 v3.5.2 running Python 3.7',
+    '64bit Amazon Linux 2018.03 v2.7.4 running Python 3.6',
+    '64bit Amazon Linux 2018.03 v2.9.21 running PHP 7.2',
+    '64bit Amazon Linux 2023 v6.0.1 running Node.js 18',
+    '64bit Amazon Linux 2 v5.8.1 running Node.js 16',
+    '64bit Amazon Linux 2 v5.8.1 running Node.js 14',
+    '64bit Amazon Linux 2023 v4.0.1 running Docker',
+    '64bit Amazon Linux 2 v3.6.0 running Docker',
+    '64bit Amazon Linux 2 v3.5.0 running ECS',
+    '64bit Amazon Linux 2023 v4.0.1 running Corretto 17',
+    '64bit Amazon Linux 2 v3.4.9 running Corretto 11',
+    '64bit Amazon Linux 2 v3.4.9 running Corretto 8',
+    '64bit Amazon Linux 2023 v5.0.1 running Tomcat 10 Corretto 17',
+    '64bit Amazon Linux 2 v4.3.9 running Tomcat 8.5 Corretto 11',
+    '64bit Amazon Linux 2023 v4.0.1 running Go 1',
+    '64bit Amazon Linux 2 v3.7.6 running Go 1',
+    '64bit Amazon Linux 2023 v4.0.1 running Ruby 3.2',
+    '64bit Amazon Linux 2 v3.6.9 running Ruby 3.0',
+    '64bit Amazon Linux 2 v2.5.6 running .NET Core',
+    '64bit Windows Server 2019 v2.11.5 running IIS 10.0',
+    '64bit Windows Server Core 2019 v2.11.5 running IIS 10.0',
+    '64bit Windows Server 2016 v2.11.5 running IIS 10.0',
+    '64bit Windows Server 2012 R2 v2.11.5 running IIS 8.5',
+    '64bit Debian jessie v2.12.16 running Go 1.4 (Preconfigured - Docker)',
+    '64bit Amazon Linux running PHP 5.3',
+    '32bit Amazon Linux running PHP 5.3',
+]
+
+
+def test_catalog_semantic_version_order():
+    catalog = SolutionStackCatalog(SOLUTION_STACKS)
+    # v3.10.0 is newer than v3.6.0, although it sorts before it as a string
+    assert catalog.find_latest('PHP 8.1', arch='64bit', major=3) == \
+        '64bit Amazon Linux 2 v3.10.0 running PHP 8.1'
+    # Ties on the version are broken on the platform: PHP 8.2 > PHP 8.1
+    assert catalog.find_latest('PHP 8', arch='64bit', major=4) == '64bit Amazon Linux 2023 v4.1.0 running PHP 8.2'
+    assert catalog.find_latest('PHP 8.0', arch='64bit') == '64bit Amazon Linux 2 v3.6.0 running PHP 8.0'
+
+
+def test_catalog_filters():
+    catalog = SolutionStackCatalog(SOLUTION_STACKS)
+    assert catalog.find_latest('PHP 8.1', major=3, minor=5) == '64bit Amazon Linux 2 v3.5.10 running PHP 8.1'
+    assert catalog.find_latest('PHP 8.0', minor=5) == '64bit Amazon Linux 2 v3.5.10 running PHP 8.0'
+    assert catalog.find_latest('Python 3.6', major=2, minor=7, patch=4) == \
+        '64bit Amazon Linux 2018.03 v2.7.4 running Python 3.6'
+    assert catalog.find_latest('PHP 5.3', arch='32bit') == '32bit Amazon Linux running PHP 5.3'
+    assert catalog.find_latest('IIS', ami_starts_with='Windows Server Core') == \
+        '64bit Windows Server Core 2019 v2.11.5 running IIS 10.0'
+    assert catalog.find_latest('PHP 9') is None
+    assert catalog.find_latest('PHP 8.1', major=1) is None
+
+
+def test_catalog_benchmark():
+    # Roughly the size of the real-world list, times 20
+    names = [
+        f"64bit Amazon Linux {ami} v{major}.{minor}.{patch} running {platform}"
+        for ami in ('2', '2023')
+        for major in range(2, 6)
+        for minor in range(15)
+        for patch in range(5)
+        for platform in ('PHP 8.1', 'PHP 8.2', 'Python 3.11', 'Node.js 18', 'Docker', 'Corretto 17')
+    ] + SOLUTION_STACKS
+
+    start = time.perf_counter()
+    catalog = SolutionStackCatalog(names)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        result = catalog.find_latest('PHP 8.1', arch='64bit', major=3)
+    lookup_seconds = (time.perf_counter() - start) / 1000
+
+    print(f"Parsed {len(names)} solution stacks in {build_seconds * 1000:.1f}ms, "
+          f"lookup in {lookup_seconds * 1000000:.1f}us")
+    assert result == '64bit Amazon Linux 2023 v3.14.4 running PHP 8.1'
+    assert SolutionStackCatalog.from_names(tuple(names)) is SolutionStackCatalog.from_names(tuple(names))
@@ -1,20 +1,29 @@
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.tags import reconcile_tags, tags_as_list
 
 
-class Tags(CloudFormationCustomResource):
+class Tags(ResponseSenderMixin, CloudFormationCustomResource):
     def validate(self):
         self.environmentArn = self.resource_properties['EnvironmentArn']
         self.tags = self.resource_properties['Tags']
 
     @staticmethod
     def tags_to_update(tags):
-        return list(map(lambda tag: {'Key': tag[0], 'Value': tag[1]}, tags.items()))
+        return tags_as_list(tags)
 
-    def update_tags(self):
+    def update_tags(self, old_tags=None):
         client = self.get_boto3_session().client('elasticbeanstalk')
-        client.update_tags_for_resource(
-            ResourceArn=self.environmentArn,
-            TagsToAdd=self.tags_to_update(self.tags)
+        reconcile_tags(
+            old_tags, self.tags,
+            add=lambda tags: client.update_tags_for_resource(
+                ResourceArn=self.environmentArn,
+                TagsToAdd=tags,
+            ),
+            remove=lambda keys: client.update_tags_for_resource(
+                ResourceArn=self.environmentArn,
+                TagsToRemove=keys,
+            ),
         )
         return {'TagsToUpdate': self.tags_to_update(self.tags)}
 
@@ -22,7 +31,10 @@ class Tags(CloudFormationCustomResource):
         return self.update_tags()
 
     def update(self):
-        return self.update_tags()
+        if self.has_property_changed('EnvironmentArn'):
+            # Tag the new environment from scratch
+            return self.update_tags()
+        return self.update_tags(old_tags=self.old_resource_properties.get('Tags', {}))
 
     def delete(self):
         # Deleting not supported for now. Tags will disappear when environment is deleted.
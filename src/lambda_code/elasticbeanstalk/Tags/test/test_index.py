@@ -1,3 +1,5 @@
+from unittest import mock
+
 from ..index import Tags
 
 
@@ -12,3 +14,25 @@ def test_tags_dict_to_list_empty():
     tags_to_add = Tags.tags_to_update({})
 
     assert tags_to_add == []
+
+
+def test_update_only_sends_changes():
+    tags = Tags.__new__(Tags)
+    tags.resource_properties = {'EnvironmentArn': 'arn:env', 'Tags': {'Keep': 'same', 'Change': 'new', 'Add': 'x'}}
+    tags.old_resource_properties = {'EnvironmentArn': 'arn:env', 'Tags': {'Keep': 'same', 'Change': 'old', 'Gone': 'y'}}
+    tags.has_property_changed = lambda key: tags.resource_properties.get(key) != tags.old_resource_properties.get(key)
+    client = mock.Mock()
+    tags.get_boto3_session = lambda: mock.Mock(client=lambda service: client)
+    tags.validate()
+
+    tags.update()
+
+    assert client.update_tags_for_resource.call_args_list == [
+        mock.call(ResourceArn='arn:env', TagsToRemove=['Gone']),
+        mock.call(ResourceArn='arn:env', TagsToAdd=[{'Key': 'Change', 'Value': 'new'}, {'Key': 'Add', 'Value': 'x'}]),
+    ]
+
+    client.reset_mock()
+    tags.old_resource_properties = tags.resource_properties
+    tags.update()
+    client.update_tags_for_resource.assert_not_called()
@@ -1,11 +1,17 @@
 import json
+import re
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cache import ttl_cache
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.compaction import CompactionPolicy, DropRule
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
 except ImportError:
     CUSTOM_RESOURCE_NAME = 'dummy'
 
+CACHE_TTL_SECONDS = 300
+
 
 def lookup_internal_ipv4(ec2_client, public_ipv4: str) -> str:
     # Paginator is also available, but use simple client. We are querying on Public IP,
@@ -20,13 +26,44 @@ def lookup_internal_ipv4(ec2_client, public_ipv4: str) -> str:
     return public_ipv4
 
 
-class NlbSourceIps(CloudFormationCustomResource):
+@ttl_cache(ttl=CACHE_TTL_SECONDS, key=lambda ec2_client, description: [ec2_client.meta.region_name, description])
+def lookup_nlb_private_ipv4s(ec2_client, description: str) -> list[str]:
+    # Paginator is also available, but use simple client. We are querying on Public IP,
+    # so we expect at most a single answer, no pagination issues expected.
+    enis = ec2_client.describe_network_interfaces(
+        Filters=[{
+            'Name': 'description',
+            'Values': [description],
+        }],
+    )
+    enis = enis['NetworkInterfaces']
+    print(f"Found {len(enis)} ENIs")
+
+    enis = [
+        eni
+        for eni in enis
+        if eni["InterfaceType"] == "network_load_balancer"
+        and eni["Attachment"]["InstanceOwnerId"] == "amazon-aws"
+    ]
+    print(f"Found {len(enis)} ENIs of type network_load_balancer")
+
+    return [
+        eni['PrivateIpAddress']
+        for eni in enis
+    ]
+
+
+class NlbSourceIps(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    RESPONSE_COMPACTION = CompactionPolicy(
+        # Same information as IPv4Addresses
+        drop=[DropRule("IPv4Address{i}", lambda key: re.fullmatch(r'IPv4Address\d+', key) is not None)],
+    )
 
     def validate(self):
         self.nlb_arn = self.resource_properties['LoadBalancerArn']
 
-    def create(self):
+    def create(self, cache_refresh: bool = False):
         print(f"Resolving private IPs for `{self.nlb_arn}`")
 
         resource = self.nlb_arn.split(':')[5]
@@ -35,29 +72,7 @@ class NlbSourceIps(CloudFormationCustomResource):
         print(f"Doing lookup for ENIs with description `{description}`")
 
         ec2_client = self.get_boto3_client('ec2')
-        # Paginator is also available, but use simple client. We are querying on Public IP,
-        # so we expect at most a single answer, no pagination issues expected.
-        enis = ec2_client.describe_network_interfaces(
-            Filters=[{
-                'Name': 'description',
-                'Values': [description],
-            }],
-        )
-        enis = enis['NetworkInterfaces']
-        print(f"Found {len(enis)} ENIs")
-
-        enis = [
-            eni
-            for eni in enis
-            if eni["InterfaceType"] == "network_load_balancer"
-            and eni["Attachment"]["InstanceOwnerId"] == "amazon-aws"
-        ]
-        print(f"Found {len(enis)} ENIs of type network_load_balancer")
-
-        ipv4_addresses = [
-            eni['PrivateIpAddress']
-            for eni in enis
-        ]
+        ipv4_addresses = lookup_nlb_private_ipv4s(ec2_client, description, cache_refresh=cache_refresh)
         print("Found internal IP addresses:")
         for a in ipv4_addresses:
             print(a)
@@ -74,7 +89,7 @@ class NlbSourceIps(CloudFormationCustomResource):
         return attributes
 
     def update(self):
-        return self.create()
+        return self.create(cache_refresh=self.has_property_changed('Serial'))
 
     def delete(self):
         pass
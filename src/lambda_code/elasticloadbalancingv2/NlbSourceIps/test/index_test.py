@@ -190,3 +190,26 @@ def test_nlb_source_ips(nlb_arn_gen):
 
     for i, ip in enumerate(returned_ips, start=0):
         assert attributes[f"IPv4Address{i}"] in returned_ips
+
+
+def test_oversized_response_drops_per_ip_attributes():
+    from lambda_shared.compaction import compact_response, encoded_size
+
+    ips = [f"192.0.2.{i}" for i in range(200)]
+    response_content = {
+        'Status': 'SUCCESS',
+        'StackId': 'arn:aws:cloudformation:eu-west-1:123456789012:stack/test/guid',
+        'LogicalResourceId': 'SourceIps',
+        'PhysicalResourceId': 'log-stream',
+        'Data': {
+            'IPv4Addresses': ips,
+            **{f"IPv4Address{i}": ip for i, ip in enumerate(ips)},
+        },
+    }
+    resource = mock.Mock(event={'RequestType': 'Create', 'ResourceType': 'Custom::NlbSourceIps'})
+
+    compacted = compact_response(resource, response_content, index.NlbSourceIps.RESPONSE_COMPACTION, 4096)
+
+    assert compacted['Data'] == {'IPv4Addresses': ips}
+    assert encoded_size(compacted) <= 4096
+    resource.get_boto3_client.assert_not_called()
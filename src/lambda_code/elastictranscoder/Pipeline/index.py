@@ -5,6 +5,7 @@ Custom Resource for managing Elastic Transcoder Pipelines.
 import os
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
@@ -18,7 +19,7 @@ def convertToBool(input):
         return input
 
 
-class Pipeline(CloudFormationCustomResource):
+class Pipeline(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
     DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use Pipeline Id instead
 
@@ -7,10 +7,11 @@ https://docs.aws.amazon.com/AmazonCloudWatchLogs/latest/APIReference/API_DeleteR
 
 import json
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
-class ResourcePolicy(CloudFormationCustomResource):
+class ResourcePolicy(ResponseSenderMixin, CloudFormationCustomResource):
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
     def validate(self):
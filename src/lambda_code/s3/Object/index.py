@@ -5,11 +5,13 @@ import os
 
 from _metadata import CUSTOM_RESOURCE_NAME
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared import s3 as s3_shared, strtobool
+from lambda_shared.cfn_response import ResponseSenderMixin
 
 REGION = os.environ['AWS_REGION']
 
 
-class S3Object(CloudFormationCustomResource):
+class S3Object(ResponseSenderMixin, CloudFormationCustomResource):
     """
     Create and manage an S3 Object as a CloudFormation resource.
 
@@ -18,6 +20,16 @@ class S3Object(CloudFormationCustomResource):
       Bucket: str: bucket name
       Key: str: location within bucket
       Body: str: content of object to create/update
+      ObjectMetadata: dict: user metadata of the object
+      ContentType: str: default: binary/octet-stream
+      CacheControl: str: optional
+      ContentEncoding: str: optional: "gzip" to compress the Body before uploading
+      PartSize: int: Bodies larger than this (in bytes) are uploaded with a
+                     multipart upload. Default: 8 MiB, minimum: 5 MiB
+      AllowOverwrite: bool: allow to overwrite an existing object on create
+
+    The upload is skipped when the object already has the same content (ETag),
+    ObjectMetadata, ContentType, CacheControl and ContentEncoding.
     """
 
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
@@ -32,32 +44,44 @@ class S3Object(CloudFormationCustomResource):
         self.object_metadata = self.resource_properties.get('ObjectMetadata', {})
         self.content_type = self.resource_properties.get('ContentType', 'binary/octet-stream')  # copy AWS default
         self.cache_control = self.resource_properties.get('CacheControl', None)
-        self.allow_overwrite = self.resource_properties.get('AllowOverwrite', False)
+        self.allow_overwrite = strtobool(str(self.resource_properties.get('AllowOverwrite', 'false')))
+        self.content_encoding = self.resource_properties.get('ContentEncoding', None)
+        self.part_size = int(self.resource_properties.get('PartSize', s3_shared.DEFAULT_PART_SIZE))
 
         if not isinstance(self.body, str):
             self.body = json.dumps(self.body)
+        if self.part_size < s3_shared.MIN_PART_SIZE:
+            raise ValueError(f"PartSize must be at least {s3_shared.MIN_PART_SIZE} bytes")
 
     def create(self, allow_overwrite_override=False):
         """Create the object."""
         # set the resource id after creation so we can't delete by accident
         self.physical_resource_id = "none yet"
 
-        optional_props = {}
+        extra_args = {
+            'Metadata': self.object_metadata,
+            'ContentType': self.content_type,
+        }
         if self.cache_control is not None:
-            optional_props['CacheControl'] = self.cache_control
+            extra_args['CacheControl'] = self.cache_control
+        if self.content_encoding is not None:
+            extra_args['ContentEncoding'] = self.content_encoding
 
-        if self.allow_overwrite is False and allow_overwrite_override is False:
-            optional_props['IfNoneMatch'] = '*'
+        overwrite = self.allow_overwrite or allow_overwrite_override
+
+        data = s3_shared.encode_body(self.body, self.content_encoding or 'identity')
+        etag = s3_shared.compute_etag(data, self.part_size)
 
         s3_client = self.get_boto3_session().client('s3', region_name=self.region)
-        s3_client.put_object(
-            Bucket=self.bucket,
-            Key=self.key,
-            Body=self.body.encode('utf-8'),
-            Metadata=self.object_metadata,
-            ContentType=self.content_type,
-            **optional_props,
-        )
+        if overwrite and s3_shared.object_is_current(s3_client, self.bucket, self.key, etag, extra_args):
+            print(f"s3://{self.bucket}/{self.key} is up to date ({etag}), not uploading")
+        else:
+            print(f"Uploading {len(data)} bytes to s3://{self.bucket}/{self.key}")
+            s3_shared.upload(
+                s3_client, self.bucket, self.key, data, extra_args,
+                part_size=self.part_size,
+                if_none_match=not overwrite,
+            )
 
         self.physical_resource_id = f"{self.bucket}/{self.key}"
 
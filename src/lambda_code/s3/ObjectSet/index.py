@@ -0,0 +1,233 @@
+"""Custom Resource to create/update/delete many objects (files) in an S3 bucket at once."""
+
+import io
+import json
+import mimetypes
+import os
+import typing
+import zipfile
+
+from _metadata import CUSTOM_RESOURCE_NAME
+from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared import s3 as s3_shared
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.compaction import CompactionPolicy, DropRule
+from lambda_shared.concurrency import chunked, map_concurrently
+
+REGION = os.environ['AWS_REGION']
+
+MAX_WORKERS = 8
+MAX_KEYS_PER_DELETE = 1000  # Limit of DeleteObjects
+
+# Changes to these properties require all objects to be uploaded again
+SETTINGS_PROPERTIES = ('ObjectMetadata', 'ContentType', 'CacheControl', 'ContentEncoding', 'PartSize')
+
+
+class S3ObjectSet(ResponseSenderMixin, CloudFormationCustomResource):
+    """
+    Create and manage many S3 Objects as a single CloudFormation resource.
+
+    Properties:
+      Region: str: region of bucket (default: current region)
+      Bucket: str: bucket name
+      Prefix: str: prepended to every key. Default: ''
+      Objects: dict: key -> content (str, or JSON-able content)
+      SourceArchive: dict: {"Bucket": ..., "Key": ..., "VersionId": ...}: zip
+                     file in S3; every file in it becomes an object
+      ObjectMetadata, ContentType, CacheControl, ContentEncoding, PartSize:
+                     see s3.Object; apply to all objects. ContentType is
+                     guessed from the key when not given.
+
+    On update, only objects whose content or settings changed are uploaded,
+    and objects that were removed from the set are deleted. Without a
+    VersionId, the previous content of the SourceArchive is unknown: its
+    files are compared with the objects in the bucket (by ETag and headers)
+    instead, and files removed from it are not detected.
+
+    Returns:
+      Count: the number of objects
+      ETag.{key}: the ETag of every object
+      Keys: comma-separated list of all keys
+    The ETag's, and then Keys, are left out when they don't fit in the
+    response.
+    """
+
+    RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    RESPONSE_COMPACTION = CompactionPolicy(
+        drop=[
+            DropRule("ETag of every object", lambda key: key.startswith('ETag.')),
+            DropRule("Keys", lambda key: key == 'Keys'),
+        ],
+    )
+    DISABLE_PHYSICAL_RESOURCE_ID_GENERATION = True  # Use s3-path instead
+
+    def validate(self):
+        """Validate input parameters."""
+        self.region = self.resource_properties.get('Region', REGION)
+        self.bucket = self.resource_properties['Bucket']
+        self.prefix = self.resource_properties.get('Prefix', '')
+        if 'Objects' not in self.resource_properties and 'SourceArchive' not in self.resource_properties:
+            raise ValueError("Either Objects or SourceArchive is required")
+        self.s3_client = self.get_boto3_session().client('s3', region_name=self.region)
+
+    def settings(self, properties: dict) -> dict:
+        return {
+            'ObjectMetadata': properties.get('ObjectMetadata', {}),
+            'ContentType': properties.get('ContentType', None),
+            'CacheControl': properties.get('CacheControl', None),
+            'ContentEncoding': properties.get('ContentEncoding', None),
+            'PartSize': int(properties.get('PartSize', s3_shared.DEFAULT_PART_SIZE)),
+        }
+
+    def load_objects(self, properties: dict) -> dict[str, bytes]:
+        """Return the content of all objects described by `properties`, by key (including Prefix)."""
+        prefix = properties.get('Prefix', '')
+        objects = {}
+
+        if 'SourceArchive' in properties:
+            source = properties['SourceArchive']
+            extra_params = {'VersionId': source['VersionId']} if source.get('VersionId') else {}
+            response = self.s3_client.get_object(Bucket=source['Bucket'], Key=source['Key'], **extra_params)
+            with zipfile.ZipFile(io.BytesIO(response['Body'].read())) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        objects[prefix + info.filename] = archive.read(info)
+
+        for key, body in properties.get('Objects', {}).items():
+            if not isinstance(body, str):
+                body = json.dumps(body)
+            objects[prefix + key] = body.encode('utf-8')
+
+        return objects
+
+    def extra_args(self, key: str, settings: dict) -> dict:
+        extra_args = {
+            'Metadata': settings['ObjectMetadata'],
+            'ContentType': settings['ContentType'] or mimetypes.guess_type(key)[0] or 'binary/octet-stream',
+        }
+        if settings['CacheControl'] is not None:
+            extra_args['CacheControl'] = settings['CacheControl']
+        if settings['ContentEncoding'] is not None:
+            extra_args['ContentEncoding'] = settings['ContentEncoding']
+        return extra_args
+
+    def upload(self, key: str, data: bytes, settings: dict) -> str:
+        print(f"Uploading {len(data)} bytes to s3://{self.bucket}/{key}")
+        return s3_shared.upload(
+            self.s3_client, self.bucket, key,
+            s3_shared.encode_body(data, settings['ContentEncoding'] or 'identity'),
+            self.extra_args(key, settings),
+            part_size=settings['PartSize'],
+        )
+
+    def upload_if_stale(self, key: str, data: bytes, settings: dict) -> str:
+        """Upload the object, unless the bucket already has it with this content and headers."""
+        etag = self.etag(data, settings)
+        if s3_shared.object_is_current(self.s3_client, self.bucket, key, etag, self.extra_args(key, settings)):
+            return etag
+        return self.upload(key, data, settings)
+
+    def etag(self, data: bytes, settings: dict) -> str:
+        encoded = s3_shared.encode_body(data, settings['ContentEncoding'] or 'identity')
+        return s3_shared.compute_etag(encoded, settings['PartSize'])
+
+    def delete_keys(self, bucket: str, keys: typing.Iterable[str]) -> None:
+        for chunk in chunked(sorted(keys), MAX_KEYS_PER_DELETE):
+            print(f"Deleting {len(chunk)} objects from s3://{bucket}")
+            response = self.s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True},
+            )
+            errors = response.get('Errors', [])
+            if len(errors) > 0:
+                raise RuntimeError("Could not delete " + ", ".join(
+                    f"{error['Key']} ({error['Code']})" for error in errors
+                ))
+
+    def sync(self, previous: dict[str, typing.Optional[bytes]], previous_settings: typing.Optional[dict]) -> dict:
+        """
+        Upload the changed objects, delete the removed ones, and return the attributes.
+
+        :param previous: the previous objects; None when the previous content is unknown
+        """
+        objects = self.load_objects(self.resource_properties)
+        settings = self.settings(self.resource_properties)
+
+        etags = {}
+        to_upload = []
+        to_check = []
+        for key, data in objects.items():
+            if settings != previous_settings or key not in previous:
+                to_upload.append(key)
+            elif previous[key] is None:
+                to_check.append(key)
+            elif previous[key] == data:
+                etags[key] = self.etag(data, settings)
+            else:
+                to_upload.append(key)
+        to_delete = set(previous.keys()) - set(objects.keys())
+        print(f"{len(objects)} objects: {len(to_upload)} to upload, {len(to_check)} to compare with the bucket, "
+              f"{len(to_delete)} to delete")
+
+        uploaded = map_concurrently(
+            lambda key: self.upload(key, objects[key], settings),
+            to_upload,
+            max_workers=MAX_WORKERS,
+        )
+        etags.update(zip(to_upload, uploaded))
+        checked = map_concurrently(
+            lambda key: self.upload_if_stale(key, objects[key], settings),
+            to_check,
+            max_workers=MAX_WORKERS,
+        )
+        etags.update(zip(to_check, checked))
+        self.delete_keys(self.bucket, to_delete)
+
+        self.physical_resource_id = f"{self.bucket}/{self.prefix}"
+
+        attributes = {
+            f"ETag.{key}": etag
+            for key, etag in sorted(etags.items())
+        }
+        attributes['Count'] = len(objects)
+        attributes['Keys'] = ','.join(sorted(objects.keys()))
+        return attributes
+
+    def create(self):
+        """Create the objects."""
+        # set the resource id after creation so we can't delete by accident
+        self.physical_resource_id = "none yet"
+        return self.sync({}, None)
+
+    def update(self):
+        """Update the objects."""
+        if self.has_property_changed('Bucket') or self.has_property_changed('Region'):
+            return self.create()
+            # CloudFormation will call delete() on the old bucket
+
+        previous = self.load_objects(self.old_resource_properties)
+        old_source = self.old_resource_properties.get('SourceArchive')
+        if old_source is not None and not old_source.get('VersionId'):
+            # This read the current archive, not the one of the previous update: those files may have changed
+            prefix = self.old_resource_properties.get('Prefix', '')
+            inline_keys = {prefix + key for key in self.old_resource_properties.get('Objects', {})}
+            previous = {key: data if key in inline_keys else None for key, data in previous.items()}
+
+        return self.sync(previous, self.settings(self.old_resource_properties))
+
+    def delete(self):
+        """Delete the objects."""
+        bucket, sep, prefix = self.physical_resource_id.partition("/")
+        if not sep:
+            # nothing to do - create failed
+            return
+
+        try:
+            objects = self.load_objects(self.resource_properties)
+        except self.s3_client.exceptions.NoSuchKey:
+            print("SourceArchive is gone; can not determine the objects to delete")
+            return
+        self.delete_keys(bucket, objects.keys())
+
+
+handler = S3ObjectSet.get_handler()
@@ -0,0 +1,107 @@
+import os
+os.environ['AWS_REGION'] = 'eu-west-1'
+
+import io  # noqa: E402
+import json  # noqa: E402
+import zipfile  # noqa: E402
+from unittest import mock  # noqa: E402
+
+from lambda_shared import cfn_response  # noqa: E402
+from lambda_shared.s3 import compute_etag  # noqa: E402
+
+from ..index import S3ObjectSet  # noqa: E402
+
+
+class Context:
+    def get_remaining_time_in_millis(self):
+        return 60000
+
+
+def s3_mock():
+    s3_client = mock.Mock()
+    s3_client.put_object.side_effect = lambda Body, **kwargs: {'ETag': compute_etag(Body)}
+    s3_client.delete_objects.return_value = {}
+    return s3_client
+
+
+def object_set(event, s3_client):
+    o = S3ObjectSet()
+    o.event = event
+    o.context = Context()
+    o.resource_properties = event['ResourceProperties']
+    o.old_resource_properties = event.get('OldResourceProperties', {})
+    o.physical_resource_id = event.get('PhysicalResourceId')
+    o.get_boto3_session = mock.Mock()
+    o.get_boto3_session.return_value.client.return_value = s3_client
+    o.validate()
+    return o
+
+
+def test_many_objects_response_fits():
+    s3_client = s3_mock()
+    event = {
+        'RequestType': 'Create',
+        'ResourceType': 'Custom::ObjectSet',
+        'ResourceProperties': {
+            'Bucket': 'bucket',
+            'Prefix': 'static/',
+            'Objects': {f"assets/file-{i:03}.txt": f"content {i}" for i in range(100)},
+        },
+    }
+    o = object_set(event, s3_client)
+    response_content = {
+        'Status': 'SUCCESS',
+        'PhysicalResourceId': 'bucket/static/',
+        'StackId': 'arn:aws:cloudformation:eu-west-1:123456789012:stack/example/guid',
+        'RequestId': 'request',
+        'LogicalResourceId': 'Objects',
+        'Data': o.create(),
+    }
+    assert s3_client.put_object.call_count == 100
+    assert response_content['Data']['ETag.static/assets/file-000.txt'] == compute_etag(b'content 0')
+
+    with mock.patch.object(cfn_response, 'put_response', return_value=1) as put_response:
+        cfn_response.send_response(o, 'https://example.com/response', response_content)
+
+    sent = json.loads(put_response.call_args.args[1])
+    assert sent['Status'] == 'SUCCESS'
+    assert sent['Data']['Count'] == 100
+    assert not any(key.startswith('ETag.') for key in sent['Data'])
+
+
+def zip_archive(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_update_unversioned_archive_compares_with_bucket():
+    s3_client = s3_mock()
+    # The archive was overwritten since the previous update: old and new properties read the same, new, archive
+    s3_client.get_object.side_effect = lambda **kwargs: {
+        'Body': io.BytesIO(zip_archive({'changed.txt': b'new', 'same.txt': b'same'})),
+    }
+    bucket_etags = {'changed.txt': compute_etag(b'old'), 'same.txt': compute_etag(b'same')}
+    s3_client.head_object.side_effect = lambda Bucket, Key: {
+        'ETag': bucket_etags[Key], 'Metadata': {}, 'ContentType': 'text/plain',
+    }
+    properties = {
+        'Bucket': 'bucket',
+        'SourceArchive': {'Bucket': 'artifacts', 'Key': 'site.zip'},
+        'Objects': {'inline.txt': 'inline'},
+    }
+    event = {
+        'RequestType': 'Update',
+        'PhysicalResourceId': 'bucket/',
+        'ResourceProperties': properties,
+        'OldResourceProperties': {**properties, 'Objects': {'inline.txt': 'inline', 'removed.txt': 'x'}},
+    }
+    attributes = object_set(event, s3_client).update()
+
+    assert [call.kwargs['Key'] for call in s3_client.put_object.call_args_list] == ['changed.txt']
+    assert sorted(call.kwargs['Key'] for call in s3_client.head_object.call_args_list) == ['changed.txt', 'same.txt']
+    assert s3_client.delete_objects.call_args.kwargs['Delete']['Objects'] == [{'Key': 'removed.txt'}]
+    assert attributes['ETag.changed.txt'] == compute_etag(b'new')
+    assert attributes['ETag.same.txt'] == compute_etag(b'same')
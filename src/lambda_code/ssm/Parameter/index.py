@@ -1,17 +1,16 @@
 """Custom Resource to create an SSM Parameter."""
 
-import base64
 import datetime
 import hashlib
-import json
 import os
-import random
-import string
 import typing
 
 from cfn_custom_resource import CloudFormationCustomResource
 
 from lambda_shared import strtobool
+from lambda_shared import ssm as ssm_shared
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.ssm import generate_random
 
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
@@ -20,27 +19,8 @@ except ImportError:
 
 REGION = os.environ['AWS_REGION']
 
-ENCODE = {
-    'none': lambda x: x,
-    'base64': lambda x: base64.b64encode(x.encode('utf-8')).decode('utf-8'),
-}
 
-
-def generate_random(specs: dict) -> str:
-    """Generate a random string."""
-    length = int(specs.get('length', 22))
-    charset = specs.get('charset',
-                        string.ascii_uppercase +
-                        string.ascii_lowercase +
-                        string.digits)
-    r = ''.join([
-        random.SystemRandom().choice(charset)
-        for _ in range(length)
-    ])
-    return r
-
-
-class Parameter(CloudFormationCustomResource):
+class Parameter(ResponseSenderMixin, CloudFormationCustomResource):
     """
     Custom Resource class to create an SSM Parameter with some features that aren't currently available through standard CloudFormation.
 
@@ -102,10 +82,7 @@ class Parameter(CloudFormationCustomResource):
             self.random_value = True
             self.value = generate_random(self.resource_properties['RandomValue'])
         self.encoding = self.resource_properties.get('Encoding', 'none')
-        try:
-            self.value = ENCODE[self.encoding](self.value)
-        except KeyError:
-            raise ValueError(f"Invalid encoding value: {self.encoding}. Supported encodings: {','.join(ENCODE.keys())}")
+        self.value = ssm_shared.encode(self.value, self.encoding)
 
         self.key_id = self.resource_properties.get('KeyId', None)
         self.tags = self.resource_properties.get('Tags', [])
@@ -139,36 +116,7 @@ class Parameter(CloudFormationCustomResource):
 
     def fetch_value(self, value_from: str):
         """Fetch the value from another parameter."""
-        svc = value_from.split(':')[2]
-        match svc:
-            case 'ssm':
-                ssm = self.get_boto3_client(svc)
-                try:
-                    response = ssm.get_parameter(
-                        Name=value_from,
-                        WithDecryption=True,
-                    )
-                    return response['Parameter']['Value']
-                except ssm.exceptions.ParameterNotFound:
-                    raise ValueError(f"Parameter {value_from} not found")
-            case 'secretsmanager':
-                secretsmanager = self.get_boto3_client(svc)
-                try:
-                    # value_from = arn:aws:secretsmanager:region:aws_account_id:secret:secret-name:json-key:version-stage:version-id
-                    # GetSecretValue does not accept ARNs that include the json-key.
-                    # We need to parse the value ourselves and return the correct value if json-key is present.
-                    arn_parts = value_from.split(':')
-                    json_key = arn_parts[7]
-                    extras = {k: v for k, v in zip(['VersionId', 'VersionStage'], arn_parts[8:]) if v}
-                    response = secretsmanager.get_secret_value(
-                        SecretId=':'.join(arn_parts[0:7]),
-                        **extras,
-                    )
-                    return json.loads(response['SecretString']).get(json_key)
-                except secretsmanager.exceptions.ResourceNotFoundException:
-                    raise ValueError(f"Secret {value_from} not found")
-            case _:
-                raise ValueError(f"Unknown value_from: {value_from}")
+        return ssm_shared.fetch_value(value_from, self.get_boto3_client)
 
     def put_parameter(self, overwrite: bool = False):
         """Use AWS API to create or update the parameter."""
@@ -186,8 +134,6 @@ class Parameter(CloudFormationCustomResource):
         _ = ssm.put_parameter(**params)
         self.physical_resource_id = self.name
 
-        self.update_tags(self.tags)
-
         return self.attributes()
 
     def update_tags(
@@ -196,49 +142,25 @@ class Parameter(CloudFormationCustomResource):
             old_tags: typing.List[typing.Dict[str, str]] = None,
     ) -> None:
         """Update tags on the resource."""
-        if old_tags is None:
-            old_tags = []
-
-        ssm = self.get_boto3_client('ssm')
-
-        if len(old_tags) > 0:
-            new_tags_keys = {
-                tag['Key']: True
-                for tag in new_tags
-            }
-
-            to_delete = []
-
-            for tag in old_tags:
-                if tag['Key'] not in new_tags_keys:
-                    to_delete.append(tag['Key'])
-
-            if len(to_delete) > 0:
-                ssm.remove_tags_from_resource(
-                    ResourceType='Parameter',
-                    ResourceId=self.physical_resource_id,
-                    TagKeys=to_delete,
-                )
-
-        ssm.add_tags_to_resource(
-            ResourceType='Parameter',
-            ResourceId=self.physical_resource_id,
-            Tags=self.tags,
-        )
+        ssm_shared.update_tags(self.get_boto3_client('ssm'), self.physical_resource_id, new_tags, old_tags)
 
     def create(self):
         """Create the resource."""
-        return self.put_parameter(overwrite=False)
+        self.put_parameter(overwrite=False)
+        self.update_tags(self.tags)
+        return self.attributes()
 
     def update(self):
         """Update the resource."""
         can_put = (not self.random_value) or \
                   (self.random_value and self.has_property_changed('RandomValue'))
 
-        need_put = self.has_property_changed('Name') or \
+        settings_changed = self.has_property_changed('Name') or \
             self.has_property_changed('Description') or \
             self.has_property_changed('Type') or \
-            self.has_property_changed('KeyId') or \
+            self.has_property_changed('KeyId')
+
+        need_put = settings_changed or \
             self.has_property_changed('Encoding') or \
             self.has_property_changed('Value') or \
             self.has_property_changed('ValueFrom') or \
@@ -258,8 +180,16 @@ class Parameter(CloudFormationCustomResource):
             # Old one will be deleted by CloudFormation
 
         if need_put:
-            print("Updating parameter")
-            self.put_parameter(overwrite=True)
+            if not settings_changed and not self.random_value and ssm_shared.stored_value_matches(
+                    self.get_boto3_client('ssm'), self.name, self.type, self.value):
+                # E.g. a different ValueFrom or Encoding that results in the same value:
+                # don't create a new version of the parameter
+                print("Parameter already has this value, not updating")
+                ssm_shared.report_puts(self.event.get('ResourceType', 'unknown'), written=0, skipped=1)
+            else:
+                print("Updating parameter")
+                self.put_parameter(overwrite=True)
+                ssm_shared.report_puts(self.event.get('ResourceType', 'unknown'), written=1, skipped=0)
 
         if self.has_property_changed('Tags'):
             print("Updating tags")
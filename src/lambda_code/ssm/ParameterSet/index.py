@@ -0,0 +1,242 @@
+"""Custom Resource to manage many SSM Parameters at once."""
+
+import json
+import os
+import typing
+
+from cfn_custom_resource import CloudFormationCustomResource
+
+from lambda_shared import ssm as ssm_shared
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.compaction import CompactionPolicy, DropRule
+from lambda_shared.concurrency import chunked, map_concurrently
+from lambda_shared.retry import RateLimiter, call_with_backoff
+from lambda_shared.value_from import ValueResolver
+
+try:
+    from _metadata import CUSTOM_RESOURCE_NAME
+except ImportError:
+    CUSTOM_RESOURCE_NAME = 'dummy'
+
+REGION = os.environ['AWS_REGION']
+
+MAX_WORKERS = 4
+MAX_CALLS_PER_SECOND = 5  # SSM's write APIs have a low default throughput
+MAX_NAMES_PER_DELETE = 10  # Limit of DeleteParameters
+
+# Changes to these properties require the parameter to be written again
+SETTINGS_PROPERTIES = ('Type', 'Description', 'KeyId', 'RandomValue')
+# Changes to these properties require the parameter to be written, unless it already has the resulting value
+VALUE_PROPERTIES = ('Encoding', 'Value', 'ValueFrom')
+
+
+def merge_tags(*tag_lists: typing.List[typing.Dict[str, str]]) -> typing.List[typing.Dict[str, str]]:
+    """Merge lists of {'Key': k, 'Value': v}; later lists override earlier ones."""
+    tags = {}
+    for tag_list in tag_lists:
+        for tag in tag_list:
+            tags[tag['Key']] = tag['Value']
+    return [{'Key': k, 'Value': v} for k, v in tags.items()]
+
+
+class ParameterSet(ResponseSenderMixin, CloudFormationCustomResource):
+    """
+    Custom Resource class to create many SSM Parameters from a single resource.
+
+    Properties:
+        Parameters: dict: required: parameter name (including namespace) -> properties:
+            Description: str: optional:
+            Type: enum["String", "StringList", "SecureString"]: optional:
+                  default "String"
+            KeyId: str: optional
+            Value, ValueFrom, RandomValue: exactly one of them: see ssm.Parameter
+            Encoding: str: optional: default "none", options: "none", "base64"
+            Tags: list of {'Key': k, 'Value': v}: optional: added to the common Tags
+        Tags: list of {'Key': k, 'Value': v}: optional: tags for all parameters
+
+    On update, only the parameters whose properties changed are written, and
+    only if the resulting value differs from the stored one; parameters that
+    were removed from the set are deleted. As with
+    ssm.Parameter, a RandomValue is never overwritten unless the RandomValue
+    property itself changes.
+
+    Returns:
+        Count: the number of parameters
+        ArnPrefix: the ARN of every parameter is ArnPrefix + its name
+        Arns: JSON object mapping every parameter name to its ARN
+        Names: comma-separated list of parameter names
+    Arns, and then Names, are left out when they don't fit in the response
+    (from about 30 parameters).
+    """
+
+    RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
+    RESPONSE_COMPACTION = CompactionPolicy(
+        # ArnPrefix and the names of the parameters give the ARNs
+        drop=[
+            DropRule("Arns", lambda key: key == 'Arns'),
+            DropRule("Names", lambda key: key == 'Names'),
+        ],
+    )
+
+    def validate(self):
+        """Validate input parameters."""
+        self.parameters = self.resource_properties.get('Parameters')
+        if not isinstance(self.parameters, dict) or len(self.parameters) == 0:
+            return False
+        for name, spec in self.parameters.items():
+            if len([key for key in ('Value', 'ValueFrom', 'RandomValue') if key in spec]) != 1:
+                raise ValueError(f"{name}: exactly one of Value, ValueFrom or RandomValue is required")
+            if spec.get('Encoding', 'none') not in ssm_shared.ENCODE:
+                raise ValueError(f"{name}: invalid encoding value: {spec['Encoding']}. "
+                                 f"Supported encodings: {','.join(ssm_shared.ENCODE.keys())}")
+        self.tags = self.resource_properties.get('Tags', [])
+        return True
+
+    def setup_clients(self) -> None:
+        # Creating clients is not thread-safe, using them is: create them before going concurrent
+        self.clients = {
+            'ssm': self.get_boto3_client('ssm'),
+        }
+        if any(spec.get('ValueFrom', '').split(':')[2:3] == ['secretsmanager'] for spec in self.parameters.values()):
+            self.clients['secretsmanager'] = self.get_boto3_client('secretsmanager')
+        self.rate_limiter = RateLimiter(MAX_CALLS_PER_SECOND)
+        self.values_from = {}
+
+    def call(self, fn, **kwargs):
+        """Call an SSM API, within the rate limit and retrying when throttled."""
+        return call_with_backoff(lambda: fn(**kwargs), rate_limiter=self.rate_limiter, context=self.context)
+
+    def value(self, spec: dict) -> str:
+        if 'ValueFrom' in spec:
+            value = self.values_from[spec['ValueFrom']]
+        elif 'RandomValue' in spec:
+            value = ssm_shared.generate_random(spec['RandomValue'])
+        else:
+            value = spec['Value']
+        return ssm_shared.encode(value, spec.get('Encoding', 'none'))
+
+    def put_parameter(self, name: str, overwrite: bool, only_if_changed: bool = False) -> bool:
+        """Write the parameter; return False if it was skipped because it already had this value."""
+        spec = self.parameters[name]
+        params = {
+            'Name': name,
+            'Type': spec.get('Type', 'String'),
+            'Value': self.value(spec),
+            'Description': spec.get('Description', ''),
+            'Overwrite': overwrite,
+        }
+        if spec.get('KeyId') is not None:
+            params['KeyId'] = spec['KeyId']
+        if only_if_changed and self.call(
+                ssm_shared.stored_value_matches,
+                ssm=self.clients['ssm'], name=name, type_=params['Type'], value=params['Value'],
+        ):
+            print(f"{name} already has this value, not updating")
+            return False
+        self.call(self.clients['ssm'].put_parameter, **params)
+        return True
+
+    def update_tags(self, name: str, old_tags: typing.Optional[list] = None) -> None:
+        new_tags = merge_tags(self.tags, self.parameters[name].get('Tags', []))
+        ssm_shared.update_tags(self.clients['ssm'], name, new_tags, old_tags, call=self.call)
+
+    def apply(self, changes: dict[str, str], old_parameters: dict, old_common_tags: list) -> None:
+        """
+        Apply the changes, concurrently.
+
+        :param changes: parameter name -> one of 'create', 'update', 'update-value', 'tags'
+        """
+        # Resolve all ValueFrom's in bulk, before writing
+        self.values_from = ValueResolver(self.clients.__getitem__).resolve_all(
+            self.parameters[name]['ValueFrom']
+            for name, change in changes.items()
+            if change != 'tags' and 'ValueFrom' in self.parameters[name]
+        )
+
+        def apply_one(item: tuple[str, str]) -> typing.Optional[bool]:
+            name, change = item
+            print(f"{change}: {name}")
+            written = None
+            if change != 'tags':
+                written = self.put_parameter(
+                    name,
+                    overwrite=change != 'create',
+                    only_if_changed=change == 'update-value',
+                )
+            old_tags = None
+            if name in old_parameters:
+                old_tags = merge_tags(old_common_tags, old_parameters[name].get('Tags', []))
+            self.update_tags(name, old_tags)
+            return written
+
+        results = map_concurrently(apply_one, sorted(changes.items()), max_workers=MAX_WORKERS)
+        ssm_shared.report_puts(
+            self.event.get('ResourceType', 'unknown'),
+            written=results.count(True),
+            skipped=results.count(False),
+        )
+
+    def delete_parameters(self, names: typing.Iterable[str]) -> None:
+        for chunk in chunked(sorted(names), MAX_NAMES_PER_DELETE):
+            print(f"Deleting {', '.join(chunk)}")
+            response = self.call(self.clients['ssm'].delete_parameters, Names=chunk)
+            if len(response.get('InvalidParameters', [])) > 0:
+                print(f"Already gone: {', '.join(response['InvalidParameters'])}")
+
+    def attributes(self) -> dict:
+        """Construct the attributes to return to CloudFormation."""
+        account_id = self.context.invoked_function_arn.split(":")[4]
+        arn_prefix = f'arn:aws:ssm:{REGION}:{account_id}:parameter'
+        return {
+            'Count': len(self.parameters),
+            'ArnPrefix': arn_prefix,
+            'Arns': json.dumps({
+                name: arn_prefix + name
+                for name in self.parameters.keys()
+            }),
+            'Names': ','.join(self.parameters.keys()),
+        }
+
+    def create(self):
+        """Create the resource."""
+        self.setup_clients()
+        self.apply({name: 'create' for name in self.parameters.keys()}, {}, [])
+        return self.attributes()
+
+    def update(self):
+        """Update the resource."""
+        self.setup_clients()
+        old_parameters = self.old_resource_properties.get('Parameters', {})
+        tags_changed = self.has_property_changed('Tags')
+
+        changes = {}
+        for name, spec in self.parameters.items():
+            old_spec = old_parameters.get(name)
+            if old_spec is None:
+                changes[name] = 'create'
+            elif any(spec.get(key) != old_spec.get(key) for key in SETTINGS_PROPERTIES + VALUE_PROPERTIES):
+                if 'RandomValue' in spec and spec['RandomValue'] == old_spec.get('RandomValue'):
+                    raise RuntimeError(
+                        f"Can't perform requested update of {name}: Would need to overwrite previous RandomValue, "
+                        "but RandomValue should not be changed")
+                if any(spec.get(key) != old_spec.get(key) for key in SETTINGS_PROPERTIES):
+                    changes[name] = 'update'
+                else:
+                    changes[name] = 'update-value'
+            elif tags_changed or spec.get('Tags') != old_spec.get('Tags'):
+                changes[name] = 'tags'
+        removed = set(old_parameters.keys()) - set(self.parameters.keys())
+
+        print(f"{len(changes)} parameters to change, {len(removed)} to delete, "
+              f"{len(self.parameters) - len(changes)} unchanged")
+        self.apply(changes, old_parameters, self.old_resource_properties.get('Tags', []))
+        self.delete_parameters(removed)
+        return self.attributes()
+
+    def delete(self):
+        """Delete the resource."""
+        self.setup_clients()
+        self.delete_parameters(self.parameters.keys())
+
+
+handler = ParameterSet.get_handler()
@@ -0,0 +1,73 @@
+import os
+os.environ['AWS_REGION'] = 'eu-west-1'
+
+import json  # noqa: E402
+from unittest import mock  # noqa: E402
+
+from lambda_shared import cfn_response  # noqa: E402
+
+from ..index import ParameterSet  # noqa: E402
+
+
+class Context:
+    invoked_function_arn = 'arn:aws:lambda:eu-west-1:123456789012:function:parameter-set'
+
+    def get_remaining_time_in_millis(self):
+        return 60000
+
+
+def parameter_set(event):
+    o = ParameterSet()
+    o.event = event
+    o.context = Context()
+    o.resource_properties = event['ResourceProperties']
+    assert o.validate()
+    return o
+
+
+def test_many_parameters_response_fits():
+    ssm_client = mock.Mock()
+    ParameterSet.BOTO3_CLIENTS['ssm'] = ssm_client
+    parameters = {
+        f"/application/configuration/parameter-{i:03}": {'Value': str(i)}
+        for i in range(200)
+    }
+    event = {
+        'RequestType': 'Create',
+        'ResourceType': 'Custom::ParameterSet',
+        'ResourceProperties': {'Parameters': parameters},
+    }
+    o = parameter_set(event)
+    response_content = {
+        'Status': 'SUCCESS',
+        'PhysicalResourceId': 'parameter-set',
+        'StackId': 'arn:aws:cloudformation:eu-west-1:123456789012:stack/example/guid',
+        'RequestId': 'request',
+        'LogicalResourceId': 'Parameters',
+        'Data': o.create(),
+    }
+    assert ssm_client.put_parameter.call_count == 200
+
+    with mock.patch.object(cfn_response, 'put_response', return_value=1) as put_response:
+        cfn_response.send_response(o, 'https://example.com/response', response_content)
+
+    sent = json.loads(put_response.call_args.args[1])
+    assert sent['Status'] == 'SUCCESS'
+    assert sent['Data']['Count'] == 200
+    assert sent['Data']['ArnPrefix'] == 'arn:aws:ssm:eu-west-1:123456789012:parameter'
+    assert 'Arns' not in sent['Data']
+
+
+def test_few_parameters_keep_all_attributes():
+    ParameterSet.BOTO3_CLIENTS['ssm'] = mock.Mock()
+    event = {
+        'RequestType': 'Create',
+        'ResourceProperties': {'Parameters': {'/a': {'Value': 'a'}, '/b': {'Value': 'b'}}},
+    }
+    attributes = parameter_set(event).create()
+
+    assert attributes['Names'] == '/a,/b'
+    assert json.loads(attributes['Arns']) == {
+        '/a': 'arn:aws:ssm:eu-west-1:123456789012:parameter/a',
+        '/b': 'arn:aws:ssm:eu-west-1:123456789012:parameter/b',
+    }
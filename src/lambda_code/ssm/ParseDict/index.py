@@ -8,6 +8,8 @@ import os
 import json
 
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
+from lambda_shared.concurrency import chunked, map_concurrently
 
 try:
     from _metadata import CUSTOM_RESOURCE_NAME
@@ -16,29 +18,78 @@ except ImportError:
 
 REGION = os.environ['AWS_REGION']
 
+MAX_NAMES_PER_CALL = 10  # Limit of GetParameters
 
-class ParseDict(CloudFormationCustomResource):
+
+def get_parameters(ssm_client, names: list[str]) -> dict[str, str]:
+    """Return the (decrypted) values of the given parameters, by name (as requested)."""
+    values = {}
+    for chunk_values in map_concurrently(
+            lambda chunk: get_parameters_chunk(ssm_client, chunk),
+            list(chunked(names, MAX_NAMES_PER_CALL)),
+    ):
+        values.update(chunk_values)
+    return values
+
+
+def get_parameters_chunk(ssm_client, names: list[str]) -> dict[str, str]:
+    response = ssm_client.get_parameters(Names=names, WithDecryption=True)
+    if len(response['InvalidParameters']) > 0:
+        raise ValueError(f"Parameters not found: {', '.join(response['InvalidParameters'])}")
+    values = {}
+    for param in response['Parameters']:
+        # Parameters may be requested by name or by ARN, optionally with a version or label selector
+        selector = param.get('Selector', '')
+        values[param['Name'] + selector] = param['Value']
+        values[param.get('ARN', '') + selector] = param['Value']
+    return values
+
+
+def get_parameters_by_path(ssm_client, path: str) -> list[str]:
+    """Return the (decrypted) values of all parameters under `path`, recursively, sorted by name."""
+    paginator = ssm_client.get_paginator('get_parameters_by_path')
+    params = []
+    for page in paginator.paginate(Path=path, Recursive=True, WithDecryption=True):
+        params.extend((param['Name'], param['Value']) for param in page['Parameters'])
+    return [value for _, value in sorted(params)]
+
+
+class ParseDict(ResponseSenderMixin, CloudFormationCustomResource):
     """
     ssm.ParseDict.
 
     Properties:
         Names: List[str]: List of parameter paths (including namespace) to read
+        Paths: List[str]: List of hierarchies to read all parameters from, recursively
         Serial: str: Use this to force an update
+
+    Every parameter must contain a JSON object. The objects are merged: on
+    duplicate keys, Names take precedence over Paths, earlier Names over later
+    ones, and earlier Paths over later ones. Within a Path, parameters are
+    ordered by name.
     """
 
     RESOURCE_TYPE_SPEC = CUSTOM_RESOURCE_NAME
 
     def validate(self):
-        self.names = self.resource_properties.get('Names')
-        if not self.names:
+        self.names = self.resource_properties.get('Names', [])
+        self.paths = self.resource_properties.get('Paths', [])
+        if not self.names and not self.paths:
             return False
         return True
 
     def create(self):
         ssm = self.get_boto3_client('ssm')
-        print(f"Retrieving parameters with paths '{self.names}'")
-        params = ssm.get_parameters(Names=self.names)
-        value = dict(ChainMap(*[json.loads(param['Value']) for param in params['Parameters']]))
+        values = []
+        if self.names:
+            print(f"Retrieving parameters with paths '{self.names}'")
+            values_by_name = get_parameters(ssm, list(dict.fromkeys(self.names)))
+            values.extend(values_by_name[name] for name in self.names)
+        if self.paths:
+            print(f"Retrieving parameters under '{self.paths}'")
+            for path_values in map_concurrently(lambda path: get_parameters_by_path(ssm, path), self.paths):
+                values.extend(path_values)
+        value = dict(ChainMap(*[json.loads(v) for v in values]))
         print(f"Got merged value: '{value}'")
         return value
 
@@ -1,4 +1,5 @@
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 from _metadata import CUSTOM_RESOURCE_NAME
 
 API_GATEWAY_IDENTITY_PROVIDER = 'API_GATEWAY'
@@ -9,7 +10,7 @@ SERVICE_IDENTITY_PROVIDER_TYPE = 'SERVICE_MANAGED'
 PUBLIC_ENDPOINT_TYPE = 'PUBLIC'
 
 
-class Server(CloudFormationCustomResource):
+class Server(ResponseSenderMixin, CloudFormationCustomResource):
     """
     Properties:
         EndpointType: str: endpoint type (PUBLIC or VPC_ENDPOINT, default is PUBLIC)
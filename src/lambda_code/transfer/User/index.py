@@ -1,8 +1,9 @@
 from cfn_custom_resource import CloudFormationCustomResource
+from lambda_shared.cfn_response import ResponseSenderMixin
 from _metadata import CUSTOM_RESOURCE_NAME
 
 
-class User(CloudFormationCustomResource):
+class User(ResponseSenderMixin, CloudFormationCustomResource):
     """
     Properties:
         Role: str: role for user, should include permissions to access a bucket
@@ -0,0 +1,175 @@
+"""
+Cache the results of read-only lookups across invocations of a warm Lambda.
+
+Many custom resources are pure lookups that CloudFormation calls again on
+every stack update. When many stacks update at once, the same API call is
+repeated for every one of them and gets throttled. The cache has two tiers:
+ * in memory: lives as long as the Python process of the warm container,
+ * in /tmp: survives a restart of the Python runtime within the same
+   execution environment (e.g. after a timeout or crash).
+
+Both tiers are bounded in size and every entry expires after `ttl` seconds.
+Cached values must be JSON-serializable; cache small projections of the API
+responses rather than the full responses.
+
+Usage:
+
+    @ttl_cache(ttl=300, key=lambda ec2_client, name: name)
+    def lookup(ec2_client, name: str) -> dict:
+        ...
+
+    lookup(ec2_client, 'foo')
+    lookup(ec2_client, 'foo', cache_refresh=True)  # Bypass (and update) the cache
+"""
+
+import collections
+import copy
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import typing
+
+CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), 'custom-resources-cache')
+
+
+class TtlCache:
+    """Bounded, two-tier cache where every entry expires after `ttl` seconds."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 128, directory: typing.Optional[str] = CACHE_DIRECTORY):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.directory = None if directory is None else os.path.join(directory, name)
+        self._memory = collections.OrderedDict()  # key -> (expires, value), least recently used first
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key: str) -> tuple[bool, typing.Any]:
+        """Return (True, value) on a hit, or (False, None) on a miss."""
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                expires, value = self._memory[key]
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    # Callers may modify the value they get; keep the cached one intact
+                    return True, copy.deepcopy(value)
+                del self._memory[key]
+
+        if self.directory is None:
+            return False, None
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+        if entry['key'] != key or entry['expires'] <= now:
+            return False, None
+        self._remember(key, entry['expires'], copy.deepcopy(entry['value']))
+        return True, entry['value']
+
+    def set(self, key: str, value: typing.Any) -> None:
+        expires = time.time() + self.ttl
+        self._remember(key, expires, copy.deepcopy(value))
+
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temporary file first, so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'key': key, 'expires': expires, 'value': value}, f)
+            os.replace(tmp_path, self._path(key))
+            self._prune_directory()
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not write cache entry for {self.name} to {self.directory}: {e}")
+
+    def _remember(self, key: str, expires: float, value: typing.Any) -> None:
+        with self._lock:
+            self._memory[key] = (expires, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _prune_directory(self) -> None:
+        entries = [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith('.json')
+        ]
+        if len(entries) <= self.maxsize:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.maxsize]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass  # Already removed by a concurrent prune
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                os.remove(entry.path)
+
+    def get_or_compute(self, key: str, compute: typing.Callable[[], typing.Any], refresh: bool = False,
+                       cache_none: bool = False) -> typing.Any:
+        """Return the cached value for `key`, or compute (and cache) it on a miss or when `refresh` is set."""
+        if not refresh:
+            hit, value = self.get(key)
+            if hit:
+                print(f"Cache hit for {self.name}")
+                return value
+
+        print(f"Cache {'refresh' if refresh else 'miss'} for {self.name}")
+        value = compute()
+        if value is not None or cache_none:
+            self.set(key, value)
+        return value
+
+
+def ttl_cache(
+        ttl: float,
+        maxsize: int = 128,
+        key: typing.Optional[typing.Callable[..., typing.Any]] = None,
+        cache_none: bool = False,
+        name: typing.Optional[str] = None,
+):
+    """
+    Decorate a function to cache its results in a `TtlCache`.
+
+    :param ttl: seconds before an entry expires
+    :param maxsize: maximum number of entries per tier
+    :param key: called with the arguments of the function, should return the (JSON-serializable) parts
+                that identify the result. Default: all arguments
+    :param cache_none: whether to cache `None` results (e.g. "not found")
+    :param name: name of the cache. Default: the qualified name of the function
+
+    The decorated function accepts an additional keyword argument `cache_refresh`
+    to bypass the cache, and exposes the cache as its `cache` attribute.
+    """
+    def decorator(fn):
+        cache = TtlCache(name or f"{fn.__module__}.{fn.__qualname__}", ttl=ttl, maxsize=maxsize)
+
+        @functools.wraps(fn)
+        def wrapper(*args, cache_refresh: bool = False, **kwargs):
+            key_parts = key(*args, **kwargs) if key is not None else [args, kwargs]
+            cache_key = json.dumps(key_parts, sort_keys=True, default=str)
+            return cache.get_or_compute(
+                cache_key,
+                lambda: fn(*args, **kwargs),
+                refresh=cache_refresh,
+                cache_none=cache_none,
+            )
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -0,0 +1,176 @@
+"""
+Send the custom resource response back to CloudFormation.
+
+CloudFormation waits for a PUT to the pre-signed `ResponseURL`. If that PUT
+fails, the stack hangs until the custom resource times out (one hour). The
+sender in this module:
+ * re-uses a connection pool across warm invocations,
+ * retries transient failures with jittered backoff, as long as the Lambda
+   has time left,
+ * compacts bodies larger than CloudFormation accepts, following the
+   resource's `RESPONSE_COMPACTION` policy (see `compaction`),
+ * refuses to send bodies that are still too large, and reports a FAILED
+   status instead,
+ * emits timing metrics.
+
+Usage:
+
+    class MyResource(ResponseSenderMixin, CloudFormationCustomResource):
+        ...
+"""
+
+import json
+import time
+import traceback
+
+import urllib3
+
+from lambda_shared.compaction import compact_response
+from lambda_shared.metrics import emit_metrics
+from lambda_shared.retry import full_jitter, remaining_seconds
+
+MAX_RESPONSE_BYTES = 4096  # CloudFormation rejects larger response bodies
+MAX_ATTEMPTS = 5
+MIN_ATTEMPT_SECONDS = 2.0  # Don't start an attempt with less time left than this
+REQUEST_TIMEOUT_SECONDS = 10.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_pool = urllib3.PoolManager(
+    retries=False,  # We retry ourselves, within the Lambda time budget
+)
+
+
+class ResponseTooLarge(ValueError):
+    pass
+
+
+def encode_response(response_content: dict) -> bytes:
+    """
+    Serialize the response, falling back to a FAILED response if it is too large.
+
+    A response that is too large would be rejected by CloudFormation anyway,
+    but without a useful reason.
+    """
+    body = json.dumps(response_content).encode('utf-8')
+    if len(body) <= MAX_RESPONSE_BYTES:
+        return body
+
+    print(f"Response body is {len(body)} bytes, exceeding the {MAX_RESPONSE_BYTES} byte limit. "
+          f"Returning FAILED instead. Data keys were: {', '.join(response_content.get('Data', {}).keys())}")
+    failed_content = {
+        **response_content,
+        'Status': 'FAILED',
+        'Reason': f"Response too large: {len(body)} bytes (max {MAX_RESPONSE_BYTES}). See CloudWatch Logs for details",
+        'Data': {},
+    }
+    body = json.dumps(failed_content).encode('utf-8')
+    if len(body) > MAX_RESPONSE_BYTES:
+        raise ResponseTooLarge(f"Response body is {len(body)} bytes, even without Data")
+    return body
+
+
+def put_response(url: str, body: bytes, context=None) -> int:
+    """
+    PUT the body to the pre-signed URL, retrying transient errors.
+
+    :return: the number of attempts used
+    :raises: the last error if all attempts failed
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        # Never wait for the response beyond the end of the invocation
+        timeout = max(0.5, min(REQUEST_TIMEOUT_SECONDS, remaining_seconds(context) - 0.5))
+        try:
+            response = _pool.request(
+                'PUT', url,
+                body=body,
+                timeout=timeout,
+                headers={
+                    # The pre-signed URL is signed without Content-Type
+                    'Content-Type': '',
+                    'Content-Length': str(len(body)),
+                },
+            )
+            if response.status == 200:
+                return attempt
+            error = RuntimeError(f"Response PUT returned HTTP {response.status}: {response.data[:200]!r}")
+            if response.status not in RETRY_STATUS_CODES:
+                raise error
+        except urllib3.exceptions.HTTPError as e:
+            error = e
+
+        delay = full_jitter(attempt - 1)
+        if attempt >= MAX_ATTEMPTS or remaining_seconds(context) - delay < MIN_ATTEMPT_SECONDS:
+            raise error
+        print(f"Response PUT attempt {attempt} failed ({error}); retrying in {delay:.2f}s")
+        time.sleep(delay)
+
+
+def send_response(resource, url: str, response_content: dict) -> None:
+    """
+    Send the response to CloudFormation.
+
+    Drop-in replacement for `CloudFormationCustomResource.send_response`.
+    """
+    start = time.monotonic()
+    policy = getattr(resource, 'RESPONSE_COMPACTION', None)
+    if policy is not None:
+        try:
+            response_content = compact_response(resource, response_content, policy, MAX_RESPONSE_BYTES)
+        except Exception as e:
+            # Never let compaction prevent the response from being sent
+            print(f"Could not compact the response: {e}")
+    body = encode_response(response_content)
+    attempts = put_response(url, body, context=resource.context)
+    latency = (time.monotonic() - start) * 1000
+    print(f"Response sent in {latency:.0f}ms after {attempts} attempt(s)")
+
+    emit_metrics(
+        dimensions={'ResourceType': resource.event.get('ResourceType', 'unknown')},
+        metrics={
+            'ResponseLatency': (latency, 'Milliseconds'),
+            'ResponseAttempts': (attempts, 'Count'),
+            'ResponseBytes': (len(body), 'Bytes'),
+        },
+        properties={'RequestId': response_content.get('RequestId')},
+    )
+
+
+def finish_function_nojson(resource):
+    """
+    Construct the response, without JSON-encoding the attribute values, and send it.
+
+    Use this for resources returning lists or dicts as attributes.
+    Can be removed once https://github.com/iRobotCorporation/cfn-custom-resource/pull/7 is accepted,
+    merged & released
+    """
+    physical_resource_id = resource.physical_resource_id
+    if physical_resource_id is None:
+        physical_resource_id = resource.context.log_stream_name
+    default_reason = f"See the details in CloudWatch Log Stream: {resource.context.log_stream_name}"
+    response_content = {
+        "Status": resource.status,
+        "Reason": resource.failure_reason or default_reason,
+        "PhysicalResourceId": physical_resource_id,
+        "StackId": resource.event['StackId'],
+        "RequestId": resource.event['RequestId'],
+        "LogicalResourceId": resource.event['LogicalResourceId'],
+        "Data": dict(resource.resource_outputs),
+    }
+    resource._base_logger.debug(f"Response body: {json.dumps(response_content)}")
+    if resource.RAISE_ON_FAILURE and resource.status == resource.STATUS_FAILED:
+        raise Exception(resource.failure_reason)
+    try:
+        return resource.send_response_function(resource, resource.response_url, response_content)
+    except Exception as e:
+        resource._base_logger.error(f"send response failed: {e}")
+        resource._base_logger.debug(traceback.format_exc())
+
+
+class ResponseSenderMixin:
+    """Send the response through the shared, retrying `send_response()`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.send_response_function = send_response
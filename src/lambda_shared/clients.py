@@ -0,0 +1,34 @@
+"""
+Pool of boto3 clients for other regions, reused across warm invocations.
+
+`CloudFormationCustomResource.get_boto3_client()` only creates clients for
+the region the Lambda runs in. Creating a client is slow (it loads the
+service model), and creating clients from the same session is not
+thread-safe, so clients for other regions are created once, under a lock,
+and shared. boto3 clients themselves are thread-safe.
+"""
+
+import threading
+import typing
+
+import boto3
+
+_clients = {}
+_lock = threading.Lock()
+_session = None
+
+
+def regional_client(service: str, region: typing.Optional[str] = None):
+    """Return a (shared) boto3 client for `service` in `region` (default: the current region)."""
+    global _session
+    key = (service, region)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        if key not in _clients:
+            if _session is None:
+                _session = boto3.session.Session()
+            _clients[key] = _session.client(service, region_name=region)
+        return _clients[key]
@@ -0,0 +1,148 @@
+"""
+Shrink custom resource responses that don't fit in CloudFormation's size limit.
+
+Some resources return the same information in several shapes (e.g. a list
+and one attribute per element). When the serialized response is too large,
+the compaction below:
+ 1. drops derived duplicates, following the resource's `DropRule`s in order,
+    one rule at a time, until the response fits;
+ 2. if enabled, moves the largest remaining values to SSM parameters, and
+    returns the parameter name as `{key}.Parameter` instead.
+Every step is logged. A response that still doesn't fit is handled by
+`cfn_response.encode_response()` as before (i.e. it fails).
+
+Offloaded values are stored under
+`/CustomResourceResponses/{stack name}/{logical id}/{hash of physical id}/`,
+so a replacement resource never overwrites (or deletes) the parameters of the
+resource it replaces. They are deleted when the resource is deleted.
+
+Usage:
+
+    class MyResource(ResponseSenderMixin, CloudFormationCustomResource):
+        RESPONSE_COMPACTION = CompactionPolicy(
+            drop=[DropRule("per-element attributes", lambda key: key.startswith('Element'))],
+            offload=True,  # Needs ssm:PutParameter, ssm:GetParametersByPath & ssm:DeleteParameters
+        )
+"""
+
+import hashlib
+import json
+import re
+import typing
+
+from lambda_shared.concurrency import chunked
+from lambda_shared.metrics import emit_metrics
+
+OFFLOAD_PARAMETER_PREFIX = '/CustomResourceResponses'
+MAX_OFFLOAD_VALUE_BYTES = 8192  # Limit of an advanced tier SSM parameter
+MAX_PARAMETERS_PER_DELETE = 10  # Limit of DeleteParameters
+
+
+class DropRule(typing.NamedTuple):
+    description: str  # What is dropped, for the logs
+    matches: typing.Callable[[str], bool]  # Whether to drop the attribute with this key
+
+
+class CompactionPolicy(typing.NamedTuple):
+    drop: typing.Sequence[DropRule] = ()
+    offload: bool = False
+
+
+def encoded_size(response_content: dict) -> int:
+    return len(json.dumps(response_content).encode('utf-8'))
+
+
+def drop_attributes(response_content: dict, rules: typing.Iterable[DropRule], max_bytes: int) -> dict:
+    """Apply `rules` in order, until the response is at most `max_bytes`."""
+    for rule in rules:
+        if encoded_size(response_content) <= max_bytes:
+            break
+        dropped = [key for key in response_content['Data'] if rule.matches(key)]
+        if len(dropped) == 0:
+            continue
+        response_content = {
+            **response_content,
+            'Data': {k: v for k, v in response_content['Data'].items() if k not in dropped},
+        }
+        print(f"Dropped {len(dropped)} attributes ({rule.description}), "
+              f"response is now {encoded_size(response_content)} bytes: {', '.join(dropped)}")
+    return response_content
+
+
+def parameter_path(response_content: dict) -> str:
+    stack_name = response_content['StackId'].split('/')[1]
+    physical_id_hash = hashlib.sha256(response_content['PhysicalResourceId'].encode('utf-8')).hexdigest()[:12]
+    return f"{OFFLOAD_PARAMETER_PREFIX}/{stack_name}/{response_content['LogicalResourceId']}/{physical_id_hash}"
+
+
+def parameter_name(path: str, key: str) -> str:
+    """Return the parameter to store attribute `key` in. Characters not allowed by SSM are replaced."""
+    safe_key = re.sub(r'[^a-zA-Z0-9_.-]', '_', key)
+    if safe_key != key:
+        safe_key += '-' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:8]  # keep names unique
+    return f"{path}/{safe_key}"
+
+
+def offload_attributes(ssm_client, response_content: dict, max_bytes: int) -> dict:
+    """Move the largest values to SSM parameters, until the response is at most `max_bytes`."""
+    path = parameter_path(response_content)
+    data = dict(response_content['Data'])
+    by_size = sorted(data.keys(), key=lambda k: len(json.dumps(data[k])), reverse=True)
+
+    offloaded = {}
+    for key in by_size:
+        if encoded_size({**response_content, 'Data': data}) <= max_bytes:
+            break
+        value = data[key] if isinstance(data[key], str) else json.dumps(data[key])
+        if len(value.encode('utf-8')) > MAX_OFFLOAD_VALUE_BYTES:
+            print(f"Attribute {key} is too large to offload ({len(value)} bytes)")
+            continue
+        name = parameter_name(path, key)
+        ssm_client.put_parameter(Name=name, Value=value, Type='String', Tier='Intelligent-Tiering', Overwrite=True)
+        offloaded[name] = key
+        del data[key]
+        data[f"{key}.Parameter"] = name
+        print(f"Offloaded attribute {key} ({len(value)} bytes) to SSM parameter {name}")
+
+    delete_parameters(ssm_client, path, keep=offloaded.keys())
+    return {**response_content, 'Data': data}
+
+
+def delete_parameters(ssm_client, path: str, keep: typing.Iterable[str] = ()) -> None:
+    """Delete the offloaded parameters under `path`, except the ones in `keep`."""
+    keep = set(keep)
+    names = [
+        param['Name']
+        for page in ssm_client.get_paginator('get_parameters_by_path').paginate(Path=path)
+        for param in page['Parameters']
+        if param['Name'] not in keep
+    ]
+    for chunk in chunked(names, MAX_PARAMETERS_PER_DELETE):
+        print(f"Deleting offloaded parameters {', '.join(chunk)}")
+        ssm_client.delete_parameters(Names=chunk)
+
+
+def compact_response(resource, response_content: dict, policy: CompactionPolicy, max_bytes: int) -> dict:
+    """Return `response_content`, compacted following `policy` if it is larger than `max_bytes`."""
+    if policy.offload and resource.event['RequestType'] == 'Delete':
+        delete_parameters(resource.get_boto3_client('ssm'), parameter_path(response_content))
+        return response_content
+
+    size = encoded_size(response_content)
+    if size <= max_bytes or response_content['Status'] != 'SUCCESS':
+        return response_content
+
+    print(f"Response body is {size} bytes, exceeding the {max_bytes} byte limit. Compacting")
+    compacted = drop_attributes(response_content, policy.drop, max_bytes)
+    if policy.offload and encoded_size(compacted) > max_bytes:
+        compacted = offload_attributes(resource.get_boto3_client('ssm'), compacted, max_bytes)
+
+    emit_metrics(
+        dimensions={'ResourceType': resource.event.get('ResourceType', 'unknown')},
+        metrics={
+            'ResponseCompactedBytes': (size - encoded_size(compacted), 'Bytes'),
+            'ResponseOffloadedAttributes': (sum(1 for k in compacted['Data'] if k.endswith('.Parameter')), 'Count'),
+        },
+        properties={'RequestId': response_content.get('RequestId')},
+    )
+    return compacted
@@ -0,0 +1,41 @@
+"""Helpers to split work in chunks and run it concurrently."""
+
+import concurrent.futures
+import itertools
+import typing
+
+T = typing.TypeVar('T')
+R = typing.TypeVar('R')
+
+MAX_WORKERS = 8
+
+
+def chunked(iterable: typing.Iterable[T], size: int) -> typing.Iterator[list[T]]:
+    """Split `iterable` in lists of at most `size` elements."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def map_concurrently(
+        fn: typing.Callable[[T], R],
+        items: typing.Iterable[T],
+        max_workers: int = MAX_WORKERS,
+) -> list[R]:
+    """
+    Like `list(map(fn, items))`, but call `fn` from a pool of threads.
+
+    The results are returned in the order of `items`. The first exception
+    raised by `fn` is re-raised.
+    boto3 clients are thread-safe, but sessions are not: create the clients
+    before calling this function.
+    """
+    items = list(items)
+    if len(items) <= 1 or max_workers <= 1:
+        return [fn(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(fn, items))
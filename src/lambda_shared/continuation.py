@@ -0,0 +1,149 @@
+"""
+Continue long-running operations in a new invocation of the Lambda function.
+
+Instead of sleeping until the Lambda times out, a handler saves its progress
+and re-invokes its own function asynchronously. The CloudFormation response
+is only sent by the invocation that finishes the operation, so the total wait
+is no longer bounded by the Lambda timeout, but by `MAX_WAIT_SECONDS`
+(CloudFormation itself gives up on a custom resource after one hour).
+
+Usage:
+
+    class MyResource(ResumableMixin, ResponseSenderMixin, CloudFormationCustomResource):
+        def create(self):
+            state = self.get_continuation_state()
+            if state is None:  # First invocation
+                state = self.start_something()
+            while not self.is_done(state):
+                if remaining_seconds(self.context) < 10:
+                    self.continue_later(state)  # Does not return
+                time.sleep(5)
+            return {}
+
+The state must be JSON-serializable.
+`ResumableMixin` must come before `ResponseSenderMixin` in the base classes.
+"""
+
+import json
+import time
+
+CONTINUATION_KEY = 'Continuation'
+MAX_CONTINUATIONS = 50
+MAX_WAIT_SECONDS = 3300  # CloudFormation times out custom resources after 3600 seconds
+
+
+class ContinuationRequested(Exception):
+    """Raised by `continue_later()` to end the current invocation without responding."""
+
+
+class LambdaInvoker:
+    """Invoke the Lambda function asynchronously through the Lambda API."""
+
+    def __init__(self, lambda_client):
+        self.lambda_client = lambda_client
+
+    def invoke(self, function_arn: str, event: dict) -> None:
+        self.lambda_client.invoke(
+            FunctionName=function_arn,
+            InvocationType='Event',
+            Payload=json.dumps(event).encode('utf-8'),
+        )
+
+
+class LocalInvoker:
+    """
+    Stand-in for `LambdaInvoker` to run continuations offline.
+
+    The events are queued instead of sent. Use `run()` to feed them to a
+    handler, or inspect `pending` directly.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.invocations = 0
+
+    def invoke(self, function_arn: str, event: dict) -> None:
+        self.invocations += 1
+        # Round-trip through JSON, like the Lambda API does
+        self.pending.append(json.loads(json.dumps(event)))
+
+    def run(self, handler, context, max_invocations: int = MAX_CONTINUATIONS) -> None:
+        """Call `handler` for every pending event, until no more continuations are requested."""
+        while len(self.pending) > 0:
+            if max_invocations <= 0:
+                raise RuntimeError("Too many continuations")
+            max_invocations -= 1
+            handler(self.pending.pop(0), context)
+
+
+class ResumableMixin:
+    """
+    Allow a custom resource to continue its work in a new Lambda invocation.
+
+    The continuation is passed to the new invocation inside the original event,
+    under the `Continuation` key, so the new invocation responds to the same
+    CloudFormation request.
+    """
+
+    CONTINUATION_INVOKER = None  # Defaults to a LambdaInvoker
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._continued = False
+
+        send_response_function = self.send_response_function
+
+        def send_unless_continued(resource, url, response_content):
+            if resource._continued:
+                print("Work continues in another invocation; not sending a response yet")
+                return None
+            return send_response_function(resource, url, response_content)
+
+        self.send_response_function = send_unless_continued
+
+    def get_continuation_state(self):
+        """
+        Return the state saved by a previous invocation, or None on the first invocation.
+
+        Also restores the physical resource ID as it was when the state was saved.
+        """
+        continuation = self.event.get(CONTINUATION_KEY)
+        if continuation is None:
+            return None
+        if continuation.get('PhysicalResourceId') is not None:
+            self.physical_resource_id = continuation['PhysicalResourceId']
+        print(f"Resuming (continuation {continuation['Count']}, "
+              f"started {time.time() - continuation['StartedAt']:.0f}s ago)")
+        return continuation['State']
+
+    def continue_later(self, state) -> None:
+        """
+        Hand over to a new invocation of this function, and end this invocation.
+
+        :raises TimeoutError: if the operation has been going on for too long
+        :raises ContinuationRequested: always, when the new invocation was started
+        """
+        previous = self.event.get(CONTINUATION_KEY, {})
+        count = previous.get('Count', 0) + 1
+        started_at = previous.get('StartedAt', time.time())
+
+        if count > MAX_CONTINUATIONS or time.time() - started_at > MAX_WAIT_SECONDS:
+            raise TimeoutError(f"Giving up after {count - 1} continuations and "
+                               f"{time.time() - started_at:.0f} seconds")
+
+        event = dict(self.event)
+        event[CONTINUATION_KEY] = {
+            'Count': count,
+            'StartedAt': started_at,
+            'PhysicalResourceId': self.physical_resource_id,
+            'State': state,
+        }
+
+        invoker = self.CONTINUATION_INVOKER
+        if invoker is None:
+            invoker = LambdaInvoker(self.get_boto3_client('lambda'))
+        print(f"Continuing in a new invocation (continuation {count})")
+        invoker.invoke(self.context.invoked_function_arn, event)
+
+        self._continued = True
+        raise ContinuationRequested(f"Continued in a new invocation (continuation {count})")
@@ -0,0 +1,76 @@
+"""Helpers to write DynamoDB items, shared by dynamodb.Item and dynamodb.ItemSet."""
+
+import json
+import time
+import typing
+
+from lambda_shared.retry import call_with_backoff, full_jitter, remaining_seconds
+
+MAX_ITEMS_PER_BATCH = 25  # Limit of BatchWriteItem
+MAX_BATCH_ATTEMPTS = 8
+
+
+def convert_attributes(item_key: dict, item_value: dict) -> dict:
+    """
+    Construct an item, which is one dict of both key and value, from the CloudFormation properties.
+
+    CloudFormation passes all values as str's; convert the ones that need to be another type.
+    """
+    item = {}
+    item.update(item_key)
+    item.update(item_value)
+
+    # Do the needed conversions. CloudFormation given all str's
+    def do_convert(item):
+        if 'BOOL' in item:
+            return {'BOOL': (item['BOOL'] in ('true', True))}  # JSON Lines (ItemSet) can contain real booleans
+        elif 'L' in item:
+            for i, sub_item in enumerate(item['L']):
+                item['L'][i] = do_convert(sub_item)
+            return item
+        elif 'M' in item:
+            for k, v in item['M'].items():
+                item['M'][k] = do_convert(v)
+            return item
+        else:
+            return item
+    do_convert({'M': item})
+
+    return item
+
+
+def key_id(item_key: dict) -> str:
+    """Return a canonical string for the key of an item, to compare or deduplicate keys."""
+    return json.dumps(item_key, sort_keys=True)
+
+
+def batch_write(
+        dynamodb_client,
+        table_name: str,
+        requests: typing.List[dict],
+        context=None,
+        sleep: typing.Callable[[float], None] = time.sleep,
+) -> int:
+    """
+    Write (at most MAX_ITEMS_PER_BATCH) PutRequest's or DeleteRequest's with BatchWriteItem.
+
+    UnprocessedItems are retried with backoff. Returns the number of attempts.
+
+    :raises RuntimeError: if some requests are still unprocessed after MAX_BATCH_ATTEMPTS
+    """
+    attempt = 0
+    while True:
+        response = call_with_backoff(
+            lambda: dynamodb_client.batch_write_item(RequestItems={table_name: requests}),
+            context=context,
+        )
+        attempt += 1
+        requests = response.get('UnprocessedItems', {}).get(table_name, [])
+        if len(requests) == 0:
+            return attempt
+
+        delay = full_jitter(attempt)
+        if attempt >= MAX_BATCH_ATTEMPTS or remaining_seconds(context) - delay < 5:
+            raise RuntimeError(f"{len(requests)} items still unprocessed after {attempt} attempts")
+        print(f"{len(requests)} items unprocessed, retrying in {delay:.1f}s")
+        sleep(delay)
@@ -0,0 +1,46 @@
+"""
+Emit CloudWatch metrics from custom resource Lambdas.
+
+Metrics are printed in the CloudWatch Embedded Metric Format (EMF). The
+Lambda log stream picks them up and CloudWatch extracts the metrics
+asynchronously, so emitting a metric does not cost an API call.
+"""
+
+import json
+import time
+
+NAMESPACE = 'CustomResources'
+
+
+def emit_metrics(
+        dimensions: dict[str, str],
+        metrics: dict[str, tuple[float, str]],
+        properties: dict = None,
+) -> None:
+    """
+    Print the given metrics as an EMF log line.
+
+    :param dimensions: e.g. {'ResourceType': 'Custom::Ec2FindAmi'}
+    :param metrics: metric name -> (value, unit), e.g. {'Latency': (12.3, 'Milliseconds')}
+    :param properties: additional (non-metric) fields to include in the log line
+    """
+    line = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [list(dimensions.keys())],
+                'Metrics': [
+                    {'Name': name, 'Unit': unit}
+                    for name, (_, unit) in metrics.items()
+                ],
+            }],
+        },
+    }
+    line.update(properties or {})
+    line.update(dimensions)
+    line.update({
+        name: value
+        for name, (value, _) in metrics.items()
+    })
+    print(json.dumps(line, default=str))
@@ -0,0 +1,112 @@
+"""
+Poll until a condition is met, within the time budget of the Lambda invocation.
+
+The interval starts short, so quick state changes are noticed soon, and
+grows exponentially (with jitter) up to a maximum, so slow ones cost fewer
+API calls.
+
+Usage:
+
+    poller = Poller(context=self.context, initial_interval=1, max_interval=15)
+    try:
+        result = poller.poll(check)  # check() returns a falsy value while not done
+    except PollTimeout:
+        self.continue_later(state)
+"""
+
+import random
+import time
+import typing
+
+from lambda_shared.retry import remaining_seconds
+
+
+class PollTimeout(TimeoutError):
+    """The condition was not met before the deadline."""
+
+    def __init__(self, message: str, attempts: int):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+class Poller:
+    """
+    Call a check function with exponentially increasing intervals, until it returns a truthy value.
+
+    :param initial_interval: seconds to wait after the first check
+    :param max_interval: the interval never grows beyond this
+    :param multiplier: growth factor of the interval after every check
+    :param jitter: randomize every interval by +/- this fraction
+    :param context: Lambda context; polling stops `reserve_seconds` before the Lambda times out
+    :param reserve_seconds: time to keep available after polling, e.g. to continue or respond
+    :param timeout: optional, additional limit (in seconds) on the total polling time
+    :param on_progress: called as on_progress(attempt, elapsed_seconds, next_interval) after every
+                        unsuccessful check
+    """
+
+    def __init__(
+            self,
+            initial_interval: float = 1.0,
+            max_interval: float = 20.0,
+            multiplier: float = 2.0,
+            jitter: float = 0.2,
+            context=None,
+            reserve_seconds: float = 5.0,
+            timeout: typing.Optional[float] = None,
+            on_progress: typing.Optional[typing.Callable[[int, float, float], None]] = None,
+            sleep: typing.Callable[[float], None] = time.sleep,
+    ):
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.context = context
+        self.reserve_seconds = reserve_seconds
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.sleep = sleep
+
+    def intervals(self) -> typing.Iterator[float]:
+        """Generate the (jittered) intervals to wait between checks."""
+        interval = self.initial_interval
+        while True:
+            yield interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            interval = min(self.max_interval, interval * self.multiplier)
+
+    def budget(self) -> float:
+        """Return the number of seconds left for polling."""
+        budget = remaining_seconds(self.context) - self.reserve_seconds
+        if self.timeout is not None:
+            budget = min(budget, self.timeout)
+        return budget
+
+    def poll(self, check: typing.Callable[[], typing.Any]) -> typing.Any:
+        """
+        Call `check()` until it returns a truthy value, and return that value.
+
+        :raises PollTimeout: if the next check would be past the deadline
+        """
+        budget = self.budget()
+        start = time.monotonic()
+        attempt = 0
+        for interval in self.intervals():
+            attempt += 1
+            result = check()
+            if result:
+                return result
+
+            elapsed = time.monotonic() - start
+            if elapsed + interval > budget:
+                raise PollTimeout(f"Condition not met after {attempt} checks in {elapsed:.1f}s", attempt)
+
+            if self.on_progress is not None:
+                self.on_progress(attempt, elapsed, interval)
+            self.sleep(interval)
+
+
+def print_progress(what: str) -> typing.Callable[[int, float, float], None]:
+    """Return an `on_progress` callback printing a line about `what` is being waited for."""
+    def on_progress(attempt: int, elapsed: float, next_interval: float) -> None:
+        print(f"Still waiting for {what} after {attempt} checks ({elapsed:.0f}s); "
+              f"checking again in {next_interval:.1f}s")
+    return on_progress
@@ -0,0 +1,140 @@
+"""Helpers to retry and back off within the time budget of a Lambda invocation."""
+
+import random
+import threading
+import time
+import typing
+
+# Error codes of AWS APIs that mean "slow down"
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'TooManyUpdates',
+    'RequestLimitExceeded',
+    'ProvisionedThroughputExceededException',
+}
+
+
+def full_jitter(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """
+    Return the delay (in seconds) to wait before retry number `attempt`.
+
+    Uses the "full jitter" strategy: a random value between 0 and the
+    exponentially growing (but capped) backoff. `attempt` starts at 0.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def remaining_seconds(context, default: float = 300.0) -> float:
+    """
+    Return the number of seconds left before the Lambda invocation times out.
+
+    Returns `default` when no (usable) Lambda context is available, e.g.
+    when running locally.
+    """
+    try:
+        return context.get_remaining_time_in_millis() / 1000
+    except AttributeError:
+        return default
+
+
+def is_throttling_error(e: Exception) -> bool:
+    """Return whether `e` is a botocore ClientError telling us to slow down."""
+    response = getattr(e, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    return response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket, limiting the rate of API calls.
+
+    When a call gets throttled anyway, the rate is halved; every successful
+    call increases it again by a fraction of `max_rate` (AIMD).
+    """
+
+    def __init__(
+            self,
+            max_rate: float,
+            min_rate: float = 0.5,
+            burst: typing.Optional[float] = None,
+            clock: typing.Callable[[], float] = time.monotonic,
+            sleep: typing.Callable[[float], None] = time.sleep,
+    ):
+        """
+        :param max_rate: calls per second
+        :param min_rate: the rate is never lowered beyond this
+        :param burst: number of calls that can be made at once. Default: `max_rate`
+        """
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.burst = burst if burst is not None else max(1.0, max_rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call may be made."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0)
+            print(f"Throttled; lowering rate to {self.rate:.1f} calls per second")
+
+    def succeeded(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+def call_with_backoff(
+        fn: typing.Callable[[], typing.Any],
+        rate_limiter: typing.Optional[RateLimiter] = None,
+        max_attempts: int = 8,
+        context=None,
+        reserve_seconds: float = 5.0,
+        sleep: typing.Callable[[float], None] = time.sleep,
+) -> typing.Any:
+    """
+    Call `fn()`, retrying with backoff when it is throttled.
+
+    :param rate_limiter: optional, acquired before every attempt, and notified of throttling
+    :param context: Lambda context; no retry is attempted that would end less than
+                    `reserve_seconds` before the Lambda times out
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            if rate_limiter is not None:
+                rate_limiter.throttled()
+            delay = full_jitter(attempt)
+            attempt += 1
+            if attempt >= max_attempts or remaining_seconds(context) - delay < reserve_seconds:
+                raise
+            sleep(delay)
+            continue
+        if rate_limiter is not None:
+            rate_limiter.succeeded()
+        return result
@@ -0,0 +1,113 @@
+"""
+Helpers to upload objects to S3, shared by s3.Object and s3.ObjectSet.
+
+The ETag S3 will assign is computed locally, so an upload can be skipped
+when the object already has the same content and headers:
+ * single PUT: the MD5 of the content
+ * multipart upload: the MD5 of the concatenated MD5's of the parts, followed
+   by "-<number of parts>"
+This does not hold for objects encrypted with SSE-KMS or SSE-C; those are
+always uploaded.
+"""
+
+import gzip
+import hashlib
+import typing
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # Smallest part size S3 accepts (except for the last part)
+CONTENT_ENCODINGS = ('identity', 'gzip')
+
+
+def encode_body(body: typing.Union[str, bytes], content_encoding: str = 'identity') -> bytes:
+    """Return the bytes to upload for `body` (str's are UTF-8 encoded), compressed if requested."""
+    data = body.encode('utf-8') if isinstance(body, str) else body
+    match content_encoding:
+        case 'identity':
+            return data
+        case 'gzip':
+            # Fixed mtime, so the same body always gives the same bytes (and ETag)
+            return gzip.compress(data, mtime=0)
+        case _:
+            raise ValueError(f"Unsupported ContentEncoding: {content_encoding}. "
+                             f"Supported: {', '.join(CONTENT_ENCODINGS)}")
+
+
+def parts(data: bytes, part_size: int) -> typing.Iterator[memoryview]:
+    """Split `data` in parts of `part_size` bytes, without copying."""
+    view = memoryview(data)
+    for start in range(0, len(data), part_size):
+        yield view[start:start + part_size]
+
+
+def compute_etag(data: bytes, part_size: int = DEFAULT_PART_SIZE) -> str:
+    """Return the ETag S3 will assign to `data`, when uploaded with `upload()`."""
+    if len(data) <= part_size:
+        return f'"{hashlib.md5(data).hexdigest()}"'
+    digests = b''.join(hashlib.md5(part).digest() for part in parts(data, part_size))
+    return f'"{hashlib.md5(digests).hexdigest()}-{(len(data) + part_size - 1) // part_size}"'
+
+
+def object_is_current(s3_client, bucket: str, key: str, etag: str, extra_args: dict) -> bool:
+    """
+    Return whether the object exists with this ETag and these headers.
+
+    :param extra_args: Metadata, ContentType, CacheControl and ContentEncoding, as passed to `upload()`
+    """
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', '403'):
+            return False
+        raise
+
+    if head.get('ETag') != etag:
+        return False
+    # S3 returns user metadata keys in lowercase
+    wanted_metadata = {k.lower(): v for k, v in extra_args.get('Metadata', {}).items()}
+    if head.get('Metadata', {}) != wanted_metadata:
+        return False
+    for header in ('ContentType', 'CacheControl', 'ContentEncoding'):
+        if head.get(header) != extra_args.get(header):
+            return False
+    return True
+
+
+def upload(
+        s3_client,
+        bucket: str,
+        key: str,
+        data: bytes,
+        extra_args: dict,
+        part_size: int = DEFAULT_PART_SIZE,
+        if_none_match: bool = False,
+) -> str:
+    """
+    Upload `data`, with a multipart upload if it is larger than `part_size`.
+
+    :param extra_args: additional arguments for PutObject/CreateMultipartUpload, e.g. ContentType
+    :param if_none_match: fail if the object already exists
+    :return: the ETag of the new object
+    """
+    conditions = {'IfNoneMatch': '*'} if if_none_match else {}
+    if len(data) <= part_size:
+        return s3_client.put_object(Bucket=bucket, Key=key, Body=data, **extra_args, **conditions)['ETag']
+
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, **extra_args)['UploadId']
+    try:
+        uploaded_parts = []
+        for number, part in enumerate(parts(data, part_size), start=1):
+            response = s3_client.upload_part(
+                Bucket=bucket, Key=key, UploadId=upload_id,
+                PartNumber=number, Body=part.tobytes(),
+            )
+            uploaded_parts.append({'PartNumber': number, 'ETag': response['ETag']})
+        print(f"Uploaded {len(uploaded_parts)} parts of s3://{bucket}/{key}")
+        return s3_client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': uploaded_parts},
+            **conditions,
+        )['ETag']
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
@@ -0,0 +1,101 @@
+"""Helpers to manage SSM parameters, shared by ssm.Parameter and ssm.ParameterSet."""
+
+import base64
+import hashlib
+import hmac
+import random
+import string
+import typing
+
+from lambda_shared.metrics import emit_metrics
+from lambda_shared.tags import reconcile_tags
+from lambda_shared.value_from import ValueResolver
+
+ENCODE = {
+    'none': lambda x: x,
+    'base64': lambda x: base64.b64encode(x.encode('utf-8')).decode('utf-8'),
+}
+
+
+def generate_random(specs: dict) -> str:
+    """Generate a random string."""
+    length = int(specs.get('length', 22))
+    charset = specs.get('charset',
+                        string.ascii_uppercase +
+                        string.ascii_lowercase +
+                        string.digits)
+    r = ''.join([
+        random.SystemRandom().choice(charset)
+        for _ in range(length)
+    ])
+    return r
+
+
+def encode(value: str, encoding: str) -> str:
+    """Encode `value` with one of the ENCODE functions."""
+    try:
+        return ENCODE[encoding](value)
+    except KeyError:
+        raise ValueError(f"Invalid encoding value: {encoding}. Supported encodings: {','.join(ENCODE.keys())}")
+
+
+def fetch_value(value_from: str, get_client: typing.Callable[[str], typing.Any]) -> str:
+    """
+    Fetch the value from another parameter, which can be found in SSM or SecretsManager.
+
+    :param value_from: ARN of the parameter or secret, see `lambda_shared.value_from`
+    :param get_client: returns a boto3 client for the given service name
+    """
+    return ValueResolver(get_client).resolve(value_from)
+
+
+def value_hash(value: str) -> bytes:
+    return hashlib.sha256(value.encode('utf-8')).digest()
+
+
+def stored_value_matches(ssm, name: str, type_: str, value: str) -> bool:
+    """
+    Return whether parameter `name` already exists with this type and value.
+
+    Description and KeyId are not returned by GetParameter; compare those
+    with the previous properties instead.
+    """
+    try:
+        parameter = ssm.get_parameter(Name=name, WithDecryption=True)['Parameter']
+    except ssm.exceptions.ParameterNotFound:
+        return False
+    return parameter['Type'] == type_ and hmac.compare_digest(value_hash(parameter['Value']), value_hash(value))
+
+
+def report_puts(resource_type: str, written: int, skipped: int) -> None:
+    """Log and emit metrics about the PutParameter calls that were made or skipped."""
+    print(f"Wrote {written} parameter(s), skipped {skipped} write(s) of unchanged value(s)")
+    emit_metrics(
+        dimensions={'ResourceType': resource_type},
+        metrics={
+            'PutParameterWritten': (written, 'Count'),
+            'PutParameterSkipped': (skipped, 'Count'),
+        },
+    )
+
+
+def update_tags(
+        ssm,
+        name: str,
+        new_tags: typing.List[typing.Dict[str, str]],
+        old_tags: typing.List[typing.Dict[str, str]] = None,
+        call: typing.Callable[..., typing.Any] = None,
+) -> None:
+    """
+    Update the tags on parameter `name` from `old_tags` to `new_tags`.
+
+    :param call: optional, called as call(api_function, **kwargs) to make the API calls,
+                 e.g. to rate limit them
+    """
+    if call is None:
+        call = (lambda fn, **kwargs: fn(**kwargs))
+    reconcile_tags(
+        old_tags, new_tags,
+        add=lambda tags: call(ssm.add_tags_to_resource, ResourceType='Parameter', ResourceId=name, Tags=tags),
+        remove=lambda keys: call(ssm.remove_tags_from_resource, ResourceType='Parameter', ResourceId=name, TagKeys=keys),
+    )
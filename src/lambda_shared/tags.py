@@ -0,0 +1,92 @@
+"""
+Reconcile the tags of a resource with the desired tags, using as few API calls as possible.
+
+Usage:
+
+    reconcile_tags(
+        old_tags=self.old_resource_properties.get('Tags', []),
+        new_tags=self.resource_properties.get('Tags', []),
+        add=lambda tags: client.add_tags(ResourceId=..., Tags=tags),
+        remove=lambda keys: client.remove_tags(ResourceId=..., TagKeys=keys),
+    )
+
+Tags can be given as a list of {'Key': k, 'Value': v} (like CloudFormation
+and most AWS APIs use), or as a {k: v} dict.
+"""
+
+import typing
+
+from lambda_shared.concurrency import chunked
+
+MAX_TAGS_PER_CALL = 50  # Limit of most tagging APIs (and of tags per resource)
+
+TagsType = typing.Union[typing.List[typing.Dict[str, str]], typing.Dict[str, str], None]
+
+
+class TagDiff(typing.NamedTuple):
+    to_add: typing.List[typing.Dict[str, str]]  # New tags, and tags with a new value
+    to_remove: typing.List[str]  # Keys of the tags that are gone
+
+    def is_empty(self) -> bool:
+        return len(self.to_add) == 0 and len(self.to_remove) == 0
+
+
+def tags_as_dict(tags: TagsType) -> typing.Dict[str, str]:
+    """Convert a list of {'Key': k, 'Value': v} to a {k: v} dict; dicts are returned as is."""
+    if tags is None:
+        return {}
+    if isinstance(tags, dict):
+        return tags
+    return {tag['Key']: tag['Value'] for tag in tags}
+
+
+def tags_as_list(tags: TagsType) -> typing.List[typing.Dict[str, str]]:
+    """Convert a {k: v} dict to a list of {'Key': k, 'Value': v}; lists are returned as is."""
+    if tags is None:
+        return []
+    if isinstance(tags, dict):
+        return [{'Key': k, 'Value': v} for k, v in tags.items()]
+    return tags
+
+
+def diff_tags(old_tags: TagsType, new_tags: TagsType) -> TagDiff:
+    """Return the tags to add (or overwrite) and the tag keys to remove to get from `old_tags` to `new_tags`."""
+    old = tags_as_dict(old_tags)
+    new = tags_as_dict(new_tags)
+    return TagDiff(
+        to_add=[
+            {'Key': k, 'Value': v}
+            for k, v in new.items()
+            if old.get(k) != v
+        ],
+        to_remove=[k for k in old.keys() if k not in new],
+    )
+
+
+def reconcile_tags(
+        old_tags: TagsType,
+        new_tags: TagsType,
+        add: typing.Callable[[typing.List[typing.Dict[str, str]]], typing.Any],
+        remove: typing.Callable[[typing.List[str]], typing.Any],
+        max_per_call: int = MAX_TAGS_PER_CALL,
+) -> TagDiff:
+    """
+    Update the tags of a resource from `old_tags` to `new_tags`.
+
+    Tags are removed before they are added, so the resource never exceeds its
+    tag limit. No API calls are made when nothing changed.
+
+    :param add: called with lists of at most `max_per_call` {'Key': k, 'Value': v}
+    :param remove: called with lists of at most `max_per_call` tag keys
+    """
+    diff = diff_tags(old_tags, new_tags)
+    if diff.is_empty():
+        print("Tags are up to date")
+        return diff
+
+    print(f"Removing tags {diff.to_remove}, adding/updating tags {[tag['Key'] for tag in diff.to_add]}")
+    for keys in chunked(diff.to_remove, max_per_call):
+        remove(keys)
+    for tags in chunked(diff.to_add, max_per_call):
+        add(tags)
+    return diff
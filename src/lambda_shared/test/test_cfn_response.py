@@ -0,0 +1,62 @@
+import json
+from unittest import mock
+
+import pytest
+import urllib3
+
+from lambda_shared import cfn_response
+
+
+class Response:
+    def __init__(self, status):
+        self.status = status
+        self.data = b''
+
+
+def response_content(data):
+    return {
+        'Status': 'SUCCESS',
+        'PhysicalResourceId': 'id',
+        'StackId': 'arn:aws:cloudformation:eu-west-1:123456789012:stack/example/guid',
+        'RequestId': 'request',
+        'LogicalResourceId': 'Resource',
+        'Data': data,
+    }
+
+
+def test_encode_small_response():
+    content = response_content({'Key': 'value'})
+    assert json.loads(cfn_response.encode_response(content)) == content
+
+
+def test_encode_oversized_response_fails():
+    body = json.loads(cfn_response.encode_response(response_content({'Key': 'x' * 5000})))
+    assert body['Status'] == 'FAILED'
+    assert body['Data'] == {}
+    assert 'Response too large' in body['Reason']
+
+
+@mock.patch.object(cfn_response.time, 'sleep')
+@mock.patch.object(cfn_response, '_pool')
+def test_put_retries_transient_errors(pool, sleep):
+    pool.request.side_effect = [Response(503), urllib3.exceptions.ProtocolError('reset'), Response(200)]
+    assert cfn_response.put_response('https://example.com/response', b'{}') == 3
+    assert sleep.call_count == 2
+
+
+@mock.patch.object(cfn_response.time, 'sleep')
+@mock.patch.object(cfn_response, '_pool')
+def test_put_does_not_retry_client_errors(pool, sleep):
+    pool.request.return_value = Response(403)
+    with pytest.raises(RuntimeError):
+        cfn_response.put_response('https://example.com/response', b'{}')
+    assert pool.request.call_count == 1
+
+
+@mock.patch.object(cfn_response.time, 'sleep')
+@mock.patch.object(cfn_response, '_pool')
+def test_put_gives_up(pool, sleep):
+    pool.request.return_value = Response(500)
+    with pytest.raises(RuntimeError):
+        cfn_response.put_response('https://example.com/response', b'{}')
+    assert pool.request.call_count == cfn_response.MAX_ATTEMPTS
@@ -0,0 +1,103 @@
+from unittest import mock
+
+import pytest
+
+from lambda_shared.retry import RateLimiter, call_with_backoff, is_throttling_error
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class Context:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_is_throttling_error():
+    assert is_throttling_error(ClientError('ThrottlingException'))
+    assert not is_throttling_error(ClientError('AccessDenied'))
+    assert not is_throttling_error(ValueError())
+
+
+def test_retries_throttling():
+    fn = mock.Mock(side_effect=[ClientError('Throttling'), ClientError('Throttling'), 'result'])
+    sleep = mock.Mock()
+
+    assert call_with_backoff(fn, sleep=sleep) == 'result'
+    assert fn.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_does_not_retry_other_errors():
+    fn = mock.Mock(side_effect=ClientError('AccessDenied'))
+    with pytest.raises(ClientError):
+        call_with_backoff(fn, sleep=mock.Mock())
+    assert fn.call_count == 1
+
+
+def test_gives_up_after_max_attempts():
+    fn = mock.Mock(side_effect=ClientError('Throttling'))
+    with pytest.raises(ClientError):
+        call_with_backoff(fn, max_attempts=3, sleep=mock.Mock())
+    assert fn.call_count == 3
+
+
+def test_does_not_retry_beyond_lambda_timeout():
+    fn = mock.Mock(side_effect=ClientError('Throttling'))
+    with pytest.raises(ClientError):
+        call_with_backoff(fn, context=Context(remaining_ms=4000), sleep=mock.Mock())
+    assert fn.call_count == 1
+
+
+def test_rate_limiter_limits_rate():
+    clock = Clock()
+    limiter = RateLimiter(max_rate=10, clock=clock, sleep=clock.sleep)
+    for _ in range(30):
+        limiter.acquire()
+    # A burst of 10 calls, then 10 per second
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_rate_limiter_aimd():
+    clock = Clock()
+    limiter = RateLimiter(max_rate=10, min_rate=1, clock=clock, sleep=clock.sleep)
+
+    limiter.throttled()
+    assert limiter.rate == 5
+    limiter.throttled()
+    limiter.throttled()
+    limiter.throttled()
+    assert limiter.rate == 1  # not below min_rate
+
+    for _ in range(4):
+        limiter.succeeded()
+    assert limiter.rate == pytest.approx(3)  # +max_rate/20 per success
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.rate == 10  # not above max_rate
+
+
+def test_rate_limiter_throttled_while_calling():
+    fn = mock.Mock(side_effect=[ClientError('Throttling'), 'result'])
+    limiter = mock.Mock()
+    assert call_with_backoff(fn, rate_limiter=limiter, sleep=mock.Mock()) == 'result'
+    assert limiter.acquire.call_count == 2
+    limiter.throttled.assert_called_once_with()
+    limiter.succeeded.assert_called_once_with()
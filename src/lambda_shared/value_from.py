@@ -0,0 +1,183 @@
+"""
+Resolve `ValueFrom` ARNs of SSM parameters and Secrets Manager secrets, in bulk.
+
+A `ValueFrom` is either
+ * an SSM parameter ARN: arn:aws:ssm:region:account:parameter/name[:version-or-label]
+ * a secret ARN: arn:aws:secretsmanager:region:account:secret:secret-name[:json-key[:version-stage[:version-id]]]
+
+The resolver deduplicates the ARNs, fetches the parameters with
+GetParameters and the secrets with BatchGetSecretValue, and parses every
+secret only once, however many JSON keys are read from it.
+Fetched values are memoized in memory (never on disk) for a short time, so
+warm invocations that resolve the same ARNs don't fetch them again.
+
+Usage:
+
+    resolver = ValueResolver(self.get_boto3_client)
+    values = resolver.resolve_all([arn1, arn2, arn3])  # {arn: value}
+"""
+
+import json
+import typing
+
+from lambda_shared.cache import TtlCache
+from lambda_shared.concurrency import chunked
+
+VALUE_TTL_SECONDS = 30
+MAX_PARAMETERS_PER_CALL = 10  # Limit of GetParameters
+MAX_SECRETS_PER_CALL = 20  # Limit of BatchGetSecretValue
+
+# Secrets are sensitive: keep them in memory only
+_parameter_values = TtlCache('value_from.parameters', ttl=VALUE_TTL_SECONDS, directory=None)
+_secret_values = TtlCache('value_from.secrets', ttl=VALUE_TTL_SECONDS, directory=None)
+
+
+class SecretReference(typing.NamedTuple):
+    secret_id: str  # ARN of the secret, without the json-key, version-stage and version-id
+    json_key: str  # '' for the whole SecretString
+    version_stage: str
+    version_id: str
+
+    @classmethod
+    def parse(cls, value_from: str) -> 'SecretReference':
+        arn_parts = value_from.split(':')
+        if len(arn_parts) < 7:
+            raise ValueError(f"Invalid secret ARN: {value_from}")
+        extras = arn_parts[7:] + [''] * (3 - len(arn_parts[7:]))
+        return cls(':'.join(arn_parts[0:7]), *extras[:3])
+
+    def version(self) -> tuple[str, str, str]:
+        """Identifies the secret value: the secret with its version (if given)."""
+        return self.secret_id, self.version_stage, self.version_id
+
+
+class ValueResolver:
+    """
+    Resolve `ValueFrom` ARNs to their values.
+
+    :param get_client: returns a boto3 client for the given service name
+    """
+
+    def __init__(self, get_client: typing.Callable[[str], typing.Any]):
+        self.get_client = get_client
+
+    def resolve(self, value_from: str) -> str:
+        return self.resolve_all([value_from])[value_from]
+
+    def resolve_all(self, value_froms: typing.Iterable[str]) -> dict[str, str]:
+        """Return the value of every ARN in `value_froms`, by ARN."""
+        parameters = set()
+        secrets = {}
+        for value_from in set(value_froms):
+            svc = value_from.split(':')[2] if value_from.count(':') >= 2 else ''
+            match svc:
+                case 'ssm':
+                    parameters.add(value_from)
+                case 'secretsmanager':
+                    secrets[value_from] = SecretReference.parse(value_from)
+                case _:
+                    raise ValueError(f"Unknown value_from: {value_from}")
+
+        values = {}
+        if len(parameters) > 0:
+            values.update(self.get_parameters(parameters))
+        if len(secrets) > 0:
+            secret_values = self.get_secret_values({ref.version() for ref in secrets.values()})
+            for value_from, ref in secrets.items():
+                secret_value = secret_values[ref.version()]
+                if ref.json_key == '':
+                    values[value_from] = secret_value['SecretString']
+                elif isinstance(secret_value['Parsed'], dict):
+                    values[value_from] = secret_value['Parsed'].get(ref.json_key)
+                else:
+                    raise ValueError(f"Secret {ref.secret_id} does not contain a JSON object")
+        return values
+
+    def get_parameters(self, names: typing.Iterable[str]) -> dict[str, str]:
+        values = {}
+        to_fetch = []
+        for name in sorted(names):
+            hit, value = _parameter_values.get(name)
+            if hit:
+                values[name] = value
+            else:
+                to_fetch.append(name)
+
+        ssm = self.get_client('ssm') if len(to_fetch) > 0 else None
+        for chunk in chunked(to_fetch, MAX_PARAMETERS_PER_CALL):
+            response = ssm.get_parameters(Names=chunk, WithDecryption=True)
+            if len(response['InvalidParameters']) > 0:
+                raise ValueError(f"Parameter {', '.join(response['InvalidParameters'])} not found")
+            fetched = {}
+            for param in response['Parameters']:
+                # Parameters can be requested by name or by ARN, optionally with a version or label
+                selector = param.get('Selector', '')
+                fetched[param['Name'] + selector] = param['Value']
+                fetched[param['ARN'] + selector] = param['Value']
+            for name in chunk:
+                if name not in fetched:
+                    raise ValueError(f"Parameter {name} not found")
+                values[name] = fetched[name]
+                _parameter_values.set(name, fetched[name])
+        return values
+
+    def get_secret_values(self, versions: typing.Iterable[tuple[str, str, str]]) -> dict[tuple, dict]:
+        """
+        Return {'SecretString': ..., 'Parsed': ...} for every (secret_id, version_stage, version_id).
+
+        'Parsed' is the parsed JSON of the SecretString, or None if it isn't JSON.
+        """
+        values = {}
+        current = []  # The current version of these secrets can be fetched in bulk
+        for version in sorted(versions):
+            hit, value = _secret_values.get(json.dumps(version))
+            if hit:
+                values[version] = value
+            elif version[1:] == ('', ''):
+                current.append(version)
+            else:
+                values[version] = self.get_secret_version(*version)
+
+        for chunk in chunked(current, MAX_SECRETS_PER_CALL):
+            secret_strings = self.batch_get_secret_values([secret_id for secret_id, _, _ in chunk])
+            for version in chunk:
+                values[version] = self.remember(version, secret_strings[version[0]])
+        return values
+
+    def batch_get_secret_values(self, secret_ids: list[str]) -> dict[str, str]:
+        secretsmanager = self.get_client('secretsmanager')
+        response = secretsmanager.batch_get_secret_value(SecretIdList=secret_ids)
+        for error in response.get('Errors', []):
+            if error['ErrorCode'] == 'ResourceNotFoundException':
+                raise ValueError(f"Secret {error['SecretId']} not found")
+            raise ValueError(f"Could not get secret {error['SecretId']}: {error['ErrorCode']}: {error.get('Message')}")
+
+        secret_strings = {}
+        for secret_value in response['SecretValues']:
+            # The secret may be referred to by its full ARN, or by its ARN without the random suffix
+            arn_prefix = ':'.join(secret_value['ARN'].split(':')[0:6])
+            secret_strings[secret_value['ARN']] = secret_value['SecretString']
+            secret_strings[f"{arn_prefix}:{secret_value['Name']}"] = secret_value['SecretString']
+        return {
+            secret_id: secret_strings[secret_id]
+            for secret_id in secret_ids
+        }
+
+    def get_secret_version(self, secret_id: str, version_stage: str, version_id: str) -> dict:
+        secretsmanager = self.get_client('secretsmanager')
+        extras = {k: v for k, v in zip(['VersionStage', 'VersionId'], [version_stage, version_id]) if v}
+        try:
+            response = secretsmanager.get_secret_value(SecretId=secret_id, **extras)
+        except secretsmanager.exceptions.ResourceNotFoundException:
+            raise ValueError(f"Secret {secret_id} not found")
+        return self.remember((secret_id, version_stage, version_id), response['SecretString'])
+
+    @staticmethod
+    def remember(version: tuple[str, str, str], secret_string: str) -> dict:
+        try:
+            parsed = json.loads(secret_string)
+        except ValueError:
+            parsed = None
+        value = {'SecretString': secret_string, 'Parsed': parsed}
+        _secret_values.set(json.dumps(version), value)
+        return value